@@ -9,8 +9,6 @@ WORKSHEET = "Hoja 1"
 def main(path: Path) -> None:
     # Find dataframe
     df = data.find(
-        path,
-        __name__,
         wsname=WORKSHEET,
         cellrange=CELL_RANGE
     )
@@ -33,5 +31,3 @@ def main(path: Path) -> None:
         xlabel=cols[0],
         ylabel=cols[1]
     )
-
-    plot.save(path/f"plots/{__name__}.png")
@@ -6,7 +6,6 @@ import numpy as np
 
 CELL_RANGE = "A2:D85"
 WORKSHEET = "amplitud"
-LAMBDA = 8.6484
 
 logger = logging.getLogger(__name__)
 
@@ -14,48 +13,51 @@ logger = logging.getLogger(__name__)
 def main(path: Path) -> None:
     # Find dataframe
     df = data.find(
-        path,
-        f"{__name__}-max",
         wsname=WORKSHEET,
         cellrange=CELL_RANGE
     )
 
-    dist = df["Distancia [mm]"]
-    ampl = df["Amplitud [mVpp]"]
-    div = df["Escala [mVpp]"]
-    err = df["Error [mVpp]"]
+    cols = data.columns(df)
+
+    dist = cols["Distancia"]
+    ampl = cols["Amplitud"]
+    div = cols["Escala"]
+    err = cols["Error"]
 
     # 3% del valor medido, 5% por la división y el error en el promedio
     error = 0.03 * ampl + 0.05 * div + err
 
+    # Seeded with the wavelength of the dominant oscillation
     f = fit.f.fabry_perot
 
-    ampl_fit, (p_opt, _) = fit.utils.fitnsave(
-        path/f"results/{__name__}.csv",
+    fit_found = fit.utils.fitnsave(
         f,
         dist,
         ampl,
-        p0=[-1, 100000, 0.6, 1.5, LAMBDA],
+        saveto=path/f"results/{__name__}.csv",
         yerr=error,
     )
 
+    # Amplitude in Vpp
+    to_vpp = data.scale(ampl.unit, "Vpp")
+
     plt.figure(figsize=(10, 5))
     plt.grid()
-    plt.xlabel("Posición [mm]")
+    plt.xlabel(f"Posición [{dist.unit}]")
     plt.ylabel("Amplitud [Vpp]")
 
     plt.errorbar(
         dist[:-5],
-        ampl[:-5] / 1000,
-        yerr=error[:-5] / 1000,
+        ampl.to("Vpp")[:-5],
+        yerr=error[:-5] * to_vpp,
         fmt=".",
         label="Mediciones",
     )
 
-    X = np.linspace(dist.iloc[0], dist.iloc[-5], 1000)
+    X = np.linspace(dist[0], dist[-5], 1000)
     plt.plot(
         X,
-        f.f(X, *p_opt) / 1000,
+        f.f(X, *fit_found.params) * to_vpp,
         label="Ajuste"
     )
 
@@ -65,10 +67,11 @@ def main(path: Path) -> None:
 
     plt.figure(figsize=(10, 5))
     plt.grid()
-    plt.xlabel("Posición [mm]")
-    plt.ylabel("Amplitud [mVpp]")
+    plt.xlabel(f"Posición [{dist.unit}]")
+    plt.ylabel(f"Residuos [{ampl.unit}]")
 
-    residue = ampl_fit - ampl
+    # fitnsave's residue is fit - data
+    residue = fit_found.residue
 
     plt.errorbar(
         dist[:-5],
@@ -1,6 +1,6 @@
-from common import data, plot
+from common import data, plot, polar
+from common.interference import useg_to_rad
 from pathlib import Path
-import numpy as np
 
 CELL_RANGE = "A2:F39"
 WORKSHEET = "fase"
@@ -8,47 +8,37 @@ WORKSHEET = "fase"
 # Resonance
 FREQ = 40_750
 
-usec_by_sec = 1_000_000
+THETA_ERROR = polar.deg_to_rad(1)
 
-THETA_ERROR = 1 * np.pi / 180.0
+# Checkear error del osciloscopio [μseg]
+PHASE_ERROR = 0.2
 
 
 def main(path: Path) -> None:
     # Find dataframe
     df = data.find(
-        path,
-        __name__,
         wsname=WORKSHEET,
         cellrange=CELL_RANGE
     )
 
-    cols = df.columns.values.tolist()
+    angle = polar.deg_to_rad(df["Ángulo [°]"] + 90)
 
-    angle = df[cols[0]] + 90
-    phase = df[cols[5]]
-
-    # Angle in degrees shuold be in radians
-    angle *= np.pi / 180.0
-
-    # phase = 2 * pi * freq
-    # phase is in microseconds
-    phase *= 2 * np.pi * FREQ / usec_by_sec
-
-    # Checkear error del osciloscopio
-    error = 0.2
+    # Phase is measured as a delay in microseconds
+    phase = useg_to_rad(df["Fase [μseg]"], FREQ)
+    error = useg_to_rad(PHASE_ERROR, FREQ)
 
     # No offset
-    plot.data_polar(
+    fig, _ = plot.data_polar(
         angle,
         phase,
         rerr=error,
         terr=THETA_ERROR,
     )
 
-    plot.save(path/f"plots/{__name__}.png")
+    plot.save(path/f"plots/{__name__}.png", fig=fig)
 
     # Offset origin
-    plot.data_polar(
+    fig, _ = plot.data_polar(
         angle,
         phase,
         rerr=error,
@@ -56,4 +46,4 @@ def main(path: Path) -> None:
         rorigin=-10
     )
 
-    plot.save(path/f"plots/{__name__}-offset.png")
+    plot.save(path/f"plots/{__name__}-offset.png", fig=fig)
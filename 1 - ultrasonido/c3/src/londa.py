@@ -8,8 +8,6 @@ WORKSHEET = "lambda"
 def main(path: Path) -> None:
     # Find dataframe
     df = data.find(
-        path,
-        __name__,
         wsname=WORKSHEET,
         cellrange=CELL_RANGE
     )
@@ -21,11 +19,11 @@ def main(path: Path) -> None:
 
     error = 1
 
-    fit_found, _ = fit.utils.fitnsave(
-        path/f"results/{__name__}.csv",
+    fit_found = fit.utils.fitnsave(
         fit.f.linear,
         wavelen,
         dist,
+        saveto=path/f"results/{__name__}.csv",
         yerr=error
     )
 
@@ -36,5 +34,3 @@ def main(path: Path) -> None:
         error,
         fit_found,
     )
-
-    plot.save(path/f"plots/{__name__}.png")
@@ -1,7 +1,5 @@
-from common import data, plot, fit
+from common import data, plot, fit, resonance
 from pathlib import Path
-import numpy as np
-import matplotlib.pyplot as plt
 
 WORKSHEET = "resonancia"
 CELL_RANGE = "B3:E49"
@@ -10,38 +8,30 @@ CELL_RANGE = "B3:E49"
 def main(path: Path) -> None:
     # Find dataframe
     df = data.find(
-        path,
-        __name__,
         wsname=WORKSHEET,
         cellrange=CELL_RANGE
     )
 
-    cols = df.columns.values.tolist()
-
-    freq_sent = df[cols[0]]
-    freq_recv = df[cols[1]]
-    div = df[cols[2]]
-    err = df[cols[3]]
+    # Both resonances of the transducers, fitted together
+    resonance.sweep(
+        df,
+        path,
+        __name__,
+        func=fit.f.double_lorentz,
+        bounds=fit.f.double_lorentz.bounds
+    )
 
-    # 3% del valor medido, 5% por la división y el error en el promedio
-    error = 0.03 * freq_recv + 0.05 * div + err
+    freq_sent, _, error = resonance.columns(df)
+    ampl = data.columns(df)["Amplitud"]
 
-    # fit_found, _ = fit.utils.fitnsave(
-    #     path/f"results/{__name__}.csv",
-    #     fit.f.double_lorentz,
-    #     freq_sent,
-    #     freq_recv,
-    #     p0=[40, 40, 1, 1, 11],
-    #     yerr=error
-    # )
+    # Amplitude in Vpp
+    to_vpp = data.scale(ampl.unit, "Vpp")
 
-    # Plot result
     plot.data(
         freq_sent[3:-3],
-        freq_recv[3:-3] / 1000,
-        error[3:-3] / 1000,
+        ampl.to("Vpp")[3:-3],
+        error[3:-3] * to_vpp,
         figsize=(10, 8),
-        ylabel="Amplitud [Vpp]"
+        ylabel="Amplitud [Vpp]",
+        saveto=path/f"plots/{__name__}-vpp.png"
     )
-
-    plot.save(path/f"plots/{__name__}.png")
@@ -1,4 +1,5 @@
-from common import data, plot, fit
+from common import data, plot
+from common.interference import Waves, fit_phasors, useg_to_rad
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
@@ -6,54 +7,39 @@ import numpy as np
 CELL_RANGE = "B12:M69"
 WORKSHEET = "INTERFERENCIA"
 
-phase_err = 0.2
-
-
-def useg_to_rad(phase):
-    FREQ = 40_750
-    usec_by_sec = 1_000_000
+FREQ = 40_750
 
-    return 2 * np.pi * phase * FREQ / usec_by_sec
-
-
-def psi_err(ampl, phi, err_ampl, err_phi):
-    sigma_ampl = np.cos(phi) * err_ampl
-    sigma_phi = ampl * np.sin(phi) * err_phi
+phase_err = 0.2
 
-    return np.sqrt(sigma_ampl ** 2 + sigma_phi ** 2)
+# Emitter 1, emitter 2 and both at the same time
+CHANNELS = ["1", "2", "12"]
+SCALES = ["Escala", "Escala", "Escala 12 [mVpp]"]
 
 
 def main(path: Path) -> None:
     # Find dataframe
     df = data.find(
-        path,
-        __name__,
         wsname=WORKSHEET,
         cellrange=CELL_RANGE
     )
 
-    pos = df["Posición del receptor [mm]"][:-3] - 330
+    # Last rows are not measurements
+    df = df.iloc[:-3]
 
-    # Same for all
-    err_phi = useg_to_rad(phase_err)
-
-    # Separated
+    pos = df["Posición del receptor [mm]"] - 330
 
-    ampl_1 = df["Amplitud 1 [mVpp]"][:-3]
-    phase_1 = useg_to_rad(df["Fase 1 [useg]"][:-3])
-    err_ampl_1 = 0.05 * df["Escala"][:-3] + df["Error 1 [mVpp]"][:-3]
+    # Same for all
+    err_phi = useg_to_rad(phase_err, FREQ)
 
-    ampl_2 = df["Amplitud 2 [mVpp]"][:-3]
-    phase_2 = useg_to_rad(df["Fase 2 [useg]"][:-3])
-    err_ampl_2 = 0.05 * df["Escala"][:-3] + df["Error 2 [mVpp]"][:-3]
+    # Every channel at once, one column each
+    ampl = df[[f"Amplitud {c} [mVpp]" for c in CHANNELS]].to_numpy()
+    delay = df[[f"Fase {c} [useg]" for c in CHANNELS]].to_numpy()
+    err_ampl = 0.05 * df[SCALES].to_numpy() \
+        + df[[f"Error {c} [mVpp]" for c in CHANNELS]].to_numpy()
 
-    phase_1 = np.unwrap(phase_1)
-    phase_2 = np.unwrap(phase_2)
-    psi_1 = ampl_1 * np.cos(phase_1)
-    psi_2 = ampl_2 * np.cos(phase_2)
+    waves = Waves.from_delays(ampl, delay, FREQ, err_ampl, phase_err)
 
-    err_psi_1 = psi_err(ampl_1, phase_1, err_ampl_1, err_phi)
-    err_psi_2 = psi_err(ampl_2, phase_2, err_ampl_2, err_phi)
+    # Separated
 
     ROWS = 2
     COLS = 2
@@ -75,23 +61,24 @@ def main(path: Path) -> None:
     ax[0, 0].set(ylabel="Fase [rad]")
     ax[1, 0].set(ylabel="Perturbación [mVpp]")
     ax[1, 0].set(xlabel=pos.name)
-    lmbda = _
     ax[1, 1].set(xlabel=pos.name)
-    ax[0, 0].errorbar(pos, phase_1, yerr=err_phi, fmt=".")
-    ax[0, 1].errorbar(pos, phase_2, yerr=err_phi, fmt=".")
-    ax[1, 0].errorbar(pos, psi_1, yerr=err_psi_1, fmt=".")
-    ax[1, 1].errorbar(pos, psi_2, yerr=err_psi_2, fmt=".")
+
+    for col in range(COLS):
+        ax[0, col].errorbar(pos, waves.phase[:, col], yerr=err_phi, fmt=".")
+        ax[1, col].errorbar(
+            pos, waves.psi[:, col], yerr=waves.err_psi[:, col], fmt="."
+        )
 
     plot.save(path/f"plots/{__name__}-separated.png")
 
     # Superposition
 
     ROWS = 1
-    COLS = 2
+    COLS = 3
     fig, ax = plt.subplots(
         ROWS,
         COLS,
-        figsize=(12, 4)
+        figsize=(18, 4)
     )
 
     for col in range(COLS):
@@ -99,31 +86,50 @@ def main(path: Path) -> None:
         ax[col].axvline(50, color="red")
         ax[col].axvline(-50, color="green")
 
-    ampl_12 = df["Amplitud 12 [mVpp]"][:-3]
-    phase_12 = useg_to_rad(df["Fase 12 [useg]"][:-3])
-    err_ampl_12 = 0.05 * df["Escala 12 [mVpp]"][:-3] + df["Error 12 [mVpp]"][:-3]
+    psi_calc, err_psi_calc = waves[:, :2].superpose()
 
-    phase_12 = np.unwrap(phase_12)
+    # Measured superposition as a sum of the separated phasors, fitting
+    # amplitude and phase at once
+    phasor_fit = fit_phasors(waves[:, 2:], waves[:, :2])
+    predicted = phasor_fit.predict(waves[:, :2])
 
-    psi_12 = ampl_12 * np.cos(phase_12)
-    psi_calc = psi_1 + psi_2
+    # Same branch as the measured phase
+    predicted.phase += 2 * np.pi * np.round(
+        np.mean(waves.phase[:, 2] - predicted.phase) / (2 * np.pi)
+    )
 
-    err_psi_12 = psi_err(ampl_12, phase_12, err_ampl_12, err_phi)
+    data.save(
+        phasor_fit.result(),
+        path/f"results/{__name__}-phasor.csv"
+    )
 
-    err_psi_calc = np.sqrt(err_psi_1 ** 2 + err_psi_2 ** 2)
+    for col in range(COLS):
+        ax[col].set(xlabel=pos.name)
 
-    ax[0].set(xlabel=pos.name)
-    ax[1].set(xlabel=pos.name)
     ax[0].set(ylabel="Amplitud [mVpp]")
-    ax[1].set(ylabel="Perturbación [mVpp]")
+    ax[1].set(ylabel="Fase [rad]")
+    ax[2].set(ylabel="Perturbación [mVpp]")
 
-    # Amplitude only
-    ax[0].errorbar(pos, ampl_12, yerr=err_ampl_12, fmt=".")
+    ax[0].errorbar(
+        pos, waves.ampl[:, 2], yerr=waves.err_ampl[:, 2], label="Medida",
+        fmt="."
+    )
+    ax[0].plot(pos, predicted.ampl, label="Ajuste fasorial")
+
+    ax[1].errorbar(
+        pos, waves.phase[:, 2], yerr=err_phi, label="Medida", fmt="."
+    )
+    ax[1].plot(pos, predicted.phase, label="Ajuste fasorial")
 
     # psi only
-    ax[1].errorbar(pos, psi_12, yerr=err_psi_12, label="Medida", fmt=".")
-    ax[1].errorbar(pos, psi_calc, yerr=err_psi_calc, label="Superposición", fmt=".")
+    ax[2].errorbar(
+        pos, waves.psi[:, 2], yerr=waves.err_psi[:, 2], label="Medida", fmt="."
+    )
+    ax[2].errorbar(
+        pos, psi_calc, yerr=err_psi_calc, label="Superposición", fmt="."
+    )
 
-    ax[1].legend()
+    for col in range(COLS):
+        ax[col].legend()
 
     plot.save(path/f"plots/{__name__}-superpos.png")
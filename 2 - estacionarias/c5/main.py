@@ -1,4 +1,4 @@
-from common import cli_args
+from common import cli_args, batch, manifest
 from pathlib import Path
 import logging
 import sys
@@ -7,31 +7,15 @@ logger = logging.getLogger(__name__)
 
 
 def main() -> None:
-    arg = cli_args.parse(sys.argv[1:])
+    args = cli_args.parse(sys.argv[1:])
 
     # Absolute path of the directory of this script
     base_path = Path(__file__).resolve().parent
 
-    # What to do
-    match arg[0]:
-        case "m1":
-            from src import masa_1
-            masa_1.main(base_path)
+    # Analyses are declared in manifest.toml, run all if none is passed
+    outcomes = manifest.run({base_path: args or None})
 
-        case "m2":
-            from src import masa_2
-            masa_2.main(base_path)
-
-        case "m3":
-            from src import masa_3
-            masa_3.main(base_path)
-
-        # case "d1":
-        #     from src import masa_1
-        #     masa_1.main(base_path)
-
-        case _:
-            logger.error(f"Invalid argument '{arg}'.")
+    sys.exit(batch.exit_status(outcomes))
 
 
 if __name__ == "__main__":
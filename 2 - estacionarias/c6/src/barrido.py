@@ -8,6 +8,17 @@ WORKSHEET = "Extremo cerrado"
 CELL_RANGE = "A13:E36"
 
 
+def _abs_cos(x, A, k):
+    return np.abs(A * np.cos(k * x))
+
+
+# cosine
+abs_cos = fit.f.register(
+    f"{__name__}:abs_cos",
+    fit.f.Function(_abs_cos, ["A", "k"])
+)
+
+
 def main(path: Path) -> None:
     df = data.find(
         path,
@@ -23,11 +34,7 @@ def main(path: Path) -> None:
 
     error = 0.03 * ampl + 0.05 * div + ampl_err
 
-    # cosine
-    f = fit.f.Function(
-        lambda x, A, k: np.abs(A * np.cos(k * x)),
-        ["A", "k"]
-    )
+    f = abs_cos
 
     ampl_fit, (p_opt, _) = fit.utils.fitnsave(
         path/f"results/{__name__}.csv",
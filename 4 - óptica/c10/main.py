@@ -1,4 +1,4 @@
-from common import cli_args
+from common import cli_args, batch, manifest
 from pathlib import Path
 import logging
 import sys
@@ -10,22 +10,12 @@ def main() -> None:
     args = cli_args.parse(sys.argv[1:])
 
     # Absolute path of the directory of this script
-    # base_path = Path(__file__).resolve().parent
+    base_path = Path(__file__).resolve().parent
 
-    arg = args[1] if len(args) > 1 else ""
+    # Analyses are declared in manifest.toml, run all if none is passed
+    outcomes = manifest.run({base_path: args or None})
 
-    # What to do
-    match args[0]:
-        case "lente":
-            from src import lente
-            lente.main(arg)
-
-        case "amp":
-            from src import amp
-            amp.main(arg)
-
-        case _:
-            logger.error("Invalid argument")
+    sys.exit(batch.exit_status(outcomes))
 
 
 if __name__ == "__main__":
@@ -21,17 +21,21 @@ def main(args: list[str]) -> None:
         cellrange=CELL_RANGE
     )
 
-    lente = df["Posición la lente [mm]"]
-    obj = 40 - lente
+    cols = data.columns(df)
 
-    img = df["Posición de la pantalla [mm]"]
-    img -= lente
+    lente = cols["Posición la lente"]
+    pantalla = cols["Posición de la pantalla"]
 
-    # Multiply by 1000 to convert 1/mm -> 1/m
-    inv_obj = 1000 / obj
-    inv_img = 1000 / img
+    # Distances in m
+    to_m = data.scale(lente.unit, "m")
 
-    indirect_err = 1000 * ERR_IMG / img ** 2
+    obj = (40 - lente) * to_m
+    img = (pantalla - lente) * to_m
+
+    inv_obj = 1 / obj
+    inv_img = 1 / img
+
+    indirect_err = ERR_IMG * to_m / img ** 2
 
     fit_func = fit.utils.fitnsave(
         fit.f.linear,
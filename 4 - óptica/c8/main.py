@@ -1,4 +1,4 @@
-from common import cli_args
+from common import cli_args, batch, manifest
 from pathlib import Path
 import logging
 import sys
@@ -12,20 +12,10 @@ def main() -> None:
     # Absolute path of the directory of this script
     base_path = Path(__file__).resolve().parent
 
-    arg = args[1] if len(args) > 1 else ""
+    # Analyses are declared in manifest.toml, run all if none is passed
+    outcomes = manifest.run({base_path: args or None})
 
-    # What to do
-    match args[0]:
-        case "pol":
-            from src import pol
-            pol.main(base_path, arg)
-
-        case "haz":
-            from src import haz
-            haz.main(base_path, arg)
-
-        case _:
-            logger.error("Invalid argument")
+    sys.exit(batch.exit_status(outcomes))
 
 
 if __name__ == "__main__":
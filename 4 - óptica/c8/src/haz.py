@@ -1,4 +1,5 @@
 from common import fit
+from functools import partial
 from scipy.special import erf
 import numpy as np
 
@@ -8,23 +9,32 @@ A52 = 35193.929024 / (2 * 38424)
 A37 = 40826.839434 / (2 * 38424)
 
 
+def _erf(A, x, x_0, w):
+    return A * (1 - erf(np.sqrt(2) * (x - x_0) / w))
+
+
 def erf_gen(A):
     return fit.f.Function(
-        lambda x, x_0, w:
-            A * (1 - erf(np.sqrt(2) * (x - x_0) / w)),
-        ["x_0", "w"]
+        partial(_erf, A),
+        ["x_0", "w"],
+        guess=fit.guess.erf
     )
 
 
+# Registered so they can be pickled and referenced by name
+erf_52 = fit.f.register(f"{__name__}:erf_52", erf_gen(A52))
+erf_37 = fit.f.register(f"{__name__}:erf_37", erf_gen(A37))
+
+
 def main(path, args: list[str]) -> None:
     match args:
         case "1":
             from src import haz_52
-            haz_52.main(erf_gen(A52))
+            haz_52.main(erf_52)
 
         case "2":
             from src import haz_37
-            haz_37.main(erf_gen(A37))
+            haz_37.main(erf_37)
 
         case "comp":
             from src import haz_comparacion
@@ -33,5 +33,5 @@ def main(erf) -> None:
         volt,
         error,
         fit_found,
-        residue_units=(1000, "mVpp")
+        residue_units="mV"
     )
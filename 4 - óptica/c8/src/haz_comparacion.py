@@ -1,52 +1,64 @@
-from common import plot
+from common import beam, data, plot
 from pathlib import Path
 import pandas as pd
 import numpy as np
+from src import haz
 
 A37 = 40826.839434 / 38424
 A52 = 35193.929024 / 38424
 
+# Distance of every scan [mm], its data and its amplitude
+SCANS = [
+    (370, "haz_37", haz.A37),
+    (520, "haz_52", haz.A52),
+]
+
 # Separación: 2 w sqrt(1/2 ln(2))
+FWHM = 2 * np.sqrt(1/2 * np.log(2))
 
 
 def gaussiana(x, a, w):
     return np.sqrt(2 / np.pi) * a / (w ** 2) * np.exp(-2 * (x / w) ** 2)
 
 
-def calc_div(w):
-    # From formula
-    sep = 2 * w * np.sqrt(1/2 * np.log(2))
-
-    var = np.abs(np.diff(sep)[0]) / 2
-    dx = 520 - 370
-
-    angle = 2 * np.arctan(var / dx) * 180 / np.pi
+def calc_div(theta, theta_err):
+    # Full angle between the half maximum points, from the half angle of w.
+    # Keeps the sign of theta, negative if the beam converges
+    half = FWHM / 2
 
-    return angle
+    angle = 2 * np.arctan(half * theta) * 180 / np.pi
+    angle_err = 2 * half / (1 + (half * theta) ** 2) * theta_err * 180 / np.pi
 
+    return angle, angle_err
 
-def read_entries(entries):
-    avgs = []
-    errs = []
 
-    for entry in entries:
-        entry_as_list = entry.split("+-")
-
-        avgs.append(float(entry_as_list[0]))
-        errs.append(float(entry_as_list[1]))
+def main(path: Path) -> None:
+    dfs = [pd.read_csv(path/f"data/{name}.csv") for _, name, _ in SCANS]
+
+    # Every scan at once, sharing w(z)
+    beam_fit = beam.fit_scans(
+        [z for z, _, _ in SCANS],
+        [df["Posición [mm]"] for df in dfs],
+        [df["Voltaje [V]"] for df in dfs],
+        yerr=[df["Error intens"] for df in dfs],
+        A=[a for _, _, a in SCANS],
+        model="linear"
+    )
 
-    return np.array(avgs), np.array(errs)
+    data.save(
+        beam_fit.result(),
+        path/"results/haz_comparacion.csv"
+    )
 
+    angle, angle_err = calc_div(beam_fit.theta, beam_fit.err_theta)
 
-def main(path: Path) -> None:
-    results = [
-        pd.read_csv(path/"results/haz_37.csv"),
-        pd.read_csv(path/"results/haz_52.csv"),
-    ]
+    if beam_fit.converging:
+        print(f"El haz converge: el ángulo es {angle} ± {angle_err} deg.")
 
-    w_entries = [result["w"][0] for result in results]
+    else:
+        print(f"El ángulo de divergencia es {angle} ± {angle_err} deg.")
 
-    w, w_err = read_entries(w_entries)
+    w = beam_fit.w([z for z, _, _ in SCANS])
 
     x = np.linspace(-1, 1, 100000)
     y = [
@@ -54,8 +66,6 @@ def main(path: Path) -> None:
         gaussiana(x, A52, w[1])
     ]
 
-    print(f"El ángulo de divergencia es {calc_div(w)} deg.")
-
     plot.data(
         x, y, None,
         xlabel="Punto en el haz [mm]",
@@ -1,6 +1,5 @@
-from common import data
+from common import data, polar
 from pathlib import Path
-import numpy as np
 
 CELL_RANGE = "A2:G21"
 WORKSHEET = "DETECTOR"
@@ -13,7 +12,7 @@ def main(path: Path, args: list[str]) -> None:
         cellrange=CELL_RANGE
     )
 
-    angle = df["Ángulo rotado [deg]"] * np.pi / 180
+    angle = polar.deg_to_rad(df["Ángulo rotado [deg]"])
     volt = df["Voltaje [V]"]
     error = df["Error [V]"]
 
@@ -28,6 +27,16 @@ def main(path: Path, args: list[str]) -> None:
             from src import pol_fit
             pol_fit.main(cos2_result, angle, volt, error)
 
+        case "malus":
+            from src import pol_malus
+            pol_malus.main(
+                angle,
+                volt,
+                error,
+                df["Intensidad [lx]"],
+                df["Error [lx]"]
+            )
+
         case "slider":
             from src import pol_slider
             pol_slider.main(angle, volt, error)
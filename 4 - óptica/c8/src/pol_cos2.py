@@ -5,15 +5,11 @@ THETA_ERROR = 1 * np.pi / 180
 
 
 def main(angle, volt, error) -> None:
-
-    # V -> mV
-    volt *= 1000
-
     volt_fit = fit.utils.fitnsave(
         fit.f.cos_sq,
         angle,
         volt,
-        p0=[0, 1000, 1, -10 * np.pi / 180],
+        p0=[0, 1, 1, -10 * np.pi / 180],
         yerr=error
     )
 
@@ -23,5 +19,5 @@ def main(angle, volt, error) -> None:
         (THETA_ERROR, error),
         volt_fit,
         xlabel="ángulo del analizador [rad]",
-        ylabel="Voltaje [mV]",
+        units="mV",
     )
@@ -0,0 +1,55 @@
+from common import data, plot, polarization
+import matplotlib.pyplot as plt
+import numpy as np
+
+THETA_ERROR = 1 * np.pi / 180
+
+
+def main(angle, volt, volt_error, intensity, intensity_error) -> None:
+    # Malus law and calibration at once, no intermediate results
+    malus = polarization.fit_malus(
+        angle,
+        volt,
+        intensity,
+        volt_err=volt_error,
+        intensity_err=intensity_error,
+        theta_err=THETA_ERROR
+    )
+
+    data.save(malus.result())
+
+    fig, ax = plt.subplots(
+        1,
+        2,
+        figsize=(12, 5)
+    )
+
+    theta = np.linspace(angle.min(), angle.max(), 1000)
+
+    ax[0].errorbar(
+        angle, volt, xerr=THETA_ERROR, yerr=volt_error, fmt=".",
+        label="Mediciones"
+    )
+    ax[0].plot(theta, malus.volt(theta), label="Ajuste")
+    ax[0].set(xlabel="ángulo del analizador [rad]", ylabel="Voltaje [V]")
+
+    calibrated, calibrated_err = malus.intensity(malus.volt(theta))
+
+    ax[1].errorbar(
+        volt, intensity, xerr=volt_error, yerr=intensity_error, fmt=".",
+        label="Mediciones"
+    )
+    ax[1].plot(malus.volt(theta), calibrated, label="Calibración")
+    ax[1].fill_between(
+        malus.volt(theta),
+        calibrated - calibrated_err,
+        calibrated + calibrated_err,
+        alpha=0.3
+    )
+    ax[1].set(xlabel="Tensión medida [V]", ylabel="Intensidad [lx]")
+
+    for a in ax:
+        a.grid(True)
+        a.legend()
+
+    plot.save()
@@ -1,42 +1,24 @@
-from common import plot
-import matplotlib.pyplot as plt
-import numpy as np
-
-
-def slider_update(line, fig, angles, val):
-    line.set_ydata(np.cos(angles - val) ** 2)
-    fig.canvas.draw_idle()
+from common import data, fit, plot
 
 
 def main(angle, volt, error) -> None:
-    fig, ax = plt.subplots(
-        figsize=(8, 6)
-    )
-
-    line, = ax.plot(
-        angle,
-        np.cos(angle) ** 2,
-        'o'
-    )
-
-    ax.plot(
+    # Move the sliders until the curve is close, then fit from there
+    explorer = plot.explore(
+        fit.f.cos_sq,
         angle,
         volt,
-        '.'
+        error,
+        xlabel="Ángulo rotado [rad]",
+        ylabel="Voltaje [V]"
     )
 
-    ax_slider = fig.add_axes([0.25, 0.1, 0.65, 0.03])
+    result = {}
 
-    slider = plot.Slider(
-        ax=ax_slider,
-        label="Slider",
-        valmin=0,
-        valmax=2 * np.pi,
-        valinit=0
-    )
+    for i, param in enumerate(fit.f.cos_sq.params):
+        result[param] = [explorer.p[i]]
 
-    slider.on_changed(
-        lambda val: slider_update(line, fig, angle, val)
-    )
+        # Only if it was fitted
+        if explorer.p_err is not None:
+            result[f"Error {param}"] = [explorer.p_err[i]]
 
-    plot.save()
+    data.save(result)
@@ -0,0 +1,49 @@
+from common import cli_args, batch, manifest, report
+from pathlib import Path
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+USAGE = "Usage: python -m common [options] <course>[:<analysis>,...] ..." \
+    " | <report>"
+
+
+def main() -> None:
+    args = cli_args.parse(sys.argv[1:])
+
+    if not args:
+        print(USAGE)
+        sys.exit(2)
+
+    # Report directories stand for the courses in them
+    reports = [
+        Path(arg).resolve() for arg in args if report.is_report(Path(arg))
+    ]
+    courses = manifest.targets([
+        arg for arg in args if not report.is_report(Path(arg))
+    ])
+
+    for path in reports:
+        for course, names in report.Report(path).courses.items():
+            if course not in courses:
+                courses[course] = names
+
+            elif names is None or courses[course] is None:
+                courses[course] = None
+
+            else:
+                courses[course] = courses[course] + names
+
+    # Analyses of every course are declared in its manifest.toml
+    outcomes = manifest.run(courses)
+
+    if not manifest.opt_plan:
+        for path in reports:
+            report.build(path)
+
+    sys.exit(batch.exit_status(outcomes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import logging
+import time
+import matplotlib.pyplot as plt
+from common import fit
+
+# batch
+logger = logging.getLogger(__name__)
+
+
+class Outcome:
+    """
+    Result of running one analysis: whether it finished, how long it took,
+    the status of every fit it did and the error that stopped it, if any.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        seconds: float,
+        fits: list[fit.utils.FitStatus],
+        error: str = None
+    ):
+        self.name = name
+        self.seconds = seconds
+        self.fits = fits
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and all(s.converged for s in self.fits)
+
+
+def run_one(name: str, task) -> Outcome:
+    """
+    Run `task()`, catching anything that goes wrong.
+    """
+
+    logger.info(f"Running '{name}'.")
+
+    n_fits = len(fit.utils.history)
+    start = time.perf_counter()
+    error = None
+
+    try:
+        task()
+
+    # Scripts may still call sys.exit()
+    except (Exception, SystemExit) as e:
+        error = f"{type(e).__name__}: {e}"
+
+        logger.error(f"'{name}' failed. {error}")
+        logger.debug("Traceback:", exc_info=True)
+
+        # Don't leave half drawn figures for the next analysis
+        plt.close("all")
+
+    return Outcome(
+        name,
+        time.perf_counter() - start,
+        fit.utils.history[n_fits:],
+        error
+    )
+
+
+def run(tasks: dict) -> list[Outcome]:
+    """
+    Run every analysis in `tasks` ({ name: callable }), even if some fail.
+    A summary is printed when running more than one or something failed.
+    """
+
+    outcomes = [run_one(name, task) for name, task in tasks.items()]
+
+    if len(outcomes) > 1 or not all(o.ok for o in outcomes):
+        summary(outcomes)
+
+    return outcomes
+
+
+def summary(outcomes: list[Outcome]) -> None:
+    """
+    Print a table with the outcome of each analysis.
+    """
+
+    header = f"{'Analysis':<24} {'Status':<8} {'Time [s]':>9} {'Fits':>5}" \
+        f" {'Failed':>7} {'nfev':>6} {'Cost':>12}  Message"
+
+    print("Summary:")
+    print(header)
+    print("-" * len(header))
+
+    for o in outcomes:
+        failed = [s for s in o.fits if not s.converged]
+        nfev = sum(s.nfev for s in o.fits if s.nfev is not None)
+        cost = sum(s.cost for s in o.fits if s.cost is not None)
+
+        if o.error is not None:
+            status, message = "ERROR", o.error
+
+        elif failed:
+            status, message = "BAD FIT", failed[0].message
+
+        else:
+            status, message = "ok", ""
+
+        print(
+            f"{o.name:<24} {status:<8} {o.seconds:>9.3f} {len(o.fits):>5}"
+            f" {len(failed):>7} {nfev:>6} {cost:>12.4g}  {message.strip()}"
+        )
+
+
+def exit_status(outcomes: list[Outcome]) -> int:
+    """
+    Exit status for the program: 1 if any analysis raised an error.
+    """
+
+    return 0 if all(o.error is None for o in outcomes) else 1
@@ -0,0 +1,265 @@
+import logging
+import numpy as np
+from scipy.special import erf
+from common import fit
+
+# beam
+logger = logging.getLogger(__name__)
+
+# Knife-edge scans of a gaussian beam at several distances z, fitted at once.
+# Each scan is y = A (1 - erf(sqrt(2) (x - x_0) / w(z))), with its own edge
+# position x_0 (and A, unless known), and the radius w(z) shared by all:
+#
+#   "gaussian": w(z) = sqrt(w_0^2 + theta^2 (z - z_0)^2)
+#   "linear":   w(z) = w_1 + theta (z - z_1), z_1 the first distance
+#
+# theta is the divergence (half angle, in radians if x and z have the same
+# units). It is a parameter of the fit, so its error accounts for the
+# correlations with every other parameter. In the "linear" model it keeps its
+# sign: a negative theta means the beam converges between the scans.
+
+MODELS = {
+    "gaussian": ["w_0", "theta", "z_0"],
+    "linear": ["w_1", "theta"],
+}
+
+
+def _width(model: str, z, z_1: float, params) -> tuple[np.ndarray, list]:
+    """
+    w(z) and its derivatives with respect to `params`.
+    """
+
+    match model:
+        case "gaussian":
+            w_0, theta, z_0 = params
+            dz = z - z_0
+            w = np.sqrt(w_0 ** 2 + (theta * dz) ** 2)
+
+            return w, [w_0 / w, theta * dz ** 2 / w, -theta ** 2 * dz / w]
+
+        case "linear":
+            w_1, theta = params
+            dz = z - z_1
+
+            return w_1 + theta * dz, [np.ones_like(dz), dz]
+
+    raise ValueError(f"Unknown model '{model}', use one of {list(MODELS)}.")
+
+
+class BeamFit:
+    """
+    Result of `fit_scans()`: the parameters of w(z) and those of every
+    scan, with their errors, and the status of the fit.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        z: np.ndarray,
+        p_opt: np.ndarray,
+        p_err: np.ndarray,
+        names: list[str],
+        status: fit.utils.FitStatus
+    ):
+        self.model = model
+        self.z = z
+        self.values = dict(zip(names, p_opt))
+        self.errors = dict(zip(names, p_err))
+        self.status = status
+
+        n = len(MODELS[model])
+        self.beam_params = p_opt[:n]
+
+    @property
+    def theta(self) -> float:
+        return self.values["theta"]
+
+    @property
+    def err_theta(self) -> float:
+        return self.errors["theta"]
+
+    @property
+    def converging(self) -> bool:
+        """
+        Whether the beam narrows with z, i.e. theta < 0 ("linear" model).
+        """
+
+        return self.theta < 0
+
+    def w(self, z) -> np.ndarray:
+        """
+        Fitted radius of the beam at `z`.
+        """
+
+        return _width(self.model, np.asarray(z, dtype=float), self.z[0],
+                      self.beam_params)[0]
+
+    def x_0(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Edge position of every scan and its error.
+        """
+
+        names = [f"x_0_{i}" for i in range(self.z.size)]
+
+        return (
+            np.array([self.values[n] for n in names]),
+            np.array([self.errors[n] for n in names]),
+        )
+
+    def result(self) -> list[dict]:
+        """
+        Every parameter in "avg+-err" notation, like `fit.utils.result`.
+        """
+
+        return [{
+            p: f"{self.values[p]}+-{self.errors[p]}" for p in self.values
+        }]
+
+
+def fit_scans(
+    z,
+    x: list,
+    y: list,
+    yerr: list = None,
+    A: list[float] = None,
+    model: str = "gaussian"
+) -> BeamFit:
+    """
+    Fit every knife-edge scan at once. Scan `i` is `(x[i], y[i])`, with
+    errors `yerr[i]`, measured at distance `z[i]`. If `A` is given, the
+    amplitude of each scan is known and not fitted. The "gaussian" model needs
+    at least three distances, "linear" two.
+
+    All scans are evaluated together in one vectorized model, with an
+    analytic jacobian. Initial parameters come from a guess for every scan
+    (`fit.guess.erf`) and a fit of w(z) to their widths.
+    """
+
+    z = np.asarray(z, dtype=float)
+    n_scans = z.size
+
+    if len(x) != n_scans or len(y) != n_scans:
+        raise ValueError("Need one x and one y for every distance.")
+
+    beam_params = MODELS.get(model)
+
+    if beam_params is None:
+        raise ValueError(f"Unknown model '{model}', use one of {list(MODELS)}.")
+
+    if np.unique(z).size < len(beam_params):
+        raise ValueError(
+            f"The '{model}' model needs at least {len(beam_params)} distances."
+        )
+
+    sizes = [np.size(xs) for xs in x]
+
+    # Flat arrays of every point, and the scan each belongs to
+    scan = np.repeat(np.arange(n_scans), sizes)
+    z_all = z[scan]
+    x_all = np.concatenate([np.asarray(xs, dtype=float) for xs in x])
+    y_all = np.concatenate([np.asarray(ys, dtype=float) for ys in y])
+
+    yerr_all = None if yerr is None else np.concatenate([
+        np.broadcast_to(np.asarray(e, dtype=float), (size,))
+        for e, size in zip(yerr, sizes)
+    ])
+
+    fit_A = A is None
+    known_A = None if fit_A else np.asarray(A, dtype=float)[scan]
+
+    names = beam_params + [f"x_0_{i}" for i in range(n_scans)]
+    if fit_A:
+        names += [f"A_{i}" for i in range(n_scans)]
+
+    n = len(beam_params)
+
+    def unpack(params):
+        params = np.asarray(params)
+
+        amplitude = params[n + n_scans:][scan] if fit_A else known_A
+
+        return params[:n], params[n:n + n_scans][scan], amplitude
+
+    def func(x, *params):
+        beam, x_0, amplitude = unpack(params)
+        w = _width(model, z_all, z[0], beam)[0]
+
+        return amplitude * (1 - erf(np.sqrt(2) * (x - x_0) / w))
+
+    def jac(x, *params):
+        beam, x_0, amplitude = unpack(params)
+        w, dw = _width(model, z_all, z[0], beam)
+
+        u = np.sqrt(2) * (x - x_0) / w
+
+        # dy/du, and du/dw = -u / w, du/dx_0 = -sqrt(2) / w
+        dy_du = -amplitude * 2 / np.sqrt(np.pi) * np.exp(-u ** 2)
+
+        columns = np.zeros((x.size, len(names)))
+
+        for i, d in enumerate(dw):
+            columns[:, i] = dy_du * (-u / w) * d
+
+        rows = np.arange(x.size)
+        columns[rows, n + scan] = dy_du * (-np.sqrt(2) / w)
+
+        if fit_A:
+            columns[rows, n + n_scans + scan] = 1 - erf(u)
+
+        return columns
+
+    # Every scan on its own first
+    guesses = np.array([
+        fit.guess.erf(xs, ys) for xs, ys in zip(x, y)
+    ])
+
+    x_0, widths = guesses.T
+    widths = np.abs(widths)
+
+    match model:
+        case "gaussian":
+            waist = np.argmin(widths)
+            slope = np.polyfit((z - z[waist]) ** 2, widths ** 2, 1)[0]
+
+            p0 = [widths[waist], np.sqrt(max(slope, 0.0)), z[waist]]
+
+        case "linear":
+            slope, intercept = np.polyfit(z, widths, 1)
+
+            p0 = [intercept + slope * z[0], slope]
+
+    p0 = list(p0) + list(x_0)
+
+    if fit_A:
+        p0 += [np.max(ys) / 2 for ys in y]
+
+    lower = [-np.inf] * len(names)
+    upper = [np.inf] * len(names)
+
+    if model == "gaussian":
+        # w_0 and theta are positive
+        lower[0] = lower[1] = 0
+
+    joint = fit.f.Function(func, names, jac=jac, bounds=(lower, upper))
+
+    p_opt, p_err, status = fit.utils.find(
+        joint,
+        x_all,
+        y_all,
+        p0=p0,
+        yerr=yerr_all,
+        bounds=joint.bounds,
+        full_output=True
+    )
+
+    logger.info(
+        f"Divergence {p_opt[1]} +- {p_err[1]} from {n_scans} scans."
+    )
+
+    if p_opt[1] < 0:
+        logger.warning(
+            f"Negative divergence {p_opt[1]} +- {p_err[1]}: the beam converges"
+            " between the scans."
+        )
+
+    return BeamFit(model, z, p_opt, p_err, names, status)
@@ -1,14 +1,14 @@
 import sys
 import getopt
 import logging
-from common import data, plot, fit
+from common import data, plot, fit, perf, schedule, watch, manifest, sheets
 
 logger = logging.getLogger(__name__)
 
 
 def parse(argv: list[str]) -> list[str]:
     try:
-        opts, args = getopt.getopt(argv, "pvRl:dr")
+        opts, args = getopt.getopt(argv, "pvRl:drPC:Tj:FWnS:J:", ["watch"])
 
     except getopt.GetoptError as err:
         logger.error(err)
@@ -24,7 +24,7 @@ def parse(argv: list[str]) -> list[str]:
             case "-v":
                 logging.basicConfig(level=logging.INFO)
 
-            # Regenerate data from Google Sheets
+            # Regenerate data from the sheets (see "-S")
             case "-R":
                 data.opt_regen_sheets = True
 
@@ -40,6 +40,42 @@ def parse(argv: list[str]) -> list[str]:
             case "-r":
                 fit.utils.opt_show_result = True
 
+            # Time each stage and show a breakdown at exit
+            case "-P":
+                perf.enable()
+
+            # Same as "-P", also dump cProfile stats to a file
+            case "-C":
+                perf.enable(dump=arg)
+
+            # Record model evaluations of each fit in its results
+            case "-T":
+                fit.f.opt_trace = True
+
+            # Number of analyses run at the same time by the scheduler
+            case "-j":
+                schedule.opt_jobs = int(arg)
+
+            # Run every analysis, even if nothing changed
+            case "-F":
+                schedule.opt_force = True
+
+            # Keep running and rerun analyses when files change
+            case "-W" | "--watch":
+                watch.opt_watch = True
+
+            # Only show what would be fetched and run
+            case "-n":
+                manifest.opt_plan = True
+
+            # Where to fetch data from: "google" or "local"
+            case "-S":
+                sheets.opt_backend = arg
+
+            # Number of documents fetched at the same time
+            case "-J":
+                sheets.opt_fetch_jobs = int(arg)
+
             # Default
             case _:
                 logger.error("Invalid argument.")
@@ -1,7 +1,8 @@
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import logging
-from common import utils
+from common import utils, perf
 
 # data
 logger = logging.getLogger(__name__)
@@ -11,29 +12,127 @@ DATA_DIR = "data"
 opt_regen_sheets = False
 opt_show_dataframe = False
 
-
+# Units found in column headers, e.g. "Amplitud [mVpp]": the base unit of
+# each and the factor to convert to it
+UNITS = {
+    "m": ("m", 1.0),
+    "cm": ("m", 1e-2),
+    "mm": ("m", 1e-3),
+    "μm": ("m", 1e-6),
+    "um": ("m", 1e-6),
+    "nm": ("m", 1e-9),
+    "1/m": ("1/m", 1.0),
+    "1/mm": ("1/m", 1e3),
+    "m^2": ("m^2", 1.0),
+    "mm^2": ("m^2", 1e-6),
+    "V": ("V", 1.0),
+    "mV": ("V", 1e-3),
+    "Vpp": ("Vpp", 1.0),
+    "mVpp": ("Vpp", 1e-3),
+    "s": ("s", 1.0),
+    "seg": ("s", 1.0),
+    "ms": ("s", 1e-3),
+    "mseg": ("s", 1e-3),
+    "us": ("s", 1e-6),
+    "μs": ("s", 1e-6),
+    "useg": ("s", 1e-6),
+    "μseg": ("s", 1e-6),
+    "Hz": ("Hz", 1.0),
+    "kHz": ("Hz", 1e3),
+    "MHz": ("Hz", 1e6),
+    "rad": ("rad", 1.0),
+    "deg": ("rad", np.pi / 180),
+    "°": ("rad", np.pi / 180),
+    "lx": ("lx", 1.0),
+}
+
+
+@perf.stage("sheet fetch")
 def generate(
     path: Path | str,
     worksheet: str,
     cellrange: str
 ) -> pd.DataFrame:
     """
-    Generate and save dataframe from Google Sheets
+    Generate and save dataframe from the spreadsheet of the course (Google
+    Sheets, unless another backend was chosen, see `sheets.opt_backend`)
     """
 
-    logger.warning("Fetching Google Sheets.")
-
     from common import sheets
 
-    ws = sheets.open_sheet(path).worksheet(worksheet)
+    logger.warning(f"Fetching sheets ({sheets.opt_backend}).")
+
+    document = sheets.open_sheet(path)
 
     logger.info("Creating dataframe.")
 
-    # Need to test ws.get_all_records
-    df = sheets.get_dataframe(
-        ws,
-        cellrange=cellrange
-    ).dropna().astype(float)
+    df = document.dataframe(worksheet, cellrange)
+
+    return _clean(df)
+
+
+def generate_many(
+    path: Path,
+    requests: dict[str, tuple[str, str]]
+) -> None:
+    """
+    Fetch several ranges of the spreadsheet of `path` (in a single request,
+    for Google Sheets) and save them in "path/data/". `requests` is
+    `{ stem: (worksheet, cellrange) }`.
+    """
+
+    error = generate_all({path: requests}).get(path)
+
+    if error is not None:
+        raise error
+
+
+@perf.stage("sheet fetch")
+def generate_all(
+    requests: dict[Path, dict[str, tuple[str, str]]]
+) -> dict[Path, Exception]:
+    """
+    Same as `generate_many()` for the documents of several courses, fetched
+    concurrently (see `sheets.fetch_many()`). `requests` is
+    `{ course: { stem: (worksheet, cellrange) } }`. Returns the error of
+    every course that could not be fetched.
+    """
+
+    from common import sheets
+
+    logger.warning(
+        f"Fetching {sum(len(r) for r in requests.values())} ranges from "
+        f"{len(requests)} sheets ({sheets.opt_backend})."
+    )
+
+    results = sheets.fetch_many({
+        path: list(course_requests.values())
+        for path, course_requests in requests.items()
+    })
+
+    errors = {}
+
+    for path, dfs in results.items():
+        if isinstance(dfs, Exception):
+            errors[path] = dfs
+            continue
+
+        for stem, df in zip(requests[path], dfs):
+            csv_file = path / DATA_DIR / f"{stem}.csv"
+
+            logger.info(f"Saving '{csv_file}'.")
+            _clean(df).to_csv(csv_file, index=False)
+
+    return errors
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop incomplete rows and sort by the first column. Dataframes from
+    `sheets` are numbers already.
+    """
+
+    df = df.dropna()
 
     df.sort_values(
         df.columns[0],
@@ -43,6 +142,124 @@ def generate(
     return df
 
 
+def parse_label(label: str) -> tuple[str, str | None]:
+    """
+    Split a column header into name and units: "Amplitud [mVpp]" gives
+    ("Amplitud", "mVpp"). Units are always enclosed by "[]" at the end;
+    without them, units are None.
+    """
+
+    label = str(label).strip()
+
+    if label.endswith("]") and " [" in label:
+        name, unit = label[:-1].rsplit(" [", 1)
+        return name, unit
+
+    return label, None
+
+
+def scale(unit: str, to: str) -> float:
+    """
+    Factor that converts values in `unit` to `to`.
+    """
+
+    if unit == to:
+        return 1.0
+
+    if unit not in UNITS or to not in UNITS:
+        raise ValueError(f"Unknown units: '{unit}' or '{to}'.")
+
+    base, factor = UNITS[unit]
+    to_base, to_factor = UNITS[to]
+
+    if base != to_base:
+        raise ValueError(f"Can't convert '{unit}' to '{to}'.")
+
+    return factor / to_factor
+
+
+class Column(np.ndarray):
+    """
+    Array of values of a column, tagged with its name and units, as parsed
+    from the header. Indexing and slicing keep the tags; any other operation
+    gives a plain array, since it may change the units (use `to()` to
+    convert them).
+    """
+
+    def __new__(cls, values, name: str = None, unit: str = None):
+        col = np.asarray(values, dtype=float).view(cls)
+        col.name = name
+        col.unit = unit
+
+        return col
+
+    def __array_finalize__(self, obj):
+        self.name = getattr(obj, "name", None)
+        self.unit = getattr(obj, "unit", None)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [
+            x.view(np.ndarray) if isinstance(x, Column) else x for x in inputs
+        ]
+
+        if "out" in kwargs:
+            kwargs["out"] = tuple(
+                x.view(np.ndarray) if isinstance(x, Column) else x
+                for x in kwargs["out"]
+            )
+
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __reduce__(self):
+        # Pickle the tags too
+        rebuild, args, state = super().__reduce__()
+
+        return rebuild, args, (state, self.name, self.unit)
+
+    def __setstate__(self, state):
+        state, self.name, self.unit = state
+        super().__setstate__(state)
+
+    @property
+    def label(self) -> str:
+        """
+        Header of the column, for axis labels and result files.
+        """
+
+        if self.unit is None:
+            return self.name
+
+        return f"{self.name} [{self.unit}]"
+
+    def to(self, unit: str) -> "Column":
+        """
+        Values in `unit`, tagged with it. Shares the values if there is
+        nothing to convert, e.g. from "seg" to "s".
+        """
+
+        factor = scale(self.unit, unit)
+
+        if factor == 1.0:
+            return Column(self.view(np.ndarray), self.name, unit)
+
+        return Column(self.view(np.ndarray) * factor, self.name, unit)
+
+
+def columns(df: pd.DataFrame) -> dict[str, Column]:
+    """
+    Every column of `df` as a `Column`, by name without units: the column
+    "Amplitud [mVpp]" is `columns(df)["Amplitud"]`, in mVpp.
+    """
+
+    cols = {}
+
+    for header in df.columns:
+        name, unit = parse_label(header)
+        cols[name] = Column(df[header].to_numpy(dtype=float), name, unit)
+
+    return cols
+
+
 def find(
     # path: Path,             # e.g. "exp1"
     # name: str,              # Usually __name__
@@ -93,7 +310,8 @@ def find(
 
     # Using the generated df does not work for some reason.
     logger.info(f"Reading '{csv_file}'.")
-    df = pd.read_csv(csv_file)
+    with perf.stage("csv read"):
+        df = pd.read_csv(csv_file)
 
     if opt_show_dataframe:
         print(f"Showing '{name}' dataframe:")
@@ -102,6 +320,14 @@ def find(
     return df
 
 
+def _header(key: str, value) -> str:
+    if isinstance(value, Column) and value.unit is not None \
+            and parse_label(key)[1] is None:
+        return f"{key} [{value.unit}]"
+
+    return key
+
+
 def save(
     data: dict,
     filename: Path | str = None,
@@ -112,6 +338,12 @@ def save(
     Simple wrapper to save results.
     """
 
+    # Columns with units get them in their header
+    if isinstance(data, dict):
+        data = {
+            _header(key, value): value for key, value in data.items()
+        }
+
     # Convert dictionary to dataframe
     df = pd.DataFrame(data)
 
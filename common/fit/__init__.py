@@ -1 +1 @@
-from common.fit import f, utils
+from common.fit import f, gof, guess, utils
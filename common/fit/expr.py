@@ -0,0 +1,122 @@
+import logging
+import re
+import numpy as np
+import scipy
+import sympy as sp
+from sympy.printing.numpy import SciPyPrinter
+
+# expr
+logger = logging.getLogger(__name__)
+
+
+def _source(
+    name: str,
+    args: list[sp.Symbol],
+    exprs: list[sp.Expr],
+    printer: SciPyPrinter,
+    jacobian: bool
+) -> str:
+    """
+    Python source of a function evaluating `exprs`, with common
+    subexpressions computed only once.
+    """
+
+    replacements, reduced = sp.cse(exprs, symbols=sp.numbered_symbols("_c"))
+
+    lines = [f"def {name}({', '.join(str(arg) for arg in args)}):"]
+
+    for symbol, sub_expr in replacements:
+        lines.append(f"    {symbol} = {printer.doprint(sub_expr)}")
+
+    if not jacobian:
+        lines.append(f"    return {printer.doprint(reduced[0])}")
+
+    else:
+        # Constant derivatives have to be broadcast to the shape of x
+        columns = ", ".join(printer.doprint(col) for col in reduced)
+        lines.append(
+            f"    return numpy.stack(numpy.broadcast_arrays({args[0]}, "
+            f"{columns})[1:], axis=-1)"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def _compile(name: str, source: str):
+    logger.info(f"Compiled '{name}':\n{source}")
+
+    namespace = {"numpy": np, "scipy": scipy}
+    exec(compile(source, f"<{name}>", "exec"), namespace)
+
+    return namespace[name]
+
+
+def build(
+    expr: str | sp.Expr,
+    var: str,
+    params: list[str],
+    name: str = "model",
+    **kwargs
+) -> "f.Function":
+    """
+    Build a `Function` from a symbolic expression of the variable `var` and
+    the parameters `params`, e.g.
+
+        build("A / ((w_0**2 - w**2)**2 + (gamma * w)**2)", "w",
+              ["w_0", "gamma", "A"])
+
+    The evaluator, its analytic jacobian and the LaTeX formula are all
+    generated from `expr`, so they can't drift apart. Repeated subexpressions
+    are evaluated only once per call. Other arguments of `Function` (e.g.
+    `inplace`, `bounds` or `guess`) are passed in `kwargs`.
+    """
+
+    # `fit.f` builds its models with this module
+    from . import f
+
+    # Generated code uses these instead of the names, which may not be valid
+    # identifiers (e.g. "lambda")
+    symbols = {
+        p: sp.Symbol(f"_p{i}", real=True) for i, p in enumerate([var] + params)
+    }
+
+    if isinstance(expr, str):
+        for p, symbol in symbols.items():
+            expr = re.sub(rf"\b{re.escape(p)}\b", symbol.name, expr)
+
+        expr = sp.parse_expr(
+            expr,
+            local_dict={symbol.name: symbol for symbol in symbols.values()}
+        )
+
+    else:
+        expr = expr.subs({
+            s: symbols[s.name] for s in expr.free_symbols if s.name in symbols
+        })
+
+    args = list(symbols.values())
+    printer = SciPyPrinter({"fully_qualified_modules": True})
+
+    func = _compile(
+        f"_{name}",
+        _source(f"_{name}", args, [expr], printer, jacobian=False)
+    )
+
+    jac_exprs = [sp.diff(expr, symbols[p]) for p in params]
+
+    jac = _compile(
+        f"_{name}_jac",
+        _source(f"_{name}_jac", args, jac_exprs, printer, jacobian=True)
+    )
+
+    formula = expr.subs({
+        symbol: sp.Symbol(p) for p, symbol in symbols.items()
+    })
+
+    return f.Function(
+        func,
+        params,
+        f"${sp.latex(formula)}$",
+        jac=jac,
+        **kwargs
+    )
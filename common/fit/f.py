@@ -1,5 +1,51 @@
+import ast
+import importlib
 import numpy as np
+import time
+from pathlib import Path
 from scipy import special
+from . import expr as _expr
+from . import guess as _guess
+
+# Record evaluations of functions while fitting ("-T")
+opt_trace = False
+
+
+class Trace:
+    """
+    Evaluation statistics of a function: number of calls, time spent in them
+    and size of the arrays it was evaluated on.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+        # { array size: calls }
+        self.sizes: dict[int, int] = {}
+
+    def record(self, size: int, seconds: float) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.sizes[size] = self.sizes.get(size, 0) + 1
+
+    def points(self) -> int:
+        """
+        Total number of points the function was evaluated on.
+        """
+
+        return sum(size * calls for size, calls in self.sizes.items())
+
+    def result(self) -> dict:
+        """
+        Statistics as result metadata.
+        """
+
+        return {
+            "Evals": f"{self.calls}",
+            "Eval time [s]": f"{self.seconds}",
+            "Eval points": f"{self.points()}",
+        }
 
 
 class Function:
@@ -11,11 +57,68 @@ class Function:
         self,
         func,  # Callable
         params: list[str],  # Parameter names
-        eq: str = None  # LaTeX formula
+        eq: str = None,  # LaTeX formula
+        jac=None,  # Callable, derivatives with respect to each parameter
+        inplace=None,  # Callable, same as func but writes into buffers
+        n_work: int = 0,  # Number of scratch buffers needed by `inplace`
+        bounds: tuple[list[float], list[float]] = None,  # (lower, upper)
+        guess=None  # Callable (x, y) -> p0, initial parameters from data
     ):
         self.f = func
         self.params = params
         self.eq = eq
+        self.jac = jac
+        self.inplace = inplace
+        self.n_work = n_work
+        self.bounds = bounds
+        self.guess = guess
+
+        # Set when registered, see `register()`
+        self.name: str = None
+
+    def __reduce_ex__(self, protocol):
+        # Registered functions are pickled by name, so that lambdas and
+        # closures can be sent to other processes
+        if self.name is not None:
+            return (get, (self.name,))
+
+        return super().__reduce_ex__(protocol)
+
+    def traced(self, trace: Trace, func=None):
+        """
+        Callable that evaluates the function and records every call in
+        `trace`. `func` is the callable to wrap, by default `self.f`.
+        """
+
+        if func is None:
+            func = self.f
+
+        def wrapper(x, *params):
+            start = time.perf_counter()
+            y = func(x, *params)
+            trace.record(np.size(x), time.perf_counter() - start)
+
+            return y
+
+        return wrapper
+
+    def buffered(self, shape):
+        """
+        Callable that evaluates the function on arrays of `shape` without
+        allocating: the result and every intermediate array are written into
+        buffers allocated once, here. The returned array is overwritten by the
+        next call.
+        """
+
+        out = np.empty(shape)
+        work = [np.empty(shape) for _ in range(self.n_work)]
+
+        kernel = self.inplace
+
+        def wrapper(x, *params):
+            return kernel(out, work, x, *params)
+
+        return wrapper
 
 
 class EvalFunction:
@@ -28,19 +131,26 @@ class EvalFunction:
         func: Function,
         params: list[float],
         p_err: list[float],
-        residue: list[float]
+        residue: list[float],
+        trace: Trace = None,  # Evaluations while fitting, if traced
+        status=None,  # fit.utils.FitStatus of the fit
+        gof=None  # fit.gof.GoodnessOfFit of the residue
     ):
         self.func = func
         self.params = params
         self.p_err = p_err
         self.residue = residue
+        self.trace = trace
+        self.status = status
+        self.gof = gof
 
 
 linear = Function(
     lambda x, m, b:
         m * x + b,
     ["m", "b"],
-    r"$m\,x + b$"
+    r"$m\,x + b$",
+    guess=_guess.linear
 )
 
 harmonic = Function(
@@ -52,42 +162,102 @@ harmonic = Function(
 
 
 # Damped harmonic oscillator
-lorentz = Function(
-    lambda w, w_0, gamma, A:
-        A / ((w_0**2 - w**2)**2 + (gamma * w)**2),
-    ["w_0", "gamma", "Amplitud"]
+def _lorentz_inplace(out, work, w, w_0, gamma, A):
+    w_sq, = work
+
+    np.multiply(w, w, out=w_sq)
+
+    # (w_0^2 - w^2)^2
+    np.subtract(w_0**2, w_sq, out=out)
+    np.multiply(out, out, out=out)
+
+    # + (gamma w)^2
+    np.multiply(w_sq, gamma**2, out=w_sq)
+    np.add(out, w_sq, out=out)
+
+    return np.divide(A, out, out=out)
+
+
+lorentz = _expr.build(
+    "Amplitud / ((w_0**2 - w**2)**2 + (gamma * w)**2)",
+    "w",
+    ["w_0", "gamma", "Amplitud"],
+    name="lorentz",
+    inplace=_lorentz_inplace,
+    n_work=1,
+    bounds=([0, 0, -np.inf], [np.inf, np.inf, np.inf]),
+    guess=_guess.lorentz
 )
 
 
-# Damped oscillator and receiver
-def _double_lorentz(w, w_1, w_2, g_1, g_2, A):
-    num_left = ((w_1**2 - w**2) * (w_2**2 - w**2) - g_1 * g_2 * w**2)**2
-    num_right = ((w_2**2 - w**2) * g_1 * w + (w_1**2 - w**2) * g_2 * w)**2
-    den_left = (w_1**2 - w**2)**2 + (g_1 * w)**2
-    den_right = (w_1**2 - w**2)**2 + (g_1 * w)**2
+# Damped oscillator and receiver: the receiver is driven by the emitter, so
+# the amplitude is |A / ((w_1^2 - w^2 + i g_1 w)(w_2^2 - w^2 + i g_2 w))|
+def _double_lorentz_inplace(out, work, w, w_1, w_2, g_1, g_2, A):
+    w_sq, den_right = work
 
-    return A * np.sqrt((num_left + num_right) / (den_left + den_right)**2)
+    np.multiply(w, w, out=w_sq)
 
+    # den_left
+    np.subtract(w_1**2, w_sq, out=out)
+    np.multiply(out, out, out=out)
+    np.multiply(w_sq, g_1**2, out=den_right)
+    np.add(out, den_right, out=out)
 
-double_lorentz = Function(
-    _double_lorentz,
-    ["w_1", "w_2", "g_1", "g_2", "A"]
+    # den_right (w_sq is not needed afterwards)
+    np.subtract(w_2**2, w_sq, out=den_right)
+    np.multiply(den_right, den_right, out=den_right)
+    np.multiply(w_sq, g_2**2, out=w_sq)
+    np.add(den_right, w_sq, out=den_right)
+
+    np.multiply(out, den_right, out=out)
+    np.sqrt(out, out=out)
+
+    return np.divide(A, out, out=out)
+
+
+double_lorentz = _expr.build(
+    "A / sqrt(((w_1**2 - w**2)**2 + g_1**2 * w**2)"
+    " * ((w_2**2 - w**2)**2 + g_2**2 * w**2))",
+    "w",
+    ["w_1", "w_2", "g_1", "g_2", "A"],
+    name="double_lorentz",
+    inplace=_double_lorentz_inplace,
+    n_work=2,
+    bounds=([0, 0, 0, 0, -np.inf], [np.inf] * 5),
+    guess=_guess.double_lorentz
 )
 
 
 # Amplitude of wave + relfection
-def _fabry_perot(x, x_0, c_1, c_2, alpha, wavelen):
-    ampl = c_1 / (x - x_0) ** alpha
+def _fabry_perot_inplace(out, work, x, x_0, c_1, c_2, alpha, wavelen):
+    dx, root = work
 
-    freq = 4 * np.pi / wavelen
+    np.subtract(x, x_0, out=dx)
 
-    return ampl * np.sqrt(1 + c_2 * np.cos(freq * (x - x_0)))
+    # sqrt(1 + c_2 cos(freq (x - x_0)))
+    np.multiply(dx, 4 * np.pi / wavelen, out=root)
+    np.cos(root, out=root)
+    np.multiply(root, c_2, out=root)
+    np.add(root, 1, out=root)
+    np.sqrt(root, out=root)
 
+    # c_1 / (x - x_0)^alpha
+    np.power(dx, alpha, out=out)
+    np.divide(c_1, out, out=out)
 
-fabry_perot = Function(
-    _fabry_perot,
+    return np.multiply(out, root, out=out)
+
+
+fabry_perot = _expr.build(
+    "c_1 / (x - x_0)**alpha"
+    " * sqrt(1 + c_2 * cos(4 * pi * (x - x_0) / lambda))",
+    "x",
     ["x_0", "c_1", "c_2", "alpha", "lambda"],
-    r"$\frac{c_1}{(x-x_0)^\alpha} \sqrt{1 + c_2\cos(4\pi\frac{\lambda}{x-x_0})}$"
+    name="fabry_perot",
+    inplace=_fabry_perot_inplace,
+    n_work=2,
+    bounds=([-np.inf, -np.inf, 0, 0, 0], [np.inf, np.inf, 1, np.inf, np.inf]),
+    guess=_guess.fabry_perot
 )
 
 
@@ -102,7 +272,7 @@ def _fabry_perot2(x, x_0, a, R, alpha, wavelen):
 
 
 fabry_perot2 = Function(
-    _fabry_perot,
+    _fabry_perot2,
     ["x_0", "a", "R", "alpha", "lambda"]
 )
 
@@ -111,5 +281,116 @@ cos_sq = Function(
     lambda theta, y_0, A, w, theta_0:
         y_0 + A * np.cos(w * (theta - theta_0)) ** 2,
     ["y_0", "A", "w", "theta_0"],
-    r"$A \cos^2(\theta - \theta_0)$"
+    r"$A \cos^2(\theta - \theta_0)$",
+    guess=_guess.cos_sq
 )
+
+
+# Registry of functions by name. Entries are either a Function or, until
+# first used, a "module:attribute" string where to find it.
+_registry: dict[str, Function | str] = {}
+
+
+def register(name: str, func: Function | str) -> Function | str:
+    """
+    Register `func` as `name`. `func` may be a "module:attribute" string, in
+    which case the module is only imported when the function is first used.
+    Functions defined in experiments should use "module:attribute" as their
+    name, e.g. `register(f"{__name__}:abs_cos", ...)`, so that they can be
+    found from any process.
+    """
+
+    if isinstance(func, Function):
+        func.name = name
+
+    _registry[name] = func
+
+    return func
+
+
+def unregister(name: str) -> None:
+    """
+    Forget the function registered as `name`, e.g. when the module defining
+    it is no longer importable under that name.
+    """
+
+    _registry.pop(name, None)
+
+
+def get(name: str) -> Function:
+    """
+    Find a registered function. Names of the form "module:attribute" don't
+    need to be registered beforehand.
+    """
+
+    entry = _registry.get(name)
+
+    if entry is None:
+        if ":" not in name:
+            raise KeyError(f"Unknown function '{name}'.")
+
+        entry = name
+
+    if isinstance(entry, str):
+        module, attribute = entry.split(":")
+
+        func = getattr(importlib.import_module(module), attribute)
+
+        entry = register(name, func)
+
+    return entry
+
+
+def available() -> list[str]:
+    """
+    Names of all registered functions, loaded or not.
+    """
+
+    return sorted(_registry)
+
+
+def discover(path: Path, package: str = "src") -> list[str]:
+    """
+    Register (without importing them) the functions defined at module level
+    in the scripts of `path/package`. A function is anything assigned from a
+    call to `Function` or `register`. Returns the names found.
+    """
+
+    found = []
+
+    for script in sorted((path / package).glob("*.py")):
+        tree = ast.parse(script.read_text(), filename=str(script))
+
+        for node in tree.body:
+            if not isinstance(node, ast.Assign) or \
+                    not isinstance(node.value, ast.Call):
+                continue
+
+            callee = node.value.func
+            callee = callee.attr if isinstance(callee, ast.Attribute) \
+                else getattr(callee, "id", None)
+
+            if callee not in ("Function", "register"):
+                continue
+
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    name = f"{package}.{script.stem}:{target.id}"
+
+                    # Don't replace functions that are already loaded
+                    _registry.setdefault(name, name)
+                    found.append(name)
+
+    return found
+
+
+for _name, _func in [
+    ("linear", linear),
+    ("harmonic", harmonic),
+    ("lorentz", lorentz),
+    ("double_lorentz", double_lorentz),
+    ("fabry_perot", fabry_perot),
+    ("fabry_perot2", fabry_perot2),
+    ("cos_sq", cos_sq),
+]:
+    register(_name, _func)
@@ -0,0 +1,273 @@
+import logging
+import numpy as np
+from scipy import stats
+
+# gof
+logger = logging.getLogger(__name__)
+
+# Goodness of fit from the residues (fit - data) of one or many fits. The
+# residues of a batch of fits are a (fits, points) array; fits with fewer
+# points are padded with NaN at the end (see `stack()`). Points are assumed
+# to be in order of x, as the autocorrelation tests depend on it.
+
+# Significance of the tests in `GoodnessOfFit.flags()`
+ALPHA = 0.05
+
+# Durbin-Watson statistics outside of this range mean correlated residues
+# (2 for none, 0 for positive correlation, 4 for negative)
+DW_RANGE = (1.5, 2.5)
+
+# Relative step of the numerical derivatives in `jacobian()`
+JAC_STEP = 1e-6
+
+
+def stack(arrays: list, fill: float = np.nan) -> np.ndarray:
+    """
+    Arrays of different length (or (n, k) arrays with different n) as one
+    array, padded at the end with `fill`.
+    """
+
+    arrays = [np.asarray(a, dtype=float) for a in arrays]
+
+    n = max(a.shape[0] for a in arrays)
+    out = np.full((len(arrays), n) + arrays[0].shape[1:], fill)
+
+    for i, a in enumerate(arrays):
+        out[i, :a.shape[0]] = a
+
+    return out
+
+
+def jacobian(func, x, params) -> np.ndarray:
+    """
+    Derivatives of `func` (a `fit.f.Function`) with respect to each of its
+    parameters at every x, a (points, parameters) array. Uses the analytic
+    jacobian of the function if it has one, central differences otherwise.
+    """
+
+    x = np.asarray(x, dtype=float)
+    params = np.asarray(params, dtype=float)
+
+    if func.jac is not None:
+        return np.asarray(func.jac(x, *params), dtype=float)
+
+    steps = JAC_STEP * np.maximum(np.abs(params), 1.0)
+
+    jac = np.empty((x.size, params.size))
+
+    for i, h in enumerate(steps):
+        up, down = params.copy(), params.copy()
+        up[i] += h
+        down[i] -= h
+
+        jac[:, i] = (func.f(x, *up) - func.f(x, *down)) / (2 * h)
+
+    return jac
+
+
+class GoodnessOfFit:
+    """
+    Statistics of the residues of one or many fits, see `evaluate()`. Every
+    attribute has one value per fit (shape of the batch), except for
+    `normalized`, `studentized` and `leverage`, which have one per point.
+    """
+
+    def __init__(
+        self,
+        normalized: np.ndarray,
+        chi_sq: np.ndarray,
+        dof: np.ndarray,
+        p_value: np.ndarray,
+        durbin_watson: np.ndarray,
+        runs: np.ndarray,
+        runs_p: np.ndarray,
+        leverage: np.ndarray = None
+    ):
+        self.normalized = normalized
+        self.chi_sq = chi_sq
+        self.dof = dof
+        self.p_value = p_value
+        self.durbin_watson = durbin_watson
+        self.runs = runs
+        self.runs_p = runs_p
+        self.leverage = leverage
+
+    @property
+    def chi_sq_r(self) -> np.ndarray:
+        return self.chi_sq / np.maximum(self.dof, 1)
+
+    @property
+    def studentized(self) -> np.ndarray | None:
+        """
+        Normalized residues corrected by leverage, which have the same
+        variance at every point.
+        """
+
+        if self.leverage is None:
+            return None
+
+        return self.normalized / np.sqrt(np.maximum(1 - self.leverage, 1e-12))
+
+    def flags(self, alpha: float = ALPHA) -> dict[str, np.ndarray]:
+        """
+        Possible problems of every fit:
+        - "chi^2 high": errors underestimated or wrong model.
+        - "chi^2 low": errors overestimated.
+        - "correlated": the residues are not random, by the Durbin-Watson
+          statistic or the runs test.
+        """
+
+        dw_low, dw_high = DW_RANGE
+
+        return {
+            "chi^2 high": self.p_value < alpha,
+            "chi^2 low": self.p_value > 1 - alpha,
+            "correlated": (self.durbin_watson < dw_low)
+            | (self.durbin_watson > dw_high)
+            | (self.runs_p < alpha),
+        }
+
+    def suspicious(self, alpha: float = ALPHA) -> np.ndarray:
+        """
+        Whether each fit has any of the problems in `flags()`.
+        """
+
+        return np.any(list(self.flags(alpha).values()), axis=0)
+
+    def result(self, index=()) -> dict:
+        """
+        Statistics of one fit (by default the only one) as result metadata.
+        """
+
+        return {
+            "Chi^2 red": f"{self.chi_sq_r[index]}",
+            "p-value": f"{self.p_value[index]}",
+            "Durbin-Watson": f"{self.durbin_watson[index]}",
+            "Runs p-value": f"{self.runs_p[index]}",
+        }
+
+    def table(self, names: list[str] = None, alpha: float = ALPHA) -> list:
+        """
+        One row per fit, to save with `data.save()` and sort by quality.
+        """
+
+        if names is None:
+            names = [str(i) for i in range(self.chi_sq.size)]
+
+        flags = self.flags(alpha)
+        shape = self.chi_sq.shape
+
+        rows = []
+        for i, name in enumerate(names):
+            problems = [flag for flag, value in flags.items() if value.flat[i]]
+
+            rows.append(
+                {"Fit": name}
+                | self.result(np.unravel_index(i, shape))
+                | {"Flags": " ".join(problems)}
+            )
+
+        return rows
+
+
+def evaluate(
+    residue,
+    yerr=None,
+    n_params: int = 0,
+    jac=None
+) -> GoodnessOfFit:
+    """
+    Goodness of fit of the residues of one fit, or a batch of them (a list
+    of arrays or an array padded with NaN). With errors `yerr`, residues are
+    normalized by them and the chi^2 has a p-value; without, they are
+    normalized by their RMS and the chi^2 and its p-value are NaN. If the
+    jacobians of the models (`jacobian()`, one per fit) are given, the
+    leverage of every point is computed too.
+    """
+
+    if isinstance(residue, list):
+        residue = stack(residue)
+
+    if isinstance(yerr, list):
+        yerr = stack(yerr)
+
+    if isinstance(jac, list):
+        jac = stack(jac, fill=0.0)
+
+    residue = np.asarray(residue, dtype=float)
+
+    valid = np.isfinite(residue)
+
+    if yerr is not None:
+        yerr = np.broadcast_to(np.asarray(yerr, dtype=float), residue.shape)
+        normalized = residue / yerr
+
+    else:
+        normalized = residue.copy()
+
+    normalized[~valid] = 0
+
+    n = valid.sum(axis=-1)
+    dof = n - n_params
+
+    chi_sq = np.einsum("...i,...i->...", normalized, normalized)
+
+    if yerr is not None:
+        p_value = stats.chi2.sf(chi_sq, np.maximum(dof, 1))
+
+    else:
+        rms = np.sqrt(chi_sq / np.maximum(dof, 1))
+        normalized /= np.where(rms > 0, rms, 1)[..., None]
+
+        # Meaningless without errors
+        chi_sq = np.full(chi_sq.shape, np.nan)
+        p_value = np.full(chi_sq.shape, np.nan)
+
+    # Consecutive points, both measured
+    pairs = valid[..., 1:] & valid[..., :-1]
+
+    diff = np.where(pairs, np.diff(normalized, axis=-1), 0)
+    sum_sq = np.einsum("...i,...i->...", normalized, normalized)
+
+    durbin_watson = np.einsum("...i,...i->...", diff, diff) \
+        / np.where(sum_sq > 0, sum_sq, np.nan)
+
+    # Runs of residues of the same sign (Wald-Wolfowitz)
+    sign = np.sign(normalized)
+
+    n_pos = np.sum(sign > 0, axis=-1)
+    n_neg = np.sum(sign < 0, axis=-1)
+
+    changes = pairs & (sign[..., 1:] * sign[..., :-1] < 0)
+    runs = changes.sum(axis=-1) + 1
+
+    n_signs = n_pos + n_neg
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = 2 * n_pos * n_neg / n_signs + 1
+        var = (mean - 1) * (mean - 2) / (n_signs - 1)
+
+        z = (runs - mean) / np.sqrt(np.where(var > 0, var, np.nan))
+
+    runs_p = 2 * stats.norm.sf(np.abs(z))
+
+    leverage = None
+    if jac is not None:
+        weighted = np.where(valid[..., None], np.asarray(jac, dtype=float), 0)
+
+        if yerr is not None:
+            weighted = weighted / np.where(valid, yerr, 1)[..., None]
+
+        # Diagonal of the hat matrix, A (A^T A)^-1 A^T = Q Q^T
+        q = np.linalg.qr(weighted, mode="reduced")[0]
+        leverage = np.einsum("...ik,...ik->...i", q, q)
+
+    return GoodnessOfFit(
+        normalized,
+        chi_sq,
+        dof,
+        p_value,
+        durbin_watson,
+        runs,
+        runs_p,
+        leverage
+    )
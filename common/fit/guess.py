@@ -0,0 +1,158 @@
+import numpy as np
+from common.spectral import sinusoid
+
+# Initial parameters estimated from data, for each function in `fit.f`.
+# Every estimator takes (x, y) and returns p0 in the order of `params`.
+# Periodic ones start from the dominant frequency, see `common.spectral`.
+
+# y = A (1 - erf(sqrt(2) (x - x_0) / w)) goes from 90% to 10% of its maximum
+# in this many w
+ERF_10_90 = 2 * 0.9062 / np.sqrt(2)
+
+
+def _sorted(x, y) -> tuple[np.ndarray, np.ndarray]:
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    order = np.argsort(x)
+
+    return x[order], y[order]
+
+
+def _crossings(x, y, level: float) -> np.ndarray:
+    """
+    Every x where y crosses `level`, linearly interpolated.
+    """
+
+    above = y >= level
+    i = np.flatnonzero(above[:-1] != above[1:])
+
+    dy = y[i + 1] - y[i]
+    dy[dy == 0] = 1
+
+    return x[i] + (level - y[i]) * (x[i + 1] - x[i]) / dy
+
+
+def _amplitude(shape, y) -> float:
+    """
+    Least squares scale factor for y = A shape.
+    """
+
+    return np.dot(shape, y) / np.dot(shape, shape)
+
+
+def _width(x, y, peak: int) -> float:
+    """
+    Full width at half maximum of the peak at index `peak`. Uses twice the
+    half width if only one side reaches half the maximum.
+    """
+
+    crossings = _crossings(x, y, y[peak] / 2) - x[peak]
+
+    left = crossings[crossings < 0]
+    right = crossings[crossings > 0]
+
+    if left.size and right.size:
+        return right[0] - left[-1]
+
+    if left.size or right.size:
+        return 2 * np.abs(np.concatenate([left[-1:], right[:1]])[0])
+
+    # Peak wider than the data
+    return x[-1] - x[0]
+
+
+def linear(x, y) -> list[float]:
+    x, y = _sorted(x, y)
+
+    return list(np.polyfit(x, y, 1))
+
+
+def lorentz(x, y) -> list[float]:
+    x, y = _sorted(x, y)
+
+    peak = np.argmax(y)
+
+    w_0 = x[peak]
+
+    # Full width at half maximum is about gamma
+    gamma = _width(x, y, peak)
+
+    A = _amplitude(1 / ((w_0**2 - x**2)**2 + (gamma * x)**2), y)
+
+    return [w_0, gamma, A]
+
+
+def double_lorentz(x, y) -> list[float]:
+    from common.fit.f import double_lorentz
+
+    x, y = _sorted(x, y)
+
+    # Two highest local maxima
+    maxima = np.flatnonzero((y[1:-1] > y[:-2]) & (y[1:-1] >= y[2:])) + 1
+    maxima = maxima[np.argsort(y[maxima])[::-1]]
+
+    if maxima.size == 0:
+        maxima = np.array([np.argmax(y)])
+
+    peak_1 = maxima[0]
+    peak_2 = maxima[1] if maxima.size > 1 else maxima[0]
+
+    w_1, w_2 = x[peak_1], x[peak_2]
+    g_1, g_2 = _width(x, y, peak_1), _width(x, y, peak_2)
+
+    if w_1 == w_2:
+        # Avoid a degenerate start
+        w_2 += g_2 / 2
+
+    A = _amplitude(double_lorentz.f(x, w_1, w_2, g_1, g_2, 1), y)
+
+    return [w_1, w_2, g_1, g_2, A]
+
+
+def fabry_perot(x, y) -> list[float]:
+    x, y = _sorted(x, y)
+
+    # Origin before the first point
+    x_0 = 0.0 if x[0] > 0 else x[0] - (x[1] - x[0])
+    dx = x - x_0
+
+    # Envelope c_1 / dx^alpha, a line in log-log
+    positive = y > 0
+    slope, intercept = np.polyfit(
+        np.log(dx[positive]),
+        np.log(y[positive]),
+        1
+    )
+
+    alpha = -slope
+    c_1 = np.exp(intercept)
+
+    # (y / envelope)^2 = 1 + c_2 cos(4 pi (x - x_0) / lambda)
+    k, a, R, _ = sinusoid(dx, (y * dx**alpha / c_1) ** 2)
+
+    return [x_0, c_1 * np.sqrt(a), min(R / a, 1.0), alpha, 4 * np.pi / k]
+
+
+def cos_sq(x, y) -> list[float]:
+    # cos^2(w (x - x_0)) = (1 + cos(2 w x - 2 w x_0)) / 2
+    k, a, R, phi = sinusoid(x, y)
+
+    return [a - R, 2 * R, k / 2, phi / k]
+
+
+def erf(x, y) -> list[float]:
+    """
+    Knife-edge profile `A (1 - erf(sqrt(2) (x - x_0) / w))`, returns
+    `[x_0, w]` since A is known.
+    """
+
+    x, y = _sorted(x, y)
+
+    top = y.max()
+
+    x_0 = _crossings(x, y, top / 2)[0]
+    x_90 = _crossings(x, y, 0.9 * top)[0]
+    x_10 = _crossings(x, y, 0.1 * top)[-1]
+
+    return [x_0, np.abs(x_10 - x_90) / ERF_10_90]
@@ -1,44 +1,293 @@
 from scipy.optimize import curve_fit
 import numpy as np
-from . import f
+from . import f, gof
 from pathlib import Path
-from common import data
+from common import data, perf
 import pprint
 import logging
-import sys
 
 opt_show_result = False
 logger = logging.getLogger(__name__)
 
+# Warn about fits with more model evaluations than this
+EVALS_WARNING = 1000
+
+# Evaluate into preallocated buffers for data larger than this, if possible
+INPLACE_THRESHOLD = 10_000
+
+# Where the function is not finite (e.g. negative base to a real power), it
+# is replaced by this times the largest data value, so the solver steps back
+NAN_PENALTY = 1e6
+
+
+class FitStatus:
+    """
+    Outcome of a fit: whether it converged (with usable errors), number of
+    function evaluations, final cost (half the sum of squared weighted
+    residuals), a message from the solver and the covariance of all the
+    parameters.
+    """
+
+    def __init__(
+        self,
+        converged: bool,
+        nfev: int = None,
+        cost: float = None,
+        message: str = "",
+        cov: np.ndarray = None
+    ):
+        self.converged = converged
+        self.nfev = nfev
+        self.cost = cost
+        self.message = message
+        self.cov = cov
+
+    def __repr__(self) -> str:
+        return f"FitStatus(converged={self.converged}, nfev={self.nfev}, " \
+            f"cost={self.cost}, message={self.message!r})"
+
+
+class FitError(Exception):
+    """
+    A fit failed. Its status is in `status`.
+    """
+
+    def __init__(self, status: FitStatus):
+        super().__init__(status.message)
+        self.status = status
+
+
+# Status of every fit, in order. Used by `common.batch` to report them.
+history: list[FitStatus] = []
+
+
+def _reduce(
+    params: list[str],
+    fixed: dict[str, float],
+    tied: dict
+):
+    """
+    Split parameters into the free ones, which are fitted, and the fixed or
+    tied ones. Returns the names of the free parameters and a function that
+    builds all parameters from the free ones.
+    """
+
+    fixed = fixed if fixed is not None else {}
+
+    # A tie is either the name of another parameter or a function of all the
+    # other values, e.g. { "w_2": "w_1" } or { "w_2": lambda p: 2 * p["w_1"] }
+    tied = {
+        p: (lambda values, other=tie: values[other])
+        if isinstance(tie, str) else tie
+        for p, tie in (tied if tied is not None else {}).items()
+    }
+
+    unknown = (set(fixed) | set(tied)) - set(params)
+    if unknown:
+        raise ValueError(f"Unknown parameters {sorted(unknown)}.")
+
+    free = [p for p in params if p not in fixed and p not in tied]
+
+    def expand(free_values) -> list[float]:
+        values = dict(fixed)
+        values.update(zip(free, free_values))
+
+        for p, tie in tied.items():
+            values[p] = tie(values)
+
+        return [values[p] for p in params]
+
+    return free, expand
+
+
+def _expansion(expand, q_opt) -> np.ndarray:
+    """
+    Numerical derivative of `expand` (see `_reduce()`) at the free values
+    `q_opt`, a (parameters, free parameters) array.
+    """
+
+    q_opt = np.asarray(q_opt, dtype=float)
+    step = 1e-8 * np.maximum(1, np.abs(q_opt))
+
+    p_opt = np.array(expand(q_opt))
+
+    return np.column_stack([
+        (np.array(expand(q_opt + h)) - p_opt) / h[i]
+        for i, h in enumerate(np.diag(step))
+    ])
+
+
+def _expand_cov(expand, q_opt, q_cov) -> np.ndarray:
+    """
+    Covariance of all parameters from the covariance of the free ones,
+    `E cov E^T` with `E` the derivative of `expand`.
+    """
+
+    E = _expansion(expand, q_opt)
+
+    return E @ q_cov @ E.T
+
+
+def _guarded(model, penalty: float):
+    """
+    Replace non finite values of the model by `penalty`, in place.
+    """
+
+    def wrapper(x, *params):
+        # Invalid values are expected here
+        with np.errstate(invalid="ignore", divide="ignore"):
+            y = model(x, *params)
+
+        return np.nan_to_num(
+            y,
+            copy=False,
+            nan=penalty,
+            posinf=penalty,
+            neginf=-penalty
+        )
+
+    return wrapper
+
 
 def find(
     func: f.Function,
     data_x,
     data_y,
     p0=None,
-    yerr=None
+    yerr=None,
+    trace: f.Trace = None,
+    bounds: tuple[list[float], list[float]] = None,
+    fixed: dict[str, float] = None,
+    tied: dict = None,
+    full_output: bool = False
 ):
     """
-    Fit a function to data.
+    Fit a function to data. If `trace` is given, every evaluation of the
+    model is recorded in it. If `p0` is not given, it is estimated from the
+    data when the function knows how to.
+    `bounds` are `(lower, upper)` for every parameter, e.g. `func.bounds`;
+    only bounded fits use the trust region reflective solver, the rest use
+    Levenberg-Marquardt. `fixed`
+    parameters keep their value, e.g. `{"lambda": 8.65}`, and `tied` ones
+    follow others, e.g. `{"w_2": "w_1"}` (see `_reduce()`). Returned values
+    and errors include all parameters; if `full_output`, the `FitStatus` is
+    returned as well. Raises `FitError` if the fit fails.
     """
 
+    data_x = np.asarray(data_x, dtype=float)
+    data_y = np.asarray(data_y, dtype=float)
+
+    if p0 is None and func.guess is not None:
+        p0 = np.asarray(func.guess(data_x, data_y), dtype=float)
+        logger.info(f"Estimated initial parameters {p0}.")
+
+    if p0 is None:
+        # Same default as curve_fit
+        p0 = np.ones(len(func.params))
+
+    free, expand = _reduce(func.params, fixed, tied)
+    index = [func.params.index(p) for p in free]
+
+    q0 = np.asarray(p0, dtype=float)[index]
+
+    if bounds is not None:
+        lower = np.asarray(bounds[0], dtype=float)[index]
+        upper = np.asarray(bounds[1], dtype=float)[index]
+
+        bounds = (lower, upper)
+        q0 = np.clip(q0, lower, upper)
+
+    else:
+        bounds = (-np.inf, np.inf)
+
+    model = func.f
+
+    # Avoid allocating temporaries on every iteration for large data
+    if func.inplace is not None and np.size(data_x) > INPLACE_THRESHOLD:
+        logger.info("Evaluating function in place.")
+
+        model = func.buffered(data_x.shape)
+
+    if trace is not None:
+        model = func.traced(trace, model)
+
+    # Count calls to the model (only with "-P")
+    model = perf.counted(model, "model evaluations")
+
+    model = _guarded(
+        model,
+        NAN_PENALTY * max(np.max(np.abs(data_y)), 1)
+    )
+
+    jac = func.jac
+
+    if len(free) < len(func.params):
+        def reduced(x, *q, model=model):
+            return model(x, *expand(q))
+
+        model = reduced
+
+        # Only derivatives of free parameters that nothing is tied to
+        if jac is not None and not tied:
+            def reduced_jac(x, *q, jac=jac):
+                return jac(x, *expand(q))[:, index]
+
+            jac = reduced_jac
+
+        else:
+            jac = None
+
     try:
-        param_opt, param_cov = curve_fit(
-            func.f,
-            data_x,
-            data_y,
-            p0=p0,
-            sigma=yerr,
-            absolute_sigma=True
-        )
-    except RuntimeError as e:
+        with perf.stage("fit"):
+            q_opt, q_cov, info, message, _ = curve_fit(
+                model,
+                data_x,
+                data_y,
+                p0=q0,
+                sigma=yerr,
+                absolute_sigma=True,
+                jac=jac,
+                bounds=bounds,
+                full_output=True
+            )
+    except (RuntimeError, ValueError) as e:
         logger.error("Failed to fit function :(.")
         logger.error(e)
-        sys.exit(1)
+
+        status = FitStatus(False, message=str(e))
+        history.append(status)
+
+        raise FitError(status) from e
+
+    if len(free) < len(func.params):
+        param_opt = np.array(expand(q_opt))
+        param_cov = _expand_cov(expand, q_opt, q_cov)
+
+    else:
+        param_opt, param_cov = q_opt, q_cov
 
     # Error in parameters
     param_err = np.sqrt(np.diag(param_cov))
 
+    status = FitStatus(
+        True,
+        nfev=int(info["nfev"]),
+        cost=0.5 * float(np.sum(info["fvec"] ** 2)),
+        message=message,
+        cov=param_cov
+    )
+
+    if not np.all(np.isfinite(param_err)):
+        logger.warning("Covariance of the parameters could not be estimated.")
+
+        status.converged = False
+        status.message = "Covariance could not be estimated"
+
+    history.append(status)
+
+    if full_output:
+        return param_opt, param_err, status
+
     return param_opt, param_err
 
 
@@ -65,7 +314,9 @@ def result(
     p_opt,
     p_err,
     chi,
-    r_sq
+    r_sq,
+    trace: f.Trace = None,
+    fit_gof: gof.GoodnessOfFit = None
 ) -> list[dict]:
     # Fit statistics
     stats = {
@@ -75,6 +326,15 @@ def result(
         "R^2": f"{r_sq}",
     }
 
+    # Without errors, only the tests on the residues mean something
+    if fit_gof is not None:
+        tests = fit_gof.result()
+
+        if chi is None:
+            del tests["Chi^2 red"], tests["p-value"]
+
+        stats.update(tests)
+
     # Mean and error of parameters
     # "avg+-err" notation, it is very easy to parse later
     params = {
@@ -87,6 +347,9 @@ def result(
     res: dict = stats
     res.update(params)
 
+    if trace is not None:
+        res.update(trace.result())
+
     if opt_show_result:
         pprint.pp(res)
 
@@ -99,40 +362,64 @@ def fitnsave(
     y_data,
     saveto: Path | str = None,
     p0=None,
-    yerr=None
+    yerr=None,
+    bounds: tuple[list[float], list[float]] = None,
+    fixed: dict[str, float] = None,
+    tied: dict = None
 ) -> f.EvalFunction:
     """
     Fit a function to data and save results.
     Returns y_fit and (param_opt, param_err)
     """
 
-    if func is not f.linear and p0 is None:
+    if func is not f.linear and p0 is None and func.guess is None:
         logger.warning("Passing no initial parametera for non linear function")
 
-    p_opt, p_err = find(
+    trace = f.Trace() if f.opt_trace else None
+
+    p_opt, p_err, status = find(
         func,
         x_data,
         y_data,
         p0=p0,
-        yerr=yerr
+        yerr=yerr,
+        trace=trace,
+        bounds=bounds,
+        fixed=fixed,
+        tied=tied,
+        full_output=True
     )
 
+    if trace is not None and trace.calls > EVALS_WARNING:
+        logger.warning(
+            f"Fit took {trace.calls} evaluations, check initial parameters."
+        )
+
     y_fit = func.f(x_data, *p_opt)
+    residue = y_fit - y_data
+
+    # Only the free parameters were fitted: they alone take degrees of
+    # freedom, and the jacobian is with respect to them
+    free, expand = _reduce(func.params, fixed, tied)
+    jac = gof.jacobian(func, x_data, p_opt)
+
+    if len(free) < len(func.params):
+        q_opt = p_opt[[func.params.index(p) for p in free]]
+        jac = jac @ _expansion(expand, q_opt)
+
+    fit_gof = gof.evaluate(residue, yerr, len(free), jac=jac)
 
     fit_func = f.EvalFunction(
         func,
         p_opt,
         p_err,
-        y_fit - y_data
+        residue,
+        trace=trace,
+        status=status,
+        gof=fit_gof
     )
 
-    # chi squared is only relevant for lineal fits
-    chi_sq_red = chi2_r(
-        fit_func.residue,
-        yerr,
-        len(fit_func.residue),
-        len(p_opt)
-    ) if func is f.linear else None
+    chi_sq_red = fit_gof.chi_sq_r if yerr is not None else None
 
     r_sq = r2(y_data, fit_func.residue)
 
@@ -141,7 +428,9 @@ def fitnsave(
         p_opt,
         p_err,
         chi_sq_red,
-        r_sq
+        r_sq,
+        trace=trace,
+        fit_gof=fit_gof
     )
 
     # Save result to disk
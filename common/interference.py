@@ -0,0 +1,282 @@
+import logging
+import numpy as np
+from common import data
+
+# interference
+logger = logging.getLogger(__name__)
+
+# Signals of N emitters measured at M receiver positions are (M, N) arrays:
+# one row per position, one column per emitter (or channel). Errors may be
+# anything that broadcasts to that shape, e.g. a scalar.
+
+
+def useg_to_rad(time, freq: float) -> np.ndarray:
+    """
+    Delay in microseconds to phase in radians, for a wave of frequency
+    `freq` [Hz].
+    """
+
+    return np.asarray(time, dtype=float) \
+        * (2 * np.pi * freq * data.scale("μs", "s"))
+
+
+class Waves:
+    """
+    Amplitude and phase of N emitters at M positions, and the perturbation
+    psi = A cos(phi) they produce, with errors propagated to first order.
+    Phases are unwrapped along the positions (axis 0) for every emitter at
+    once.
+    """
+
+    def __init__(
+        self,
+        ampl,
+        phase,
+        err_ampl=0.0,
+        err_phase=0.0,
+        unwrap: bool = True
+    ):
+        self.ampl = np.atleast_1d(np.asarray(ampl, dtype=float))
+        self.phase = np.atleast_1d(np.asarray(phase, dtype=float))
+
+        if self.phase.shape != self.ampl.shape:
+            raise ValueError(
+                f"Amplitude {self.ampl.shape} and phase {self.phase.shape}"
+                " must have the same shape."
+            )
+
+        if unwrap:
+            self.phase = np.unwrap(self.phase, axis=0)
+
+        self.err_ampl = np.broadcast_to(err_ampl, self.ampl.shape)
+        self.err_phase = np.broadcast_to(err_phase, self.ampl.shape)
+
+        cos = np.cos(self.phase)
+        sin = np.sin(self.phase)
+
+        self.psi = self.ampl * cos
+
+        # d psi / d A = cos(phi), d psi / d phi = -A sin(phi)
+        sin *= self.ampl
+        sin *= self.err_phase
+        cos *= self.err_ampl
+
+        self.err_psi = np.hypot(cos, sin, out=cos)
+
+    @classmethod
+    def from_delays(
+        cls,
+        ampl,
+        time,
+        freq: float,
+        err_ampl=0.0,
+        err_time=0.0,
+        unwrap: bool = True
+    ) -> "Waves":
+        """
+        Same as `Waves(...)` with phases given as delays in microseconds.
+        """
+
+        return cls(
+            ampl,
+            useg_to_rad(time, freq),
+            err_ampl,
+            useg_to_rad(err_time, freq),
+            unwrap
+        )
+
+    @property
+    def phasor(self) -> np.ndarray:
+        """
+        A e^{i phi}, complex (M, N) array.
+        """
+
+        return self.ampl * np.exp(1j * self.phase)
+
+    @property
+    def err_phasor(self) -> np.ndarray:
+        """
+        Standard deviation of the phasor, `sqrt(err_A^2 + A^2 err_phi^2)`:
+        the error of the amplitude is along it, that of the phase across.
+        """
+
+        return np.hypot(self.err_ampl, self.ampl * self.err_phase)
+
+    def __len__(self) -> int:
+        return self.ampl.shape[0]
+
+    def __getitem__(self, emitters) -> "Waves":
+        """
+        Waves of some emitters only, e.g. `waves[:, [0, 1]]`. Phases are
+        already unwrapped.
+        """
+
+        return Waves(
+            self.ampl[emitters],
+            self.phase[emitters],
+            self.err_ampl[emitters],
+            self.err_phase[emitters],
+            unwrap=False
+        )
+
+    def superpose(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sum of psi of every emitter at each position and its error, assuming
+        independent emitters. Returns two arrays of length M.
+        """
+
+        psi = self.psi.sum(axis=-1)
+        err_psi = np.sqrt(
+            np.einsum("...n,...n->...", self.err_psi, self.err_psi)
+        )
+
+        return psi, err_psi
+
+
+def complex_lstsq(
+    z,
+    basis,
+    sigma=None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Weighted linear least squares for complex data, `z ~ basis @ g`, which
+    fits real and imaginary parts (so amplitude and phase) at the same time.
+    `z` is (..., M), `basis` is (..., M, K) and `sigma` (..., M) is the
+    standard deviation of each `z`, its real and imaginary parts having half
+    the variance each. Leading dimensions are independent problems, all
+    solved at once.
+
+    Returns `(g, cov, chi_sq)`: the (..., K) coefficients, their complex
+    (..., K, K) covariance `E[dg dg^H]` and the chi squared.
+    """
+
+    z = np.asarray(z, dtype=complex)
+    basis = np.asarray(basis, dtype=complex)
+
+    weights = np.ones(z.shape) if sigma is None \
+        else 1 / np.asarray(sigma, dtype=float) ** 2
+
+    # Z^H W
+    weighted = basis.conj() * weights[..., :, None]
+
+    normal = np.einsum("...mk,...ml->...kl", weighted, basis)
+    proj = np.einsum("...mk,...m->...k", weighted, z)
+
+    cov = np.linalg.inv(normal)
+    g = np.einsum("...kl,...l->...k", cov, proj)
+
+    residue = z - np.einsum("...mk,...k->...m", basis, g)
+    chi_sq = np.einsum("...m,...m->...", weights, np.abs(residue) ** 2)
+
+    return g, cov, chi_sq
+
+
+class PhasorFit:
+    """
+    Complex gains `g` such that the phasor of a target is the sum of those
+    of the sources, `z = sum_k g_k z_k`. `|g_k|` and `arg(g_k)` are the
+    amplitude factor and phase shift of each source.
+    """
+
+    def __init__(
+        self,
+        gains: np.ndarray,
+        cov: np.ndarray,
+        chi_sq: float,
+        dof: int
+    ):
+        self.gains = gains
+        self.cov = cov
+        self.chi_sq = chi_sq
+        self.dof = dof
+
+    @property
+    def chi_sq_r(self) -> float:
+        return self.chi_sq / self.dof
+
+    @property
+    def err_gains(self) -> np.ndarray:
+        """
+        Standard deviation of the real (and of the imaginary) part of each
+        gain.
+        """
+
+        return np.sqrt(np.diagonal(self.cov, axis1=-2, axis2=-1).real / 2)
+
+    def result(self) -> dict:
+        """
+        Gains as amplitude factors and phase shifts, like `fit.utils.result`.
+        """
+
+        err = self.err_gains
+
+        return {
+            "Factor": np.abs(self.gains),
+            "Error Factor": err,
+            "Phase [rad]": np.angle(self.gains),
+            "Error Phase [rad]": err / np.abs(self.gains),
+            "chi_sq_r": np.full(self.gains.shape, self.chi_sq_r),
+        }
+
+    def predict(self, sources: Waves) -> Waves:
+        """
+        Amplitude and phase of the superposition of `sources` with the fitted
+        gains, at every position. Errors include those of the gains and of
+        the sources.
+        """
+
+        basis = sources.phasor
+
+        z = basis @ self.gains
+
+        var = np.einsum(
+            "...k,kl,...l->...", basis, self.cov, basis.conj()
+        ).real
+        var += (np.abs(self.gains) ** 2 * sources.err_phasor ** 2).sum(axis=-1)
+
+        ampl = np.abs(z)
+        err_ampl = np.sqrt(var / 2)
+
+        return Waves(ampl, np.angle(z), err_ampl, err_ampl / ampl)
+
+
+def fit_phasors(
+    target: Waves,
+    sources: Waves,
+    absolute_sigma: bool = False
+) -> PhasorFit:
+    """
+    Fit `target` (M positions, one channel) as a superposition of `sources`
+    (M, K), using both amplitude and phase. Errors of the sources are added
+    to those of the target with the gains of a first pass, weighted by the
+    errors of the target only. As in
+    `scipy.optimize.curve_fit`, the covariance is scaled by the reduced chi
+    squared unless `absolute_sigma`.
+    """
+
+    z = target.phasor.reshape(len(target))
+    basis = sources.phasor
+    err_target = target.err_phasor.reshape(len(target))
+
+    gains, _, _ = complex_lstsq(z, basis, err_target)
+
+    sigma = np.sqrt(
+        err_target ** 2
+        + (np.abs(gains) ** 2 * sources.err_phasor ** 2).sum(axis=-1)
+    )
+
+    gains, cov, chi_sq = complex_lstsq(z, basis, sigma)
+
+    dof = len(target) - gains.size
+
+    if dof <= 0:
+        raise ValueError(
+            f"Need more than {gains.size} positions to fit {gains.size} gains."
+        )
+
+    if not absolute_sigma:
+        cov = cov * (chi_sq / dof)
+
+    logger.info(f"Phasor gains {gains}, chi_sq_r = {chi_sq / dof:.4g}.")
+
+    return PhasorFit(gains, cov, chi_sq, dof)
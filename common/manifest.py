@@ -0,0 +1,364 @@
+import importlib
+import logging
+import os
+import sys
+import tomllib
+from pathlib import Path
+from common import batch, data, fit, perf, schedule, watch
+
+# manifest
+logger = logging.getLogger(__name__)
+
+# Every course declares its analyses in this file, e.g.
+#
+#   [pol-fit]
+#   run = "src.pol:main"          # function called, "module:attribute"
+#   args = ["$path", "fit"]       # "$path": course directory, "$model": model
+#   data = "pol"                  # data/pol.csv
+#   worksheet = "DETECTOR"        # where to fetch it from
+#   cellrange = "A2:G21"
+#   model = "cos_sq"              # name in `fit.f`
+#   inputs = ["src/pol_fit.py", "results/pol_cos2.csv"]
+#   outputs = ["results/pol_fit.csv"]
+#
+# Paths are relative to the course directory. The data file and the source of
+# `run` are always inputs.
+MANIFEST_FILE = "manifest.toml"
+
+KEYS = {
+    "run", "args", "data", "worksheet", "cellrange", "model", "inputs",
+    "outputs"
+}
+
+# Only show what would be fetched and run
+opt_plan = False
+
+# Course currently on `sys.path`, see `_enter()`
+_current: Path = None
+
+
+class Analysis:
+    """
+    One entry of a course manifest.
+    """
+
+    def __init__(self, course: Path, name: str, entry: dict):
+        where = f"'{name}' in '{course / MANIFEST_FILE}'"
+
+        unknown = entry.keys() - KEYS
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} for {where}.")
+
+        if "run" not in entry:
+            raise ValueError(f"Missing 'run' for {where}.")
+
+        if "$model" in entry.get("args", []) and "model" not in entry:
+            raise ValueError(f"'$model' is used but not set for {where}.")
+
+        self.course = course
+        self.name = name
+        self.run = entry["run"]
+        self.args = entry.get("args", ["$path"])
+        self.data = entry.get("data")
+        self.worksheet = entry.get("worksheet")
+        self.cellrange = entry.get("cellrange")
+        self.model = entry.get("model")
+        self.inputs = entry.get("inputs", [])
+        self.outputs = entry.get("outputs", [])
+
+    @property
+    def source(self) -> str:
+        """
+        File of the module of `run`, relative to the course directory.
+        """
+
+        module = self.run.split(":")[0]
+
+        return module.replace(".", "/") + ".py"
+
+    @property
+    def csv_file(self) -> Path | None:
+        if self.data is None:
+            return None
+
+        return self.course / data.DATA_DIR / f"{self.data}.csv"
+
+    def __repr__(self) -> str:
+        return f"Analysis({self.name!r}, run={self.run!r})"
+
+
+class Task:
+    """
+    Picklable call of an analysis, run with its course directory as the
+    working directory and first in `sys.path`, like its own `main.py` would.
+    `name` is the one stages are credited to (see `perf.analysis()`).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        course: Path,
+        run: str,
+        args: list,
+        model: str = None
+    ):
+        self.name = name
+        self.course = course
+        self.run = run
+        self.args = args
+        self.model = model
+
+    def _arg(self, arg):
+        match arg:
+            case "$path":
+                return self.course
+
+            case "$model":
+                return fit.f.get(self.model)
+
+            case _:
+                return arg
+
+    def __call__(self) -> None:
+        with perf.analysis(self.name):
+            _enter(self.course)
+
+            module, attribute = self.run.split(":")
+            func = getattr(importlib.import_module(module), attribute)
+
+            func(*[self._arg(arg) for arg in self.args])
+
+
+def _enter(course: Path) -> None:
+    """
+    Make `src` refer to the scripts of `course`. Scripts of the previous
+    course are forgotten, including functions they registered in `fit.f`.
+    """
+
+    global _current
+
+    if course == _current:
+        return
+
+    for name in list(sys.modules):
+        if name == "src" or name.startswith("src."):
+            del sys.modules[name]
+
+    for name in fit.f.available():
+        if name.startswith("src."):
+            fit.f.unregister(name)
+
+    if _current is not None and str(_current) in sys.path:
+        sys.path.remove(str(_current))
+
+    sys.path.insert(0, str(course))
+    importlib.invalidate_caches()
+
+    os.chdir(course)
+
+    _current = course
+
+
+def load(course: Path) -> list[Analysis]:
+    """
+    Read the manifest of the course in `course`.
+    """
+
+    manifest_file = course / MANIFEST_FILE
+
+    if not manifest_file.is_file():
+        raise FileNotFoundError(f"Could not find '{manifest_file}'.")
+
+    logger.info(f"Reading '{manifest_file}'.")
+
+    with open(manifest_file, "rb") as file:
+        entries = tomllib.load(file)
+
+    return [Analysis(course, name, entry) for name, entry in entries.items()]
+
+
+def targets(args: list[str]) -> dict[Path, list[str] | None]:
+    """
+    Parse command line targets, "<course>" for every analysis of a course or
+    "<course>:<name>,<name>" for some of them.
+    """
+
+    result = {}
+
+    for arg in args:
+        course, _, names = arg.partition(":")
+
+        result[Path(course).resolve()] = names.split(",") if names else None
+
+    return result
+
+
+def plan(
+    courses: dict[Path, list[str] | None]
+) -> tuple[Path, list[Analysis], list[schedule.Node], list[str] | None]:
+    """
+    Build the graph of every analysis of `courses` ({ course: names }, None
+    for all). Returns the common directory of the courses, the analyses and
+    their nodes (in the same order), and the names of the nodes asked for, or
+    None for all. With more than one course, node names are prefixed by the
+    name of their course directory.
+    """
+
+    root = Path(os.path.commonpath(courses))
+    prefixed = len(courses) > 1
+
+    if prefixed:
+        labels = [course.name for course in courses]
+        repeated = {label for label in labels if labels.count(label) > 1}
+
+        if repeated:
+            raise ValueError(f"Courses with the same name: {sorted(repeated)}.")
+
+    analyses = []
+    nodes = []
+    only = []
+
+    for course, names in courses.items():
+        course_analyses = load(course)
+
+        known = [a.name for a in course_analyses]
+        unknown = set(names or []) - set(known)
+
+        if unknown:
+            raise ValueError(
+                f"Unknown analyses {sorted(unknown)} in '{course}'. "
+                f"Available: {', '.join(known)}."
+            )
+
+        prefix = f"{course.name}/" if prefixed else ""
+
+        def relative(file: str, course=course) -> str:
+            return (course / file).relative_to(root).as_posix()
+
+        for a in course_analyses:
+            inputs = [a.source] + a.inputs
+
+            if a.data is not None:
+                inputs.append(f"{data.DATA_DIR}/{a.data}.csv")
+
+            analyses.append(a)
+            nodes.append(schedule.Node(
+                prefix + a.name,
+                Task(prefix + a.name, course, a.run, a.args, a.model),
+                [relative(i) for i in dict.fromkeys(inputs)],
+                [relative(o) for o in a.outputs]
+            ))
+
+            if names is None or a.name in names:
+                only.append(prefix + a.name)
+
+    if len(only) == len(nodes):
+        only = None
+
+    return root, analyses, nodes, only
+
+
+def fetches(analyses: list[Analysis]) -> dict[Path, dict[str, tuple]]:
+    """
+    Data to get from the sheets before running `analyses`: missing files,
+    or every one if "-R" was passed. Returns
+    `{ course: { stem: (worksheet, cellrange) } }`.
+    """
+
+    result = {}
+
+    for a in analyses:
+        if a.worksheet is None or a.data is None:
+            continue
+
+        if a.csv_file.is_file() and not data.opt_regen_sheets:
+            continue
+
+        result.setdefault(a.course, {})[a.data] = (a.worksheet, a.cellrange)
+
+    return result
+
+
+def fetch(requests: dict[Path, dict[str, tuple]]) -> None:
+    """
+    Get the data of every course with one request per document, several
+    documents at the same time. Analyses then read the saved files instead
+    of fetching again.
+    """
+
+    with perf.analysis("(fetch)"):
+        errors = data.generate_all(requests) if requests else {}
+
+    for course, e in errors.items():
+        # The analyses will report it
+        logger.error(
+            f"Could not fetch data for '{course}'. {type(e).__name__}: {e}"
+        )
+
+    data.opt_regen_sheets = False
+
+
+def show(
+    root: Path,
+    nodes: list[schedule.Node],
+    only: list[str] | None,
+    requests: dict[Path, dict[str, tuple]]
+) -> None:
+    """
+    Print what `run()` would do.
+    """
+
+    for course, course_requests in requests.items():
+        print(f"Fetch for '{course.relative_to(root.parent)}':")
+
+        for stem, (worksheet, cellrange) in course_requests.items():
+            print(f"    {stem}: '{worksheet}'!{cellrange}")
+
+    to_run = schedule.pending(root, nodes, only=only)
+    wanted = schedule.downstream(nodes, set(only)) if only is not None \
+        else {n.name for n in nodes}
+
+    for i, level in enumerate(schedule.levels(nodes), start=1):
+        names = [
+            n.name if n.name in to_run else f"({n.name})"
+            for n in level if n.name in wanted
+        ]
+
+        if names:
+            print(f"Level {i}: {' '.join(names)}")
+
+    if not to_run:
+        print("Everything is up to date.")
+
+
+def run(courses: dict[Path, list[str] | None]) -> list[batch.Outcome]:
+    """
+    Run analyses of one or more courses ({ course: names }, None for all) in
+    this process: fetch missing data in batch, then run what changed in
+    dependency order, in parallel where possible (see `schedule.run()`).
+    """
+
+    root, analyses, nodes, only = plan(courses)
+
+    wanted = schedule.downstream(nodes, set(only)) if only is not None \
+        else {n.name for n in nodes}
+
+    requests = fetches([
+        a for a, n in zip(analyses, nodes) if n.name in wanted
+    ])
+
+    if opt_plan:
+        show(root, nodes, only, requests)
+        return []
+
+    fetch(requests)
+
+    # Keep running, rerun on changes
+    if watch.opt_watch:
+        if len(courses) > 1:
+            raise ValueError("Can only watch one course at a time.")
+
+        watch.loop(root, [n for n in nodes if n.name in wanted])
+        return []
+
+    return schedule.run(root, nodes, only=only)
@@ -0,0 +1,198 @@
+import atexit
+import cProfile
+import contextlib
+import contextvars
+import logging
+import time
+from collections import defaultdict
+
+# perf
+logger = logging.getLogger(__name__)
+
+opt_profile = False
+opt_profile_dump: str = None
+
+# { analysis: { stage: [calls, seconds] } }
+_stages: dict[str, dict[str, list]] = defaultdict(
+    lambda: defaultdict(lambda: [0, 0.0])
+)
+
+# { analysis: { counter: value } }
+_counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+_profiler: cProfile.Profile = None
+
+
+# Name of the analysis being run, set by `manifest.Task` (see `analysis()`).
+# A context variable rather than the stack, which in scripts run by module
+# name or in threads doesn't lead to the analysis.
+_current: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "analysis",
+    default="?"
+)
+
+# Stack of (analysis, start time) of the stages being timed. Stages nest, so
+# one stack per context is enough; each thread starts with its own.
+_starts: contextvars.ContextVar[tuple] = contextvars.ContextVar(
+    "starts",
+    default=()
+)
+
+
+@contextlib.contextmanager
+def analysis(name: str):
+    """
+    Credit the stages and counters recorded inside to the analysis `name`.
+    """
+
+    token = _current.set(name)
+
+    try:
+        yield
+
+    finally:
+        _current.reset(token)
+
+
+def _analysis() -> str:
+    """
+    Name of the analysis being run.
+    """
+
+    return _current.get()
+
+
+class stage(contextlib.ContextDecorator):
+    """
+    Time a stage of an analysis. Works both as a context manager
+
+        with perf.stage("fit"):
+            ...
+
+    and as a decorator (`@perf.stage("sheet fetch")`). Does nothing unless
+    `-P` was passed to the program.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if opt_profile:
+            _starts.set(_starts.get() + ((_analysis(), time.perf_counter()),))
+
+        return self
+
+    def __exit__(self, *exc):
+        starts = _starts.get()
+
+        if opt_profile and starts:
+            analysis, start = starts[-1]
+            _starts.set(starts[:-1])
+
+            entry = _stages[analysis][self.name]
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+        return False
+
+
+def count(name: str, n: int = 1, analysis: str = None) -> None:
+    """
+    Add `n` to the counter `name` of the current analysis.
+    """
+
+    if not opt_profile:
+        return
+
+    if analysis is None:
+        analysis = _analysis()
+
+    _counters[analysis][name] += n
+
+
+def counted(func, name: str):
+    """
+    Wrap `func` so that every call is added to the counter `name`. The analysis
+    is looked up once, since the wrapper is usually called many times in a row.
+    """
+
+    if not opt_profile:
+        return func
+
+    analysis = _analysis()
+
+    def wrapper(*args, **kwargs):
+        _counters[analysis][name] += 1
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def enable(dump: str = None) -> None:
+    """
+    Start recording stages. If `dump` is given, also run cProfile and write
+    its stats to `dump` at exit (readable by `pstats`, snakeviz, flameprof...).
+    Worker processes don't send their stages back, so parallel code runs
+    serially while `opt_profile` is set.
+    """
+
+    global opt_profile, opt_profile_dump, _profiler
+
+    if not opt_profile:
+        atexit.register(_at_exit)
+
+    opt_profile = True
+
+    if dump is not None and _profiler is None:
+        opt_profile_dump = dump
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def _at_exit() -> None:
+    if _profiler is not None:
+        _profiler.disable()
+
+        logger.info(f"Saving cProfile stats at '{opt_profile_dump}'.")
+        _profiler.dump_stats(opt_profile_dump)
+
+    report()
+
+
+def report() -> None:
+    """
+    Print the time spent in each stage of each analysis.
+    """
+
+    if not _stages and not _counters:
+        return
+
+    header = f"{'Analysis':<20} {'Stage':<32} {'Calls':>7} {'Total [s]':>10}" \
+        f" {'Mean [ms]':>10}"
+
+    print("Profiling:")
+    print(header)
+    print("-" * len(header))
+
+    for analysis in sorted(set(_stages) | set(_counters)):
+        stages = _stages.get(analysis, {})
+
+        # Slowest stages first
+        for name, (calls, seconds) in sorted(
+            stages.items(),
+            key=lambda item: item[1][1],
+            reverse=True
+        ):
+            print(
+                f"{analysis:<20} {name:<32} {calls:>7} {seconds:>10.4f}"
+                f" {1000 * seconds / calls:>10.3f}"
+            )
+
+        total = sum(seconds for _, seconds in stages.values())
+        print(f"{analysis:<20} {'(total)':<32} {'':>7} {total:>10.4f}")
+
+        for name, value in _counters.get(analysis, {}).items():
+            print(f"{analysis:<20} {name:<32} {value:>7}")
+
+        print("-" * len(header))
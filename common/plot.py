@@ -1,4 +1,5 @@
-from common import utils, fit
+from common import utils, fit, perf
+from common.data import Column, parse_label, scale
 import logging
 import numpy as np
 import matplotlib.pyplot as plt
@@ -18,6 +19,9 @@ DPI = 100
 FONT_SIZE = 18
 DEFAULT_FMT = "o"
 
+# Beyond this many points, `explore()` draws the data without errorbars
+MAX_ERRORBARS = 5000
+
 logger = logging.getLogger(__name__)
 
 opt_show_plots = False
@@ -28,9 +32,18 @@ plt.rcParams.update({"font.size": FONT_SIZE})
 def save(
     filename: Path = None,
     append: str = None,
+    fig: Figure = None,
     **kwargs
 ):
-    plt.tight_layout()
+    """
+    Save `fig` (by default the current figure) in "plots/", named after the
+    calling script unless `filename` is given, and close it.
+    """
+
+    if fig is None:
+        fig = plt.gcf()
+
+    fig.tight_layout()
 
     # Default save location
     if filename is None:
@@ -45,13 +58,14 @@ def save(
             f"{filename.stem}-{append}{filename.suffix}"
 
     logger.info(f"Saving figure at '{filename}'.")
-    plt.savefig(filename, **kwargs)
+    with perf.stage(f"savefig {filename.name}"):
+        fig.savefig(filename, **kwargs)
 
     if opt_show_plots:
         logger.info(f"Showing plot for '{filename.stem}'.")
         plt.show()
 
-    plt.close()
+    plt.close(fig)
 
 
 def get_units(label: str) -> str:
@@ -63,18 +77,15 @@ def get_units(label: str) -> str:
     if label is None:
         return ""
 
-    # Units are always at the end of a string
-    units = label.split(" ")[-1]
+    unit = parse_label(label)[1]
 
-    # Units are enclosed by "[]"
-    if units[0] == '[' and units[-1] == ']':
-        return units
-
-    else:
-        return ""
+    return f"[{unit}]" if unit is not None else ""
 
 
 def _data_name(data) -> str | None:
+    if isinstance(data, Column):
+        return data.label
+
     if isinstance(data, Series):
         return data.name
 
@@ -245,8 +256,8 @@ def data_and_fit(
     fitlabel: str = "Ajuste",
     xlabel: str = None,
     ylabel: str = None,
-    units: float = None,
-    residue_units: tuple[float, str] = None,
+    units: float | str = None,
+    residue_units: tuple[float, str] | str = None,
     noshow=False,
     saveto: Path = None,
     **kwargs
@@ -254,14 +265,33 @@ def data_and_fit(
     """
     Plot data, fit and residue. Works similar to `plot.data()` except that
     `y_data` may only contain a single array of data.
+    `units` scales the data, its errors, the fit and the residue, either by
+    a factor or to the given units (if the units of `y_data` are known, e.g.
+    from its label); the residue alone with `residue_units`, a
+    `(factor, units)` tuple or the units. The arrays passed in are never
+    modified.
     """
 
+    xlabel = xlabel if xlabel is not None else _data_name(x_data)
+
     if units is not None:
-        if ylabel is None:
+        if isinstance(units, str):
+            name, unit = parse_label(
+                ylabel if ylabel is not None else _data_name(y_data)
+            )
+
+            units, ylabel = scale(unit, units), f"{name} [{units}]"
+
+        elif ylabel is None:
             logger.warning("Did not change ylabel to accomodate for units.")
-        y_data *= units
 
-    xlabel = xlabel if xlabel is not None else _data_name(x_data)
+        y_data = y_data * units
+
+        # The errors of y too
+        (xerr, yerr) = error if isinstance(error, tuple) else (None, error)
+        yerr = yerr * units if yerr is not None else None
+        error = (xerr, yerr) if isinstance(error, tuple) else yerr
+
     ylabel = ylabel if ylabel is not None else _data_name(y_data)
 
     fig, ax = data(
@@ -313,6 +343,14 @@ def data_and_fit(
     )
 
     yerr = error[1] if isinstance(error, tuple) else error
+    residue = fit_func.residue
+
+    if units is not None:
+        residue = residue * units
+
+    if isinstance(residue_units, str):
+        unit = parse_label(ylabel)[1]
+        residue_units = (scale(unit, residue_units), residue_units)
 
     if residue_units is None:
         # Use units from ylabel
@@ -320,14 +358,14 @@ def data_and_fit(
 
     else:
         # Change units for residue
-        fit_func.residue *= residue_units[0]
-        yerr *= residue_units[0]
+        residue = residue * residue_units[0]
+        yerr = yerr * residue_units[0]
 
         ylabel = f"Residuos [{residue_units[1]}]"
 
     ax_res.errorbar(
         x_data,
-        fit_func.residue,
+        residue,
         yerr=yerr,
         fmt=fmt)
 
@@ -355,35 +393,336 @@ def data_polar(
     rorigin=None,
     rlabel=None,
     fmt=DEFAULT_FMT,
+    bins: int = None,
+    bin_width: float = None,
     **kwargs
-):
+) -> tuple[Figure, Any]:
     """
-    Plot data in polar coordinates.
+    Plot data in polar coordinates, `theta_data` in radians. If `bins` or
+    `bin_width` (radians) is given, points and their errors are first
+    averaged in bins of angle (see `polar.bin_scan()`). More than
+    `MAX_ERRORBARS` points are drawn as a line, without errorbars.
     """
 
+    from common import polar
+
+    theta_data = np.asarray(theta_data, dtype=float)
+    r_data = np.asarray(r_data, dtype=float)
+
+    if bins is not None or bin_width is not None:
+        theta_data, r_data, terr, rerr, _ = polar.bin_scan(
+            theta_data, r_data, rerr, terr, bins=bins, width=bin_width
+        )
+
     fig, ax = plt.subplots(
         figsize=figsize,
         subplot_kw={'projection': 'polar'},
-        *kwargs
+        **kwargs
     )
 
-    ax.errorbar(
-        theta_data,
-        r_data,
-        xerr=terr,
-        yerr=rerr,
-        fmt=fmt,
-        label=label
-    )
+    if theta_data.size <= MAX_ERRORBARS:
+        ax.errorbar(
+            theta_data,
+            r_data,
+            xerr=terr,
+            yerr=rerr,
+            fmt=fmt,
+            label=label
+        )
 
-    ax.set_thetamin(np.min(theta_data * 180 / np.pi))
-    ax.set_thetamax(np.max(theta_data * 180 / np.pi))
+    else:
+        order = np.argsort(theta_data)
+        ax.plot(theta_data[order], r_data[order], label=label)
+
+    ax.set_thetamin(np.degrees(np.min(theta_data)))
+    ax.set_thetamax(np.degrees(np.max(theta_data)))
     ax.set(ylabel=rlabel)
 
+    if title is not None:
+        ax.set_title(title)
+
     if rorigin is not None:
         ax.set_rorigin(rorigin)
 
     if label is not None:
         ax.legend()
 
-    return
+    return fig, ax
+
+
+class Explorer:
+    """
+    Interactive explorer of a `fit.f.Function` over data: one slider per
+    parameter, a readout of chi^2 and residuals, and a button that fits
+    starting from the current values. Keep a reference to it while the
+    figure is open, otherwise the widgets stop responding.
+
+    Only the model curve, the readout and the moved slider are redrawn
+    (blitting, if the backend supports it), so the data is drawn once.
+    """
+
+    def __init__(
+        self,
+        func: fit.f.Function,
+        x_data,
+        y_data,
+        yerr=None,
+        p0=None,
+        ranges: dict[str, tuple[float, float]] = None,
+        xlabel: str = None,
+        ylabel: str = None,
+        figsize=DEFAULT_FIGSIZE
+    ):
+        from matplotlib.widgets import Button, Slider
+
+        self.func = func
+
+        self.x_name = _data_name(x_data) if xlabel is None else xlabel
+        self.y_name = _data_name(y_data) if ylabel is None else ylabel
+
+        self.x = np.asarray(x_data, dtype=float)
+        self.y = np.asarray(y_data, dtype=float)
+        self.yerr = None if yerr is None else np.broadcast_to(
+            np.asarray(yerr, dtype=float), self.y.shape
+        )
+
+        if p0 is None and func.guess is not None:
+            p0 = func.guess(self.x, self.y)
+
+        if p0 is None:
+            p0 = np.ones(len(func.params))
+
+        self.p = np.array(p0, dtype=float)
+        self.p_err = None
+
+        n_params = len(func.params)
+
+        self.fig = plt.figure(figsize=figsize)
+
+        # Room for the sliders and the button below the plot
+        bottom = 0.17 + 0.05 * n_params
+        self.ax = self.fig.add_axes([0.15, bottom, 0.8, 0.95 - bottom])
+
+        # Drawn once, errorbars only while they don't slow down redraws
+        if self.x.size <= MAX_ERRORBARS:
+            _plot_errorbar(
+                self.ax,
+                x_data, y_data,
+                None, self.yerr,
+                DEFAULT_FMT, None, self.x_name, self.y_name
+            )
+
+        else:
+            self.ax.plot(self.x, self.y, ",")
+            self.ax.set(xlabel=self.x_name, ylabel=self.y_name)
+            self.ax.grid(True)
+
+        # Model evaluated at as many points as the plot is wide
+        self.x_fit = np.linspace(
+            np.min(self.x), np.max(self.x), int(figsize[0] * DPI)
+        )
+
+        self.line, = self.ax.plot(
+            self.x_fit, func.f(self.x_fit, *self.p), animated=True
+        )
+
+        self.readout = self.ax.text(
+            0.02, 0.97, "",
+            transform=self.ax.transAxes,
+            va="top",
+            linespacing=1.5,
+            fontsize=FONT_SIZE * 2 // 3,
+            animated=True
+        )
+
+        ranges = {} if ranges is None else ranges
+
+        self.sliders = []
+        for i, (name, value) in enumerate(zip(func.params, self.p)):
+            valmin, valmax = ranges.get(name, self._range(i, value))
+
+            slider = Slider(
+                ax=self.fig.add_axes([0.15, 0.05 + 0.05 * i, 0.45, 0.03]),
+                label=name,
+                valmin=valmin,
+                valmax=valmax,
+                valinit=value
+            )
+
+            # Drawn here, see `_update()`
+            slider.drawon = False
+            slider.valtext.set_animated(True)
+
+            slider.on_changed(
+                lambda val, i=i: self._update(i, val)
+            )
+
+            self.sliders.append(slider)
+
+        self.button = Button(
+            self.fig.add_axes([0.8, 0.05, 0.17, 0.05]),
+            "Ajustar"
+        )
+        self.button.on_clicked(lambda _: self.fit())
+
+        self.background = None
+        self.canvas = self.fig.canvas
+
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+        self._refresh()
+
+    def _range(self, i: int, value: float) -> tuple[float, float]:
+        """
+        Default slider range: the value give or take itself, within the
+        bounds of the function.
+        """
+
+        span = abs(value) if value != 0 else 1.0
+        valmin, valmax = value - span, value + span
+
+        if self.func.bounds is not None:
+            valmin = max(valmin, self.func.bounds[0][i])
+            valmax = min(valmax, self.func.bounds[1][i])
+
+        return valmin, valmax
+
+    def chi_sq(self) -> tuple[float, float, float]:
+        """
+        Chi^2, reduced chi^2 and RMS residue for the current parameters.
+        Without errors, the chi^2 is the plain sum of squared residues.
+        """
+
+        residue = self.func.f(self.x, *self.p) - self.y
+
+        rms = np.sqrt(np.mean(residue ** 2))
+
+        if self.yerr is not None:
+            residue /= self.yerr
+
+        chi_sq = float(np.dot(residue, residue))
+        dof = max(self.y.size - self.p.size, 1)
+
+        return chi_sq, chi_sq / dof, rms
+
+    def _refresh(self) -> None:
+        """
+        Recompute the model curve and the readout.
+        """
+
+        self.line.set_ydata(self.func.f(self.x_fit, *self.p))
+
+        chi_sq, chi_sq_r, rms = self.chi_sq()
+
+        text = f"$\\chi^2$ = {chi_sq:.4g}\n" \
+            f"$\\chi^2_r$ = {chi_sq_r:.4g}\n" \
+            f"RMS residuos = {rms:.4g} {get_units(self.y_name)}"
+
+        if self.p_err is not None:
+            text += "\n" + "\n".join(
+                f"{name} = {value:.4g} ± {err:.2g}" for name, value, err
+                in zip(self.func.params, self.p, self.p_err)
+            )
+
+        self.readout.set_text(text)
+
+    def _draw_animated(self, sliders) -> None:
+        for slider in sliders:
+            self.fig.draw_artist(slider.ax)
+            self.fig.draw_artist(slider.valtext)
+
+        self.fig.draw_artist(self.line)
+        self.fig.draw_artist(self.readout)
+
+    def _on_draw(self, event) -> None:
+        # Everything but the animated artists, to restore before each update
+        if self.canvas.supports_blit:
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+        self._draw_animated(self.sliders)
+
+    def _update(self, i: int, value: float) -> None:
+        self.p[i] = value
+        self.p_err = None
+
+        self._refresh()
+
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+
+        self.canvas.restore_region(self.background)
+        self._draw_animated([self.sliders[i]])
+        self.canvas.blit(self.fig.bbox)
+
+    def fit(self) -> None:
+        """
+        Fit starting from the current values, and move the sliders to the
+        result.
+        """
+
+        try:
+            p_opt, p_err = fit.utils.find(
+                self.func, self.x, self.y, p0=self.p, yerr=self.yerr
+            )
+
+        except fit.utils.FitError:
+            self.readout.set_text("No se pudo ajustar.")
+            self.canvas.draw_idle()
+            return
+
+        for slider, value in zip(self.sliders, p_opt):
+            # Widen the range if needed
+            slider.valmin = min(slider.valmin, value)
+            slider.valmax = max(slider.valmax, value)
+            slider.ax.set_xlim(slider.valmin, slider.valmax)
+
+            slider.eventson = False
+            slider.set_val(value)
+            slider.eventson = True
+
+        self.p = np.array(p_opt, dtype=float)
+        self.p_err = p_err
+
+        logger.info(f"Fitted {dict(zip(self.func.params, p_opt))}.")
+
+        self._refresh()
+
+        # Full redraw, which also saves the new background
+        self.canvas.draw_idle()
+
+
+def explore(
+    func: fit.f.Function,
+    x_data,
+    y_data,
+    yerr=None,
+    p0=None,
+    ranges: dict[str, tuple[float, float]] = None,
+    xlabel: str = None,
+    ylabel: str = None,
+    figsize=DEFAULT_FIGSIZE,
+    show=True
+) -> Explorer:
+    """
+    Explore `func` over the data interactively, see `Explorer`. Parameters
+    start at `p0` (or the guess of the function) and each slider spans
+    `ranges[param]`. If `show`, blocks until the window is closed; the last
+    parameters are in `explorer.p` (and their errors in `explorer.p_err`, if
+    they were fitted).
+    """
+
+    explorer = Explorer(
+        func, x_data, y_data,
+        yerr=yerr,
+        p0=p0,
+        ranges=ranges,
+        xlabel=xlabel,
+        ylabel=ylabel,
+        figsize=figsize
+    )
+
+    if show:
+        plt.show()
+
+    return explorer
@@ -0,0 +1,108 @@
+import logging
+import numpy as np
+from common import data
+
+# polar
+logger = logging.getLogger(__name__)
+
+# Angular scans (e.g. directivity patterns): r measured at angles theta, in
+# radians. Dense scans are averaged in bins of angle, all bins at once.
+
+
+def deg_to_rad(angle) -> np.ndarray:
+    """
+    Angle in degrees to radians.
+    """
+
+    return np.asarray(angle, dtype=float) * data.scale("deg", "rad")
+
+
+def bin_edges(theta, bins: int = None, width: float = None) -> np.ndarray:
+    """
+    Edges of `bins` bins of equal width, or bins of `width` radians, that
+    cover every angle in `theta`.
+    """
+
+    lo, hi = np.min(theta), np.max(theta)
+
+    if width is not None:
+        bins = max(int(np.ceil((hi - lo) / width)), 1)
+        hi = lo + bins * width
+
+    elif bins is None:
+        raise ValueError("Either the number of bins or their width is needed.")
+
+    return np.linspace(lo, hi, bins + 1)
+
+
+def bin_scan(
+    theta,
+    r,
+    rerr=None,
+    terr=None,
+    bins: int = None,
+    width: float = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Average `r` in bins of `theta` (see `bin_edges()`). With errors `rerr`,
+    the average is weighted by 1/rerr^2 and its error is 1/sqrt(sum of the
+    weights); without, it is the plain mean and its error the standard error
+    of the mean (zero for bins with a single point). Errors `terr` of the
+    angles are propagated to the mean angle with the same weights.
+    Returns the mean angle, mean r, the error of the mean angle (None
+    without `terr`), that of r and the number of points of every bin that
+    has any.
+    """
+
+    theta = np.asarray(theta, dtype=float).ravel()
+    r = np.asarray(r, dtype=float).ravel()
+
+    edges = bin_edges(theta, bins, width)
+    n_bins = edges.size - 1
+
+    # The last edge belongs to the last bin
+    index = np.clip(np.searchsorted(edges, theta, side="right") - 1,
+                    0, n_bins - 1)
+
+    counts = np.bincount(index, minlength=n_bins)
+
+    if rerr is None:
+        weights = np.ones_like(r)
+
+    else:
+        weights = np.broadcast_to(np.asarray(rerr, dtype=float), r.shape)
+        weights = 1 / weights ** 2
+
+    total = np.bincount(index, weights, minlength=n_bins)
+    theta_sum = np.bincount(index, weights * theta, minlength=n_bins)
+    r_sum = np.bincount(index, weights * r, minlength=n_bins)
+
+    full = counts > 0
+
+    total = total[full]
+    counts = counts[full]
+
+    theta_mean = theta_sum[full] / total
+    r_mean = r_sum[full] / total
+
+    theta_err = None
+
+    if terr is not None:
+        terr = np.broadcast_to(np.asarray(terr, dtype=float), r.shape)
+        t_sq = np.bincount(index, (weights * terr) ** 2, minlength=n_bins)
+
+        theta_err = np.sqrt(t_sq[full]) / total
+
+    if rerr is None:
+        r_sq = np.bincount(index, r ** 2, minlength=n_bins)[full]
+        var = np.maximum(r_sq / counts - r_mean ** 2, 0)
+
+        # Sample variance over n, for the error of the mean
+        r_err = np.sqrt(var / np.maximum(counts - 1, 1))
+
+    else:
+        r_err = 1 / np.sqrt(total)
+
+    logger.info(f"Binned {r.size} points into {counts.size} bins.")
+
+    return theta_mean, r_mean, theta_err, r_err, counts
@@ -0,0 +1,175 @@
+import logging
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from common import fit, perf
+
+# polarization
+logger = logging.getLogger(__name__)
+
+# Malus law and the calibration of the detector, fitted at once. At every
+# analyzer angle theta both the voltage V of the detector and the intensity I
+# of a reference meter are measured:
+#
+#   V = y_0 + A cos^2(w (theta - theta_0))     (fit.f.cos_sq)
+#   I = m V + b
+#
+# Both sets of residuals go into one least squares problem, so the errors of
+# m and b include those of the Malus law and every correlation is kept.
+
+PARAMS = fit.f.cos_sq.params + ["m", "b"]
+
+# Below this many runs, fitting in other processes isn't worth it
+PARALLEL_THRESHOLD = 16
+
+
+class MalusFit:
+    """
+    Result of `fit_malus()`: parameters, their errors and full covariance
+    (in the order of `PARAMS`), and the status of the fit.
+    """
+
+    def __init__(
+        self,
+        p_opt: np.ndarray,
+        p_err: np.ndarray,
+        status: fit.utils.FitStatus
+    ):
+        self.p_opt = p_opt
+        self.p_err = p_err
+        self.cov = status.cov
+        self.status = status
+
+        self.values = dict(zip(PARAMS, p_opt))
+        self.errors = dict(zip(PARAMS, p_err))
+
+    def volt(self, theta) -> np.ndarray:
+        """
+        Voltage predicted by the Malus law.
+        """
+
+        return fit.f.cos_sq.f(theta, *self.p_opt[:4])
+
+    def intensity(self, volt) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calibrated intensity for a voltage, and its error from the
+        covariance of m and b.
+        """
+
+        volt = np.asarray(volt, dtype=float)
+
+        m, b = self.p_opt[4:]
+        cov = self.cov[4:, 4:]
+
+        var = volt ** 2 * cov[0, 0] + 2 * volt * cov[0, 1] + cov[1, 1]
+
+        return m * volt + b, np.sqrt(var)
+
+    def result(self) -> list[dict]:
+        """
+        Every parameter in "avg+-err" notation, like `fit.utils.result`.
+        """
+
+        return [{
+            p: f"{self.values[p]}+-{self.errors[p]}" for p in PARAMS
+        }]
+
+
+def _model(n: int):
+    """
+    Joint model for `n` angles: x is the angles twice, the first half gives
+    voltages and the second intensities.
+    """
+
+    def func(x, y_0, A, w, theta_0, m, b):
+        y = fit.f.cos_sq.f(x, y_0, A, w, theta_0)
+        y[n:] *= m
+        y[n:] += b
+
+        return y
+
+    return fit.f.Function(func, PARAMS)
+
+
+def fit_malus(
+    theta,
+    volt,
+    intensity,
+    volt_err=None,
+    intensity_err=None,
+    theta_err: float = None
+) -> MalusFit:
+    """
+    Fit the Malus law of the voltage and the calibration of the intensity
+    at once. If `theta_err` is given, it is added to the errors of both
+    through the slope of the fitted curve, and the fit is repeated.
+    """
+
+    theta = np.asarray(theta, dtype=float)
+    volt = np.asarray(volt, dtype=float)
+    intensity = np.asarray(intensity, dtype=float)
+
+    n = theta.size
+
+    x = np.concatenate([theta, theta])
+    y = np.concatenate([volt, intensity])
+
+    yerr = None
+    if volt_err is not None and intensity_err is not None:
+        yerr = np.concatenate([
+            np.broadcast_to(volt_err, (n,)),
+            np.broadcast_to(intensity_err, (n,))
+        ]).astype(float)
+
+    # Each part on its own first
+    p0 = list(fit.f.cos_sq.guess(theta, volt)) \
+        + list(fit.guess.linear(volt, intensity))
+
+    joint = _model(n)
+
+    p_opt, p_err, status = fit.utils.find(
+        joint, x, y, p0=p0, yerr=yerr, full_output=True
+    )
+
+    if theta_err is not None and yerr is not None:
+        _, A, w, theta_0, m, _ = p_opt
+
+        # dV/dtheta, and dI/dtheta = m dV/dtheta
+        slope = -A * w * np.sin(2 * w * (theta - theta_0))
+        slope = np.concatenate([slope, m * slope])
+
+        yerr = np.hypot(yerr, slope * theta_err)
+
+        p_opt, p_err, status = fit.utils.find(
+            joint, x, y, p0=p_opt, yerr=yerr, full_output=True
+        )
+
+    return MalusFit(p_opt, p_err, status)
+
+
+def _fit_run(args: tuple) -> MalusFit | None:
+    try:
+        return fit_malus(*args)
+
+    except fit.utils.FitError:
+        return None
+
+
+def fit_runs(runs: list[tuple], jobs: int = None) -> list[MalusFit | None]:
+    """
+    `fit_malus()` for every run, each a tuple of its arguments. Runs are
+    fitted in `jobs` processes (all CPUs by default) when there are many.
+    Failed fits give None.
+    """
+
+    if len(runs) < PARALLEL_THRESHOLD or jobs == 1 or perf.opt_profile:
+        return [_fit_run(run) for run in runs]
+
+    workers = jobs or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(
+            _fit_run,
+            runs,
+            chunksize=max(1, len(runs) // (4 * workers))
+        ))
@@ -0,0 +1,387 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import tomllib
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from common import manifest
+
+# report
+logger = logging.getLogger(__name__)
+
+# A report directory has this file instead of a manifest, e.g.
+#
+#   title = "Ultrasonido"
+#   format = "markdown"              # or "latex"
+#   courses = ["../c2", "../c3:amplitud,fase"]
+#
+# `python -m common <report directory>` runs what changed in its courses (same
+# syntax as the command line, relative to the report directory) and writes
+# the report with the figures and results of every analysis, in the order of
+# the manifests.
+REPORT_FILE = "report.toml"
+
+# Where figures are copied, inside the report directory
+FIGURES_DIR = "figures"
+
+# Hashes of the figures copied the last time
+STATE_FILE = ".report.json"
+
+FORMATS = {
+    "markdown": "informe.md",
+    "latex": "informe.tex",
+}
+
+# Figure formats each document can include as they are; others are rasterized
+EMBEDDABLE = {
+    "markdown": {".png", ".svg", ".jpg"},
+    "latex": {".png", ".pdf", ".jpg"},
+}
+
+IMAGE_SUFFIXES = {".png", ".svg", ".pdf", ".jpg"}
+
+# Resolution of rasterized figures
+RASTER_DPI = 200
+
+# Significant figures of errors in tables
+ERROR_DIGITS = 2
+
+
+def is_report(path: Path) -> bool:
+    return (path / REPORT_FILE).is_file()
+
+
+class Report:
+    """
+    Contents of a `REPORT_FILE`.
+    """
+
+    def __init__(self, path: Path):
+        with open(path / REPORT_FILE, "rb") as file:
+            entry = tomllib.load(file)
+
+        self.path = path
+        self.title = entry.get("title", path.name)
+        self.format = entry.get("format", "markdown")
+
+        if self.format not in FORMATS:
+            raise ValueError(
+                f"Unknown format '{self.format}' in '{path / REPORT_FILE}',"
+                f" use one of {list(FORMATS)}."
+            )
+
+        # Relative to the report directory
+        self.courses = manifest.targets([
+            str(path / course) for course in entry.get("courses", [])
+        ])
+
+    @property
+    def document(self) -> Path:
+        return self.path / FORMATS[self.format]
+
+
+def format_value(cell) -> str:
+    """
+    "avg+-err" as "avg ± err", with the error rounded to `ERROR_DIGITS`
+    significant figures and the value to the same decimal place. Other
+    numbers are shortened, anything else is left as is.
+    """
+
+    text = str(cell)
+
+    if "+-" in text:
+        try:
+            value, error = (float(x) for x in text.split("+-"))
+
+        except ValueError:
+            return text
+
+        if not error > 0 or not math.isfinite(error):
+            return f"{value:.6g} ± {error:.2g}"
+
+        decimals = ERROR_DIGITS - 1 - math.floor(math.log10(error))
+
+        value, error = round(value, decimals), round(error, decimals)
+        decimals = max(decimals, 0)
+
+        return f"{value:.{decimals}f} ± {error:.{decimals}f}"
+
+    try:
+        return f"{float(text):.6g}"
+
+    except ValueError:
+        return text
+
+
+def _rows(df: pd.DataFrame) -> tuple[list[str], list[list[str]]]:
+    """
+    Header and rows of a results table. Columns "X" and "Error X" are shown
+    together. Results with a single row (most of them) are shown transposed,
+    one parameter per row.
+    """
+
+    df = df.copy()
+
+    for column in list(df.columns):
+        error = f"Error {column}"
+
+        if error in df.columns:
+            df[column] = [f"{v}+-{e}" for v, e in zip(df[column], df[error])]
+            df = df.drop(columns=error)
+
+    if len(df) == 1:
+        return ["Parámetro", "Valor"], [
+            [str(column), format_value(value)]
+            for column, value in df.iloc[0].items()
+        ]
+
+    return [str(c) for c in df.columns], [
+        [format_value(value) for value in row] for row in df.itertuples(False)
+    ]
+
+
+def _latex_escape(text: str) -> str:
+    for char, escaped in [
+        ("\\", r"\textbackslash{}"), ("&", r"\&"), ("%", r"\%"),
+        ("#", r"\#"), ("_", r"\_"), ("^", r"\^{}"), ("±", r"$\pm$"),
+    ]:
+        text = text.replace(char, escaped)
+
+    return text
+
+
+def _markdown_table(header: list[str], rows: list[list[str]]) -> str:
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + "|".join("---" for _ in header) + "|",
+    ] + ["| " + " | ".join(row) + " |" for row in rows]
+
+    return "\n".join(lines)
+
+
+def _latex_table(header: list[str], rows: list[list[str]]) -> str:
+    lines = [
+        r"\begin{center}",
+        r"\begin{tabular}{" + "l" * len(header) + "}",
+        r"\hline",
+        " & ".join(_latex_escape(h) for h in header) + r" \\",
+        r"\hline",
+    ] + [
+        " & ".join(_latex_escape(c) for c in row) + r" \\" for row in rows
+    ] + [
+        r"\hline",
+        r"\end{tabular}",
+        r"\end{center}",
+    ]
+
+    return "\n".join(lines)
+
+
+def _hash(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def _rasterize(source: Path, dest: Path) -> None:
+    import cairosvg
+
+    cairosvg.svg2png(url=str(source), write_to=str(dest), dpi=RASTER_DPI)
+
+
+def _figure_name(report: Report, source: Path) -> Path:
+    """
+    Where `source` goes in the report, prefixed by its course.
+    """
+
+    course = source.parent.parent.name
+    suffix = source.suffix
+
+    if suffix not in EMBEDDABLE[report.format]:
+        suffix = ".png"
+
+    return Path(FIGURES_DIR) / f"{course}-{source.stem}{suffix}"
+
+
+def _update_figures(
+    report: Report,
+    figures: list[Path],
+    jobs: int = None
+) -> set[Path]:
+    """
+    Copy (or rasterize) every figure that changed since the last time into
+    the report directory. Rasterizing is done in parallel. Returns the
+    figures that are in the report.
+    """
+
+    state_file = report.path / STATE_FILE
+    state = json.loads(state_file.read_text()) if state_file.is_file() else {}
+
+    (report.path / FIGURES_DIR).mkdir(exist_ok=True)
+
+    copies = []
+    rasters = []
+    present = set()
+
+    for source in figures:
+        if not source.is_file():
+            logger.warning(f"Missing figure '{source}'.")
+            continue
+
+        dest = _figure_name(report, source)
+        digest = _hash(source)
+
+        present.add(source)
+
+        if state.get(dest.as_posix()) == digest \
+                and (report.path / dest).is_file():
+            continue
+
+        if dest.suffix == source.suffix:
+            copies.append((source, report.path / dest))
+
+        else:
+            rasters.append((source, report.path / dest))
+
+        state[dest.as_posix()] = digest
+
+    for source, dest in copies:
+        shutil.copyfile(source, dest)
+
+    if rasters:
+        logger.info(f"Rasterizing {len(rasters)} figures.")
+
+        try:
+            if len(rasters) == 1 or jobs == 1:
+                for source, dest in rasters:
+                    _rasterize(source, dest)
+
+            else:
+                workers = min(len(rasters), jobs or os.cpu_count())
+
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(
+                        _rasterize,
+                        [s for s, _ in rasters],
+                        [d for _, d in rasters]
+                    ))
+
+        except ImportError:
+            logger.error("Rasterizing SVG figures needs 'cairosvg'.")
+
+            for source, dest in rasters:
+                present.discard(source)
+                state.pop(_figure_name(report, source).as_posix(), None)
+
+    logger.info(
+        f"Updated {len(copies) + len(rasters)} of {len(present)} figures."
+    )
+
+    state_file.write_text(json.dumps(state, indent=2))
+
+    return present
+
+
+def _sections(report: Report) -> list[tuple[str, list[tuple]]]:
+    """
+    Course name and, for each of its analyses, `(name, figures, results)`.
+    """
+
+    sections = []
+
+    for course, names in report.courses.items():
+        analyses = [
+            a for a in manifest.load(course)
+            if names is None or a.name in names
+        ]
+
+        sections.append((course.name, [
+            (
+                a.name,
+                [course / o for o in a.outputs
+                 if Path(o).suffix in IMAGE_SUFFIXES],
+                [course / o for o in a.outputs if Path(o).suffix == ".csv"],
+            )
+            for a in analyses
+        ]))
+
+    return sections
+
+
+def build(path: Path, jobs: int = None) -> Path:
+    """
+    Write the report of `path` (a directory with a `REPORT_FILE`) from the
+    current figures and results of its courses. Returns the document.
+    """
+
+    report = Report(path)
+    sections = _sections(report)
+
+    figures = [
+        figure
+        for _, analyses in sections
+        for _, course_figures, _ in analyses
+        for figure in course_figures
+    ]
+    present = _update_figures(report, figures, jobs)
+
+    latex = report.format == "latex"
+    table = _latex_table if latex else _markdown_table
+
+    if latex:
+        parts = [
+            "\n".join([
+                r"\documentclass{article}",
+                r"\usepackage[utf8]{inputenc}",
+                r"\usepackage{graphicx}",
+                r"\title{" + _latex_escape(report.title) + "}",
+                r"\begin{document}",
+                r"\maketitle",
+            ])
+        ]
+
+    else:
+        parts = [f"# {report.title}"]
+
+    for course, analyses in sections:
+        parts.append(
+            r"\section{" + _latex_escape(course) + "}" if latex
+            else f"## {course}"
+        )
+
+        for name, figures, results in analyses:
+            parts.append(
+                r"\subsection{" + _latex_escape(name) + "}" if latex
+                else f"### {name}"
+            )
+
+            for figure in figures:
+                if figure not in present:
+                    continue
+
+                dest = _figure_name(report, figure).as_posix()
+
+                parts.append(
+                    r"\begin{center}"
+                    "\n" r"\includegraphics[width=0.8\textwidth]{" + dest + "}"
+                    "\n" r"\end{center}"
+                    if latex else f"![{figure.stem}]({dest})"
+                )
+
+            for result in results:
+                if not result.is_file():
+                    logger.warning(f"Missing results '{result}'.")
+                    continue
+
+                parts.append(table(*_rows(pd.read_csv(result))))
+
+    if latex:
+        parts.append(r"\end{document}")
+
+    report.document.write_text("\n\n".join(parts) + "\n")
+
+    logger.info(f"Wrote '{report.document}'.")
+
+    return report.document
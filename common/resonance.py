@@ -0,0 +1,279 @@
+import logging
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from numpy.lib.stride_tricks import sliding_window_view
+from common import data, fit, perf, plot
+
+# resonance
+logger = logging.getLogger(__name__)
+
+# Frequency sweeps are (S, M) arrays: one row per sweep, one column per
+# frequency. A single sweep may be given as a 1D array. Every peak found is
+# fitted (with `fit.f.lorentz` by default) using only the points around it.
+
+# Fewest points in the window of a peak
+MIN_POINTS = 5
+
+# Below this many peaks, fitting in other processes isn't worth it
+PARALLEL_THRESHOLD = 32
+
+
+def peaks(y, min_height: float = 0.5, separation: int = 3) -> np.ndarray:
+    """
+    Boolean mask of the peaks of every sweep: points which are the maximum
+    of the `2 separation + 1` points around them and at least `min_height`
+    times the maximum of their sweep. All sweeps are searched at once.
+    """
+
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+
+    padded = np.pad(
+        y,
+        ((0, 0), (separation, separation)),
+        constant_values=-np.inf
+    )
+
+    window_max = sliding_window_view(
+        padded, 2 * separation + 1, axis=-1
+    ).max(axis=-1)
+
+    top = np.nanmax(y, axis=-1, keepdims=True)
+
+    mask = (y == window_max) & (y >= min_height * top)
+
+    # Plateaus: keep only their first point
+    mask[:, 1:] &= y[:, 1:] != y[:, :-1]
+
+    return mask
+
+
+def windows(y, mask: np.ndarray, level: float = 0.3) -> np.ndarray:
+    """
+    Index range `[start, stop)` around every peak in `mask`: the points above
+    `level` times the peak, plus the first one below on each side, widened to
+    `MIN_POINTS` if needed. Returns a (P, 3) array of `(sweep, start, stop)`,
+    in the order of `np.nonzero(mask)`.
+    """
+
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    n = y.shape[-1]
+
+    sweep, peak = np.nonzero(mask)
+    index = np.arange(n)
+
+    # Last index below `level` at or before each point, and first at or after,
+    # one peak at a time but every peak at once
+    below = y[sweep] < level * y[sweep, peak][:, None]
+
+    last_below = np.maximum.accumulate(np.where(below, index, -1), axis=-1)
+    next_below = np.minimum.accumulate(
+        np.where(below, index, n)[:, ::-1], axis=-1
+    )[:, ::-1]
+
+    start = np.maximum(last_below[np.arange(peak.size), peak], 0)
+    stop = np.minimum(next_below[np.arange(peak.size), peak] + 1, n)
+
+    # Widen short windows around the peak
+    short = stop - start < MIN_POINTS
+    start[short] = np.clip(peak[short] - MIN_POINTS // 2, 0, n - MIN_POINTS)
+    stop[short] = start[short] + MIN_POINTS
+
+    return np.stack([sweep, start, stop], axis=-1)
+
+
+def _fit_peak(
+    func,
+    bounds,
+    x,
+    y,
+    yerr
+) -> tuple[np.ndarray, np.ndarray, bool, str]:
+    try:
+        p_opt, p_err, status = fit.utils.find(
+            func,
+            x,
+            y,
+            yerr=yerr,
+            bounds=bounds,
+            full_output=True
+        )
+
+    except fit.utils.FitError as e:
+        nan = np.full(len(func.params), np.nan)
+
+        return nan, nan, False, e.status.message
+
+    return p_opt, p_err, status.converged, status.message
+
+
+def analyze(
+    x,
+    y,
+    yerr=None,
+    min_height: float = 0.5,
+    separation: int = 3,
+    level: float = 0.3,
+    func: fit.f.Function = fit.f.lorentz,
+    bounds: tuple = None,
+    jobs: int = None
+) -> dict[str, np.ndarray]:
+    """
+    Find and fit every resonance of one or more sweeps. `x` is shared by
+    every sweep or has the same shape as `y`. Peaks are found with
+    `peaks()`, and each is fitted with `func` (within `bounds`, if given)
+    over its `windows()`, in `jobs` processes (all CPUs by default) when
+    there are many.
+
+    Returns a column for each quantity, one row per peak, ready for
+    `data.save()`: the sweep, every parameter of `func` with its error and
+    whether the fit converged. For `fit.f.lorentz`, w_0, gamma and A, and
+    also Q = w_0 / gamma and the height of the peak A / (gamma w_0)^2, with
+    their errors (propagated as if uncorrelated).
+    """
+
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    x = np.broadcast_to(np.asarray(x, dtype=float), y.shape)
+
+    if yerr is not None:
+        yerr = np.broadcast_to(np.asarray(yerr, dtype=float), y.shape)
+
+    ranges = windows(y, peaks(y, min_height, separation), level)
+
+    logger.info(f"Found {len(ranges)} peaks in {y.shape[0]} sweeps.")
+
+    args = [
+        [a[s, start:stop] for s, start, stop in ranges]
+        if a is not None else [None] * len(ranges)
+        for a in (x, y, yerr)
+    ]
+
+    if len(ranges) < PARALLEL_THRESHOLD or jobs == 1 or perf.opt_profile:
+        fits = list(map(_fit_peak, repeat(func), repeat(bounds), *args))
+
+    else:
+        workers = jobs or os.cpu_count()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fits = list(pool.map(
+                _fit_peak,
+                repeat(func),
+                repeat(bounds),
+                *args,
+                chunksize=max(1, len(ranges) // (4 * workers))
+            ))
+
+    n = len(func.params)
+
+    p_opt = np.array([p for p, _, _, _ in fits]).reshape(-1, n)
+    p_err = np.array([e for _, e, _, _ in fits]).reshape(-1, n)
+
+    result = {"Sweep": ranges[:, 0]}
+
+    if func is fit.f.lorentz:
+        result.update(_lorentz_columns(p_opt, p_err))
+
+    else:
+        for name, value, err in zip(func.params, p_opt.T, p_err.T):
+            result[name] = value
+            result[f"Error {name}"] = err
+
+    result["Converged"] = np.array([c for _, _, c, _ in fits], dtype=bool)
+
+    return result
+
+
+def _lorentz_columns(p_opt, p_err) -> dict[str, np.ndarray]:
+    w_0, gamma, A = p_opt.T
+    err_w_0, err_gamma, err_A = p_err.T
+
+    rel_w_0 = err_w_0 / w_0
+    rel_gamma = err_gamma / gamma
+
+    Q = w_0 / gamma
+    height = A / (gamma * w_0) ** 2
+
+    return {
+        "w_0": w_0,
+        "Error w_0": err_w_0,
+        "gamma": gamma,
+        "Error gamma": err_gamma,
+        "Q": Q,
+        "Error Q": np.abs(Q) * np.hypot(rel_w_0, rel_gamma),
+        "Height": height,
+        "Error Height": np.abs(height) * np.sqrt(
+            (err_A / A) ** 2 + 4 * rel_gamma ** 2 + 4 * rel_w_0 ** 2
+        ),
+        "A": A,
+        "Error A": err_A,
+    }
+
+
+def columns(df) -> tuple:
+    """
+    Frequency sent, amplitude received and its error, from a resonancia
+    sheet: the frequency, the amplitude, the scale and the error of the
+    average.
+    """
+
+    cols = df.columns.values.tolist()
+
+    freq_sent = df[cols[0]]
+    freq_recv = df[cols[1]]
+    div = df[cols[2]]
+    err = df[cols[3]]
+
+    # 3% del valor medido, 5% por la división y el error en el promedio
+    error = 0.03 * freq_recv + 0.05 * div + err
+
+    return freq_sent, freq_recv, error
+
+
+def sweep(
+    df,
+    path: Path,
+    name: str,
+    func: fit.f.Function = fit.f.lorentz,
+    bounds: tuple = None
+) -> dict[str, np.ndarray]:
+    """
+    Shared driver of the resonancia analyses, see `columns()`. Fits every
+    peak with `analyze()`, saves the result at "results/<name>.csv" and
+    plots the sweep with the fitted curves at "plots/<name>.png", relative
+    to `path`.
+    """
+
+    freq_sent, freq_recv, error = columns(df)
+
+    result = analyze(freq_sent, freq_recv, error, func=func, bounds=bounds)
+
+    data.save(result, path/f"results/{name}.csv")
+
+    fig, ax = plot.data(
+        freq_sent,
+        freq_recv,
+        error,
+        xlabel=freq_sent.name,
+        ylabel=freq_recv.name,
+        figsize=(10, 8),
+        noshow=True
+    )
+
+    # Each curve only over the points it was fitted to, the same windows as
+    # in `analyze()`
+    ranges = windows(freq_recv, peaks(freq_recv))
+    freq = np.asarray(freq_sent, dtype=float)
+
+    # Columns of the parameters, see `analyze()`
+    names = ["w_0", "gamma", "A"] if func is fit.f.lorentz else func.params
+
+    for (_, start, stop), *params in zip(ranges, *(result[p] for p in names)):
+        x = np.linspace(freq[start], freq[stop - 1], 200)
+
+        ax.plot(x, func.f(x, *params))
+
+    plot.save(path/f"plots/{name}.png")
+
+    return result
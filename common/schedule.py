@@ -0,0 +1,263 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from common import batch, perf
+
+# schedule
+logger = logging.getLogger(__name__)
+
+# Hashes of the inputs of every node the last time it ran
+STATE_FILE = ".schedule.json"
+
+# Number of processes running nodes at the same time, None for all CPUs
+opt_jobs: int = None
+
+# Run every node, changed or not
+opt_force = False
+
+
+class Node:
+    """
+    One analysis in the dependency graph. `task` is a picklable callable
+    (e.g. a `functools.partial`), `inputs` and `outputs` are the files it
+    reads and writes, relative to the course directory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        task,
+        inputs: list[str] = (),
+        outputs: list[str] = ()
+    ):
+        self.name = name
+        self.task = task
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    def __repr__(self) -> str:
+        return f"Node({self.name!r}, inputs={self.inputs}, " \
+            f"outputs={self.outputs})"
+
+
+def levels(nodes: list[Node]) -> list[list[Node]]:
+    """
+    Sort nodes in levels: every node only depends on nodes of previous
+    levels, so nodes in the same level can run at the same time.
+    """
+
+    producer = {}
+    for n in nodes:
+        for output in n.outputs:
+            if output in producer:
+                raise ValueError(
+                    f"'{output}' is produced by both '{producer[output].name}'"
+                    f" and '{n.name}'."
+                )
+
+            producer[output] = n
+
+    depends = {
+        n.name: {producer[i].name for i in n.inputs if i in producer} - {n.name}
+        for n in nodes
+    }
+
+    result = []
+    done = set()
+    remaining = list(nodes)
+
+    while remaining:
+        level = [n for n in remaining if depends[n.name] <= done]
+
+        if not level:
+            raise ValueError(
+                f"Dependency cycle between {[n.name for n in remaining]}."
+            )
+
+        result.append(level)
+        done |= {n.name for n in level}
+        remaining = [n for n in remaining if n.name not in done]
+
+    return result
+
+
+def downstream(nodes: list[Node], names: set[str]) -> set[str]:
+    """
+    Names of the nodes in `names` and of every node depending on them.
+    """
+
+    result = set(names)
+
+    for level in levels(nodes):
+        for n in level:
+            produced = {o for m in nodes if m.name in result for o in m.outputs}
+
+            if produced & set(n.inputs):
+                result.add(n.name)
+
+    return result
+
+
+def _hash(path: Path) -> str | None:
+    if not path.is_file():
+        return None
+
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def _load_state(path: Path) -> dict:
+    state_file = path / STATE_FILE
+
+    if not state_file.is_file():
+        return {}
+
+    with open(state_file) as file:
+        return json.load(file)
+
+
+def _save_state(path: Path, state: dict) -> None:
+    with open(path / STATE_FILE, "w") as file:
+        json.dump(state, file, indent=2)
+
+
+def _dirty(path: Path, n: Node, hashes: dict, state: dict) -> bool:
+    """
+    A node must run if any of its outputs is missing or any of its inputs
+    changed since it last ran.
+    """
+
+    if n.name not in state:
+        return True
+
+    if any(not (path / o).is_file() for o in n.outputs):
+        return True
+
+    return state[n.name] != hashes
+
+
+def pending(
+    path: Path,
+    nodes: list[Node],
+    only: list[str] = None,
+    force: bool = None
+) -> set[str]:
+    """
+    Names of the nodes `run()` would run with the same arguments, assuming
+    every one of them succeeds.
+    """
+
+    force = opt_force if force is None else force
+
+    wanted = downstream(nodes, set(only)) if only is not None \
+        else {n.name for n in nodes}
+
+    if force:
+        return wanted
+
+    state = _load_state(path)
+
+    dirty = {
+        n.name for n in nodes
+        if n.name in wanted and _dirty(
+            path, n, {i: _hash(path / i) for i in n.inputs}, state
+        )
+    }
+
+    return downstream(nodes, dirty) & wanted
+
+
+def run(
+    path: Path,
+    nodes: list[Node],
+    only: list[str] = None,
+    force: bool = None,
+    jobs: int = None
+) -> list[batch.Outcome]:
+    """
+    Run the graph of `nodes` of the course in `path`, in dependency order,
+    in parallel where possible. Only nodes whose inputs changed (including
+    results of upstream nodes that ran before) are run, unless `force`. If
+    `only` is given, those nodes and their dependents are considered and the
+    rest are left untouched. `force` and `jobs` default to `opt_force` and
+    `opt_jobs`.
+    """
+
+    force = opt_force if force is None else force
+    jobs = opt_jobs if jobs is None else jobs
+
+    state = _load_state(path)
+    wanted = downstream(nodes, set(only)) if only is not None else None
+
+    outcomes = []
+    failed = set()
+
+    for level in levels(nodes):
+        to_run = []
+
+        for n in level:
+            if wanted is not None and n.name not in wanted:
+                continue
+
+            producers = {
+                m.name for m in nodes if set(m.outputs) & set(n.inputs)
+            }
+
+            if producers & failed:
+                logger.warning(f"Skipping '{n.name}', a dependency failed.")
+
+                failed.add(n.name)
+                outcomes.append(batch.Outcome(
+                    n.name, 0.0, [], "Skipped: a dependency failed"
+                ))
+                continue
+
+            # Hash now, upstream nodes already ran
+            hashes = {i: _hash(path / i) for i in n.inputs}
+
+            if force or _dirty(path, n, hashes, state):
+                to_run.append((n, hashes))
+
+            else:
+                logger.info(f"'{n.name}' is up to date.")
+
+        if not to_run:
+            continue
+
+        logger.info(f"Running {[n.name for n, _ in to_run]}.")
+
+        # Stages timed in worker processes would be lost, see `perf.enable()`
+        if len(to_run) == 1 or jobs == 1 or perf.opt_profile:
+            level_outcomes = [batch.run_one(n.name, n.task) for n, _ in to_run]
+
+        else:
+            workers = min(len(to_run), jobs or os.cpu_count())
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                level_outcomes = list(pool.map(
+                    batch.run_one,
+                    [n.name for n, _ in to_run],
+                    [n.task for n, _ in to_run]
+                ))
+
+        for (n, hashes), outcome in zip(to_run, level_outcomes):
+            if outcome.error is None:
+                state[n.name] = hashes
+
+            else:
+                failed.add(n.name)
+                state.pop(n.name, None)
+
+        outcomes += level_outcomes
+
+        _save_state(path, state)
+
+    if outcomes:
+        batch.summary(outcomes)
+
+    else:
+        print("Everything is up to date.")
+
+    return outcomes
@@ -1,8 +1,13 @@
-import gspread
-from google.oauth2.service_account import Credentials
-import sys
+import contextvars
+import csv
+import io
 import logging
+import re
+import threading
+import time
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # sheets
@@ -10,75 +15,462 @@ logger = logging.getLogger(__name__)
 
 CREDS_PATH = Path("~/.config/gspread/labo2_SA.json").expanduser()
 
+# Where the data of a course comes from, see `BACKENDS` ("-S")
+opt_backend = "google"
 
-def open_sheet(path: Path) -> gspread.Spreadsheet:
+# Number of documents fetched at the same time ("-J")
+opt_fetch_jobs = 4
+
+# Google Sheets API quota: requests per user in a period of seconds. Up to
+# `BURST` requests are made at once, then they are spread out so that no
+# period ever has more than `QUOTA`
+QUOTA = 60
+PERIOD = 60.0
+BURST = 10
+
+# Local documents, looked for in this order in the course directory: a
+# spreadsheet with one sheet per worksheet, or a directory with one CSV file
+# per worksheet ("sheet/DETECTOR.csv")
+LOCAL_NAMES = ["sheet.xlsx", "sheet.ods", "sheet"]
+
+
+class SheetError(Exception):
     """
-    Open a Google Sheets document.
-    `path` is a directory containing a file named 'sheet-id', which has the id
-    of the document.
+    Could not fetch a spreadsheet document.
     """
 
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
 
-    creds = Credentials.from_service_account_file(
-        CREDS_PATH,
-        scopes=scopes)
+class TokenBucket:
+    """
+    Rate limiter shared by threads: `acquire()` blocks until a request is
+    allowed. Holds up to `capacity` tokens, refilled at `rate` per second.
+    """
 
-    try:
-        client = gspread.authorize(creds)
+    def __init__(self, capacity: int, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
 
-        logger.info("Opening `sheet-id`.")
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
 
-        with open(path/"sheet-id") as id_file:
-            id = id_file.read().rstrip('\n')
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last) * self.rate
+                )
+                self.last = now
 
-        logger.info(f"Using key `{id}`.")
-        document = client.open_by_key(id)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
 
-        return document
+                wait = (1 - self.tokens) / self.rate
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        logger.error("gpread: Could not find spreadsheet.")
+            time.sleep(wait)
 
-    except gspread.exceptions.NoValidUrlKeyFound:
-        logger.error("gpread: Invalid key.")
 
-    except gspread.exceptions.APIError:
-        logger.error(
-            """
-            gpread: API error, It might be usage limits: For Sheets API v4 it
-            is 300 requests per 60 seconds per project, and 60 requests per 60
-            seconds per user.
-            """)
+# Every request to the Google Sheets API goes through it
+_limiter = TokenBucket(BURST, (QUOTA - BURST) / PERIOD)
 
-    except gspread.exceptions.GSpreadException:
-        logger.error("gpread: Something failed idk.")
 
-    sys.exit(1)
+class Document:
+    """
+    A spreadsheet document with worksheets, from any backend. Cell ranges
+    are in A1 notation, e.g. "A2:G21", and their first row has the column
+    names.
+    """
 
+    def dataframe(self, worksheet: str, cellrange: str = None) -> pd.DataFrame:
+        """
+        Dataframe of a range of cells of a worksheet. If `cellrange` is None,
+        the entire worksheet is converted.
+        """
 
-def get_dataframe(
-    ws: gspread.Worksheet,
-    cellrange: str = None
-) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def dataframes(self, ranges: list[tuple[str, str]]) -> list[pd.DataFrame]:
+        """
+        Same as `dataframe()` for several `(worksheet, cellrange)`.
+        """
+
+        return [self.dataframe(ws, cellrange) for ws, cellrange in ranges]
+
+
+class GoogleDocument(Document):
     """
-    Convert a range of cells of a Google Sheets worksheet into a Pandas
-    dataframe. If `cellrange` is None, the entire worksheet is converted.
+    Google Sheets document. The course directory has a file named 'sheet-id'
+    with the id of the document.
     """
 
-    if cellrange is None:
-        logger.info(
-            f"Getting all gspread records from worksheet '{ws.title}'.")
-        return pd.DataFrame(ws.get_all_records())
+    def __init__(self, path: Path):
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+
+        creds = Credentials.from_service_account_file(
+            CREDS_PATH,
+            scopes=scopes)
+
+        try:
+            client = gspread.authorize(creds)
+
+            logger.info("Opening `sheet-id`.")
+
+            with open(path/"sheet-id") as id_file:
+                id = id_file.read().rstrip('\n')
+
+            logger.info(f"Using key `{id}`.")
+
+            _limiter.acquire()
+            self.document = client.open_by_key(id)
+
+            return
+
+        except gspread.exceptions.SpreadsheetNotFound:
+            message = "gpread: Could not find spreadsheet."
+
+        except gspread.exceptions.NoValidUrlKeyFound:
+            message = "gpread: Invalid key."
+
+        except gspread.exceptions.APIError:
+            message = """
+                gpread: API error, It might be usage limits: For Sheets API v4
+                it is 300 requests per 60 seconds per project, and 60 requests
+                per 60 seconds per user.
+                """
+
+        except gspread.exceptions.GSpreadException:
+            message = "gpread: Something failed idk."
+
+        logger.error(message)
+
+        raise SheetError(message)
+
+    def dataframe(self, worksheet: str, cellrange: str = None) -> pd.DataFrame:
+        _limiter.acquire()
+        ws = self.document.worksheet(worksheet)
+
+        _limiter.acquire()
+
+        if cellrange is None:
+            logger.info(f"Getting all values from worksheet '{ws.title}'.")
+            return _to_dataframe(ws.get_all_values())
+
+        return _to_dataframe(ws.get(cellrange))
+
+    def dataframes(self, ranges: list[tuple[str, str]]) -> list[pd.DataFrame]:
+        # In a single request
+        import gspread
+
+        names = [
+            gspread.utils.absolute_range_name(worksheet, cellrange)
+            for worksheet, cellrange in ranges
+        ]
+
+        logger.info(f"Getting {len(names)} ranges in one request.")
+
+        _limiter.acquire()
+        response = self.document.values_batch_get(names)
+
+        return [
+            _to_dataframe(value_range.get("values", [[]]))
+            for value_range in response["valueRanges"]
+        ]
+
+
+class LocalDocument(Document):
+    """
+    Spreadsheet in the course directory, see `LOCAL_NAMES`: an .xlsx (needs
+    openpyxl) or .ods (needs odfpy) file, or a directory of CSV files.
+    Values are read as text, like Google Sheets gives them.
+    """
+
+    def __init__(self, path: Path):
+        for name in LOCAL_NAMES:
+            if (path / name).exists():
+                self.file = path / name
+                break
+
+        else:
+            message = f"No local sheet in '{path}', expected one of " \
+                f"{LOCAL_NAMES}."
+
+            logger.error(message)
+            raise SheetError(message)
+
+        logger.info(f"Using local sheet '{self.file}'.")
+
+        # Worksheets already read, { name: cells }
+        self.cache: dict[str, list[list[str]]] = {}
+
+    def _cells(self, worksheet: str) -> list[list[str]]:
+        if worksheet in self.cache:
+            return self.cache[worksheet]
+
+        try:
+            if self.file.is_dir():
+                # Rows may have different lengths
+                with open(self.file / f"{worksheet}.csv", newline="") as file:
+                    cells = list(csv.reader(file))
+
+            else:
+                df = pd.read_excel(
+                    self.file,
+                    sheet_name=worksheet,
+                    header=None,
+                    dtype=str,
+                    keep_default_na=False
+                )
+
+                cells = df.fillna("").to_numpy().tolist()
+
+        except (FileNotFoundError, ValueError) as e:
+            message = f"Could not find worksheet '{worksheet}' in " \
+                f"'{self.file}'. {e}"
+
+            logger.error(message)
+            raise SheetError(message) from e
+
+        self.cache[worksheet] = cells
+
+        return self.cache[worksheet]
+
+    def dataframe(self, worksheet: str, cellrange: str = None) -> pd.DataFrame:
+        cells = self._cells(worksheet)
+
+        if cellrange is None:
+            return _to_dataframe(_trim(cells))
+
+        rows, cols = _parse_range(cellrange)
+
+        return _to_dataframe(_trim([row[cols] for row in cells[rows]]))
+
+
+BACKENDS = {
+    "google": GoogleDocument,
+    "local": LocalDocument,
+}
+
+
+def open_sheet(path: Path) -> Document:
+    """
+    Open the spreadsheet document of the course in `path`, with the backend
+    in `opt_backend`.
+    """
+
+    backend = BACKENDS.get(opt_backend)
+
+    if backend is None:
+        raise SheetError(
+            f"Unknown backend '{opt_backend}', use one of {list(BACKENDS)}."
+        )
 
-    data = ws.get(cellrange)
+    return backend(path)
+
+
+def _fetch(path: Path, ranges: list[tuple[str, str]]) -> list[pd.DataFrame]:
+    return open_sheet(path).dataframes(ranges)
+
+
+def fetch_many(
+    requests: dict[Path, list[tuple[str, str]]],
+    jobs: int = None
+) -> dict[Path, list[pd.DataFrame] | Exception]:
+    """
+    `open_sheet(path).dataframes(ranges)` for every `{ path: ranges }`, with
+    up to `jobs` (by default `opt_fetch_jobs`) documents fetched at the same
+    time, so that their latencies overlap. Requests to Google stay within
+    the quota (see `TokenBucket`). A document that fails gives its
+    exception instead of its dataframes.
+    """
+
+    jobs = opt_fetch_jobs if jobs is None else jobs
+
+    results = {}
+
+    def done(count: int, path: Path, result) -> None:
+        results[path] = result
+
+        if isinstance(result, Exception):
+            logger.info(
+                f"[{count}/{len(requests)}] Failed to fetch '{path}': {result}"
+            )
+
+        else:
+            logger.info(f"[{count}/{len(requests)}] Fetched '{path}'.")
+
+    if len(requests) <= 1 or jobs == 1:
+        for count, (path, ranges) in enumerate(requests.items(), start=1):
+            try:
+                done(count, path, _fetch(path, ranges))
+
+            except Exception as e:
+                done(count, path, e)
+
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(requests))) as pool:
+        # Threads don't inherit context variables, e.g. `perf.analysis()`
+        futures = {
+            pool.submit(contextvars.copy_context().run, _fetch, path, ranges):
+                path
+            for path, ranges in requests.items()
+        }
+
+        for count, future in enumerate(as_completed(futures), start=1):
+            try:
+                done(count, futures[future], future.result())
+
+            except Exception as e:
+                done(count, futures[future], e)
+
+    return results
+
+
+def _column(letters: str) -> int:
+    # "A" is 0, "Z" is 25, "AA" is 26
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+
+    return index - 1
+
+
+def _parse_range(cellrange: str) -> tuple[slice, slice]:
+    """
+    Rows and columns (0-based) of a cell range in A1 notation, e.g. "A2:G21".
+    Ends may be left out, as in "A2:G" or "B:D", for the rest of the sheet.
+    """
+
+    match = re.fullmatch(
+        r"([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?", cellrange.strip().upper()
+    )
+
+    if match is None:
+        raise ValueError(f"Invalid cell range '{cellrange}'.")
+
+    col_0, row_0, col_1, row_1 = match.groups()
+
+    # A single cell
+    if col_1 is None:
+        col_1, row_1 = col_0, row_0
+
+    rows = slice(
+        int(row_0) - 1 if row_0 else None,
+        int(row_1) if row_1 else None
+    )
+    cols = slice(
+        _column(col_0) if col_0 else None,
+        _column(col_1) + 1 if col_1 else None
+    )
+
+    return rows, cols
+
+
+def _trim(cells: list[list[str]]) -> list[list[str]]:
+    """
+    Drop empty cells at the end of rows and empty rows at the end, as the
+    Google Sheets API does.
+    """
+
+    rows = []
+    for row in cells:
+        end = len(row)
+        while end > 0 and row[end - 1] == "":
+            end -= 1
+
+        rows.append(row[:end])
+
+    while rows and not rows[-1]:
+        rows.pop()
+
+    return rows
+
+
+def _to_dataframe(data: list[list]) -> pd.DataFrame:
+    """
+    Dataframe of numbers from the cells of a range, as the API gives them: a
+    list of rows of text, the first one with the column names. The rows are
+    parsed at once by the C parser of pandas, which makes typed columns
+    directly and strips quotes, as in '"1"'; empty cells (including those
+    missing at the end of short rows) are NaN. Numbers may have a decimal
+    comma (Spanish locale), with or without "." as thousands separator:
+    "1,5" and "1.234,5" are 1.5 and 1234.5.
+    """
+
+    if not data or not data[0]:
+        return pd.DataFrame()
 
     headers = data[0]  # Column names
-    values = data[1:]  # Actual data
+    width = len(headers)
+
+    if len(data) == 1:
+        return pd.DataFrame(columns=headers, dtype=float)
+
+    rows = data[1:]
+
+    # Cells beyond the headers are dropped
+    if max(map(len, rows)) > width:
+        rows = [row[:width] for row in rows]
+
+    try:
+        text = "\n".join(map("\t".join, rows))
+
+    except TypeError:
+        # Not all text, e.g. numbers read from a local sheet
+        text = "\n".join("\t".join(map(str, row)) for row in rows)
+
+    # A tab or newline inside a cell would shift the others: quote those
+    # cells, only if there is any
+    tabs = sum(map(len, rows)) - sum(map(bool, rows))
+
+    if text.count("\t") != tabs or text.count("\n") != len(rows) - 1:
+        text = "\n".join("\t".join(map(_quote, row)) for row in rows)
 
-    # Get a list of dicts { header: values } from the list of lists
-    records = gspread.utils.to_records(headers, values)
+    df = pd.read_csv(
+        io.StringIO(text),
+        sep="\t",
+        header=None,
+        names=range(width),
+        skip_blank_lines=False,
+    )
 
-    df = pd.DataFrame(records)
+    # Columns with decimal commas (or anything else) are left as text
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = _to_numbers(df[col], headers[col])
+
+    df.columns = headers
 
     return df
+
+
+def _quote(cell) -> str:
+    cell = str(cell)
+
+    if "\t" in cell or "\n" in cell:
+        return '"' + cell.replace('"', '""') + '"'
+
+    return cell
+
+
+def _to_numbers(cells: pd.Series, header: str) -> np.ndarray:
+    text = np.char.strip(cells.to_numpy(dtype=str))
+
+    comma = np.char.find(text, ",") >= 0
+
+    if comma.any():
+        text[comma] = np.char.replace(
+            np.char.replace(text[comma], ".", ""), ",", "."
+        )
+
+    try:
+        return text.astype(float)
+
+    except ValueError as e:
+        raise ValueError(f"Column '{header}' is not all numbers. {e}") from None
@@ -0,0 +1,196 @@
+import logging
+import numpy as np
+
+# spectral
+logger = logging.getLogger(__name__)
+
+# Dominant spatial (or time) frequency of sampled data. Frequencies are
+# angular, k = 2 pi / period, in the units of x.
+
+# Relative spread of the spacing of x below which it is a uniform grid
+UNIFORM_RTOL = 1e-3
+
+# The periodogram is first evaluated every 2 pi / span (one cycle in the
+# data), up to this many frequencies, then around its peak in steps this many
+# times smaller
+MAX_FREQUENCIES = 2048
+OVERSAMPLE = 10
+
+# Most elements of the (frequencies, points) arrays evaluated at once
+CHUNK = 2 ** 22
+
+# Candidate frequencies tried around the spectral peak in `sinusoid()`
+N_CANDIDATES = 64
+
+
+def _sorted(x, y) -> tuple[np.ndarray, np.ndarray]:
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    order = np.argsort(x)
+
+    return x[order], y[order]
+
+
+def is_uniform(x) -> bool:
+    """
+    Whether the sorted `x` is evenly spaced.
+    """
+
+    dx = np.diff(x)
+
+    return dx.size > 0 and np.ptp(dx) <= UNIFORM_RTOL * np.abs(dx.mean())
+
+
+def lomb_scargle(x, y, k) -> np.ndarray:
+    """
+    Lomb-Scargle periodogram of unevenly sampled `y` at the angular
+    frequencies `k`: for each one, the power of the least squares fit of a
+    sinusoid. Evaluated for many frequencies at once, in chunks.
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    k = np.atleast_1d(np.asarray(k, dtype=float))
+
+    y = y - y.mean()
+    power = np.empty(k.size)
+
+    step = max(1, CHUNK // max(x.size, 1))
+
+    # Evenly spaced frequencies: e^{i (k + dk) x} = e^{i k x} e^{i dk x}
+    rotation = np.exp(1j * (k[1] - k[0]) * x) if is_uniform(k) else None
+
+    for start in range(0, k.size, step):
+        if rotation is None:
+            # e^{i k x}, the only transcendental function evaluated
+            exp = np.exp(1j * k[start:start + step, None] * x)
+
+        else:
+            exp = np.empty((min(step, k.size - start), x.size), dtype=complex)
+            exp[0] = np.exp(1j * k[start] * x)
+            exp[1:] = rotation
+
+            np.multiply.accumulate(exp, axis=0, out=exp)
+
+        proj = exp @ y
+        exp *= exp
+        double = exp.sum(axis=-1)
+
+        # Shifting x by tau, with 2 k tau = arg(double), makes the sine and
+        # cosine terms orthogonal; then sum cos^2 = (n + |double|) / 2
+        proj *= np.exp(-0.5j * np.angle(double))
+        norm = np.abs(double)
+
+        power[start:start + step] = (
+            proj.real ** 2 / (x.size + norm)
+            + proj.imag ** 2 / np.maximum(x.size - norm, 1e-12)
+        )
+
+    return power
+
+
+def _fft_peak(x, y) -> float:
+    """
+    Dominant angular frequency of `y` on the uniform grid `x`, interpolating
+    between FFT bins with a parabola.
+    """
+
+    n = x.size
+    dx = (x[-1] - x[0]) / (n - 1)
+
+    spectrum = np.abs(np.fft.rfft(y - y.mean()))
+    peak = np.argmax(spectrum[1:]) + 1
+
+    shift = 0.0
+    if peak < spectrum.size - 1:
+        left, center, right = spectrum[peak - 1:peak + 2]
+        curvature = left - 2 * center + right
+
+        if curvature != 0:
+            shift = 0.5 * (left - right) / curvature
+
+    return 2 * np.pi * (peak + shift) / (n * dx)
+
+
+def dominant(x, y) -> float:
+    """
+    Angular frequency of the strongest oscillation in the data: from the FFT
+    if `x` is a uniform grid, from the Lomb-Scargle periodogram otherwise.
+    """
+
+    x, y = _sorted(x, y)
+
+    if is_uniform(x):
+        logger.info("Uniform grid, using the FFT.")
+
+        return _fft_peak(x, y)
+
+    logger.info("Uneven grid, using the Lomb-Scargle periodogram.")
+
+    span = x[-1] - x[0]
+
+    # From half a period in the data up to the median Nyquist frequency
+    k_step = 2 * np.pi / span
+    k_max = np.pi / np.median(np.diff(x)[np.diff(x) > 0])
+
+    k = np.arange(np.pi / span, k_max + k_step, k_step)[:MAX_FREQUENCIES]
+    best = k[np.argmax(lomb_scargle(x, y, k))]
+
+    # Zoom in
+    k = np.linspace(best - k_step, best + k_step, 2 * OVERSAMPLE + 1)
+    k = k[k > 0]
+
+    return k[np.argmax(lomb_scargle(x, y, k))]
+
+
+def wavelength(x, y) -> float:
+    """
+    Period of the strongest oscillation in the data, in the units of x.
+    """
+
+    return 2 * np.pi / dominant(x, y)
+
+
+def sinusoid(x, y) -> tuple[float, float, float, float]:
+    """
+    Dominant sinusoid in the data, `y ~ a + R cos(k x - phi)`. Returns
+    `(k, a, R, phi)`. The coarse frequency from `dominant()` is refined by
+    least squares over frequencies around it; all candidates are solved at
+    once.
+    """
+
+    x, y = _sorted(x, y)
+
+    n = x.size
+    span = x[-1] - x[0]
+
+    # Coarse estimate, in cycles per span
+    peak = dominant(x, y) * span / (2 * np.pi)
+
+    # Fine estimate, allows less than a period in the data
+    cycles = np.linspace(max(peak - 2, 0.25), peak + 2, N_CANDIDATES)
+    k = 2 * np.pi * cycles / span
+
+    # Normal equations of y = a + b cos(k x) + c sin(k x), one per candidate
+    phase = k[:, None] * x[None, :]
+    cos = np.cos(phase)
+    sin = np.sin(phase)
+
+    normal = np.empty((k.size, 3, 3))
+    normal[:, 0, 0] = n
+    normal[:, 0, 1] = normal[:, 1, 0] = cos.sum(axis=1)
+    normal[:, 0, 2] = normal[:, 2, 0] = sin.sum(axis=1)
+    normal[:, 1, 1] = np.einsum("kn,kn->k", cos, cos)
+    normal[:, 1, 2] = normal[:, 2, 1] = np.einsum("kn,kn->k", cos, sin)
+    normal[:, 2, 2] = np.einsum("kn,kn->k", sin, sin)
+
+    proj = np.stack([np.full(k.size, y.sum()), cos @ y, sin @ y], axis=-1)
+    coef = np.linalg.solve(normal, proj[..., None])[..., 0]
+
+    # Residual sum of squares is y.y - coef.proj for least squares solutions
+    best = np.argmax(np.einsum("ki,ki->k", coef, proj))
+
+    a, b, c = coef[best]
+
+    return k[best], a, np.hypot(b, c), np.arctan2(c, b)
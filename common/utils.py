@@ -4,12 +4,15 @@ from pathlib import Path
 
 
 def get_caller_name():
-    # Get the current stack frame
-    stack = inspect.stack()
+    # Get the current stack frame. Only file names are needed: reading the
+    # source (as `inspect.stack()` does) fails once the `src` of a course
+    # was replaced by that of another, see `manifest._enter()`.
+    frame = inspect.currentframe()
 
     # Find stack frame for the calling script
-    for frame in stack:
-        frame_path = os.path.abspath(inspect.getframeinfo(frame[0]).filename)
+    while frame is not None:
+        frame_path = os.path.abspath(frame.f_code.co_filename)
+        frame = frame.f_back
 
         if frame_path.find("common") == -1:
             path = Path(frame_path)
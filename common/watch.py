@@ -0,0 +1,163 @@
+import importlib
+import logging
+import sys
+import time
+from pathlib import Path
+from common import schedule
+
+# watch
+logger = logging.getLogger(__name__)
+
+opt_watch = False
+
+# Seconds between checks for changes
+POLL_INTERVAL = 0.2
+
+# Directories watched, relative to the course directory
+WATCHED = ["data", "src", "common"]
+SUFFIXES = [".py", ".csv"]
+
+# Modules that are never reloaded: they are running the loop
+NO_RELOAD = [
+    "common.watch",
+    "common.schedule",
+    "common.batch",
+    "common.cli_args",
+]
+
+
+def snapshot(path: Path) -> dict[str, int]:
+    """
+    Modification time of every watched file, by path relative to `path`.
+    """
+
+    files = {}
+
+    for directory in WATCHED:
+        for file in (path / directory).rglob("*"):
+            if file.suffix in SUFFIXES and "__pycache__" not in file.parts:
+                files[file.relative_to(path).as_posix()] = \
+                    file.stat().st_mtime_ns
+
+    return files
+
+
+def changes(old: dict[str, int], new: dict[str, int]) -> set[str]:
+    """
+    Files created, modified or deleted between two snapshots.
+    """
+
+    return {
+        file for file in old.keys() | new.keys()
+        if old.get(file) != new.get(file)
+    }
+
+
+def _module_name(file: str) -> str:
+    """
+    "common/fit/f.py" -> "common.fit.f"
+    """
+
+    return file.removesuffix(".py").removesuffix("/__init__").replace("/", ".")
+
+
+def reload(files: set[str]) -> None:
+    """
+    Reload the modules of the changed `files` that were already imported.
+    If anything in `common` changed, all of `common` is reloaded (in import
+    order), since modules hold references to each other. Options set from
+    the command line (`opt_*`) are kept.
+    """
+
+    names = {_module_name(f) for f in files if f.endswith(".py")}
+
+    if any(name.startswith("common.") for name in names):
+        names |= {name for name in sys.modules if name.startswith("common.")}
+
+    for name in [n for n in list(sys.modules) if n in names]:
+        if name in NO_RELOAD:
+            continue
+
+        module = sys.modules[name]
+
+        options = {
+            key: value for key, value in vars(module).items()
+            if key.startswith("opt_")
+        }
+
+        logger.info(f"Reloading '{name}'.")
+
+        try:
+            importlib.reload(module)
+
+        except Exception as e:
+            logger.error(f"Could not reload '{name}'. {type(e).__name__}: {e}")
+            continue
+
+        vars(module).update(options)
+
+
+def affected(nodes: list[schedule.Node], files: set[str]) -> list[str]:
+    """
+    Names of the nodes to rerun after `files` changed: those reading any of
+    them. If some file is not an input of any node (e.g. something in
+    `common`, or a helper script) every node is rerun. Nodes without declared
+    inputs are always rerun.
+    """
+
+    inputs = {i for n in nodes for i in n.inputs}
+
+    if files - inputs:
+        return [n.name for n in nodes]
+
+    return [
+        n.name for n in nodes
+        if not n.inputs or files & set(n.inputs)
+    ]
+
+
+def loop(path: Path, nodes: list[schedule.Node]) -> None:
+    """
+    Run `nodes`, then keep watching `data/`, `src/` and `common/` and rerun
+    in this same process only what is affected by each change, until
+    interrupted.
+    """
+
+    schedule.run(path, nodes, force=True, jobs=1)
+
+    print(f"Watching {', '.join(WATCHED)} in '{path}'. Ctrl+C to stop.")
+
+    files = snapshot(path)
+
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+
+            new_files = snapshot(path)
+            changed = changes(files, new_files)
+
+            if not changed:
+                continue
+
+            # Wait for editors to finish writing
+            time.sleep(POLL_INTERVAL)
+            new_files = snapshot(path)
+            changed = changes(files, new_files)
+            files = new_files
+
+            logger.warning(f"Changed: {sorted(changed)}.")
+
+            reload(changed)
+
+            names = affected(nodes, changed)
+
+            if names:
+                start = time.perf_counter()
+                schedule.run(path, nodes, only=names, force=True, jobs=1)
+                print(f"Done in {time.perf_counter() - start:.3f} s.")
+
+                # Don't react to files written by the analyses themselves
+                files = snapshot(path)
+
+    except KeyboardInterrupt:
+        print("Stopped watching.")
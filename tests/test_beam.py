@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from scipy.special import erf
+from common import beam
+
+
+def _scans(z, w, A, rng):
+    x, y = [], []
+
+    for i, (z_i, w_i) in enumerate(zip(z, w)):
+        xs = np.linspace(-3, 3, 40) * w_i + 0.1 * i
+        ys = A * (1 - erf(np.sqrt(2) * (xs - 0.1 * i) / w_i))
+
+        x.append(xs)
+        y.append(ys + 1e-3 * rng.standard_normal(xs.size))
+
+    return x, y
+
+
+@pytest.mark.parametrize("model, params", [
+    ("gaussian", [0.5, 2e-3, 300.0]),
+    ("linear", [1.0, 3e-3]),
+])
+def test_width_derivatives(model, params):
+    z = np.linspace(0, 600, 7)
+
+    _, dw = beam._width(model, z, z[0], params)
+
+    for i, d in enumerate(dw):
+        step = 1e-6 * max(abs(params[i]), 1)
+        up, down = list(params), list(params)
+        up[i] += step
+        down[i] -= step
+
+        numeric = (beam._width(model, z, z[0], up)[0]
+                   - beam._width(model, z, z[0], down)[0]) / (2 * step)
+
+        np.testing.assert_allclose(d, numeric, rtol=1e-5, atol=1e-9)
+
+
+def test_fit_scans_gaussian_recovers_divergence():
+    rng = np.random.default_rng(0)
+    z = np.linspace(0, 1000, 6)
+    w_0, theta, z_0 = 0.5, 2e-3, 400.0
+    w = np.sqrt(w_0 ** 2 + (theta * (z - z_0)) ** 2)
+
+    x, y = _scans(z, w, 2.0, rng)
+
+    result = beam.fit_scans(z, x, y, yerr=[1e-3] * z.size)
+
+    assert result.theta == pytest.approx(theta, rel=1e-2)
+    np.testing.assert_allclose(result.w(z), w, rtol=1e-2)
+
+    x_0, err_x_0 = result.x_0()
+    np.testing.assert_allclose(x_0, 0.1 * np.arange(z.size), atol=1e-3)
+    assert (err_x_0 > 0).all()
+
+
+def test_fit_scans_linear_with_known_amplitude():
+    rng = np.random.default_rng(1)
+    z = np.array([0.0, 200.0, 400.0])
+    w = 1.0 + 3e-3 * z
+
+    x, y = _scans(z, w, 1.5, rng)
+
+    result = beam.fit_scans(z, x, y, A=[1.5] * z.size, model="linear")
+
+    assert result.theta == pytest.approx(3e-3, rel=1e-2)
+    assert "A_0" not in result.values
+
+
+def test_fit_scans_linear_keeps_convergence(caplog):
+    rng = np.random.default_rng(2)
+    z = np.array([0.0, 200.0, 400.0])
+    w = 1.0 - 1e-3 * z
+
+    x, y = _scans(z, w, 1.5, rng)
+
+    result = beam.fit_scans(z, x, y, A=[1.5] * z.size, model="linear")
+
+    assert result.theta == pytest.approx(-1e-3, rel=1e-2)
+    assert result.converging
+    assert "converges" in caplog.text
+
+
+def test_fit_scans_rejects_bad_input():
+    z = np.array([0.0, 1.0])
+    x = [np.linspace(-1, 1, 10)] * 2
+    y = [1 - erf(xs) for xs in x]
+
+    with pytest.raises(ValueError):
+        beam.fit_scans(z, x, y)
+
+    with pytest.raises(ValueError):
+        beam.fit_scans(z, x, y, model="parabolic")
+
+    with pytest.raises(ValueError):
+        beam.fit_scans(z, x[:1], y, model="linear")
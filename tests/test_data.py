@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from common import data
+
+
+def test_parse_label():
+    assert data.parse_label("Amplitud [mVpp]") == ("Amplitud", "mVpp")
+    assert data.parse_label("Cos^2") == ("Cos^2", None)
+
+
+@pytest.mark.parametrize("unit, to, factor", [
+    ("mV", "V", 1e-3),
+    ("V", "mV", 1e3),
+    ("μs", "s", 1e-6),
+    ("deg", "rad", np.pi / 180),
+    ("°", "deg", 1.0),
+    ("kHz", "kHz", 1.0),
+])
+def test_scale(unit, to, factor):
+    assert data.scale(unit, to) == pytest.approx(factor)
+
+
+def test_scale_rejects_unknown_and_mismatched_units():
+    with pytest.raises(ValueError):
+        data.scale("furlong", "m")
+
+    with pytest.raises(ValueError):
+        data.scale("V", "m")
+
+
+def test_columns_keep_units():
+    df = pd.DataFrame({"Voltaje [V]": [0.1, 0.2], "Cos^2": [1.0, 0.5]})
+
+    cols = data.columns(df)
+
+    volt = cols["Voltaje"].to("mV")
+    np.testing.assert_allclose(volt, [100, 200])
+    assert volt.label == "Voltaje [mV]"
+    assert volt[:1].unit == "mV"
+
+    # Arithmetic may change the units, so it drops them
+    assert not isinstance(volt * 2, data.Column)
+    assert cols["Cos^2"].label == "Cos^2"
+
+
+def test_conversion_without_factor_changes_the_unit():
+    time = data.Column([1.0, 2.0], "Tiempo", "seg")
+
+    converted = time.to("s")
+
+    assert converted.unit == "s"
+    assert time.unit == "seg"
+    assert np.shares_memory(converted, time)
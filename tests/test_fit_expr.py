@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import sympy as sp
+from common.fit import expr, f, gof
+
+FABRY_PEROT = "c_1 / (x - x_0)**alpha " \
+    "* sqrt(1 + c_2 * cos(4 * pi * (x - x_0) / lambda))"
+
+# Built-in models, somewhere their derivatives are not 0
+BUILT_IN = [
+    (f.lorentz, np.linspace(30e3, 50e3, 100), [40.1e3, 2e3, 5e15]),
+    (f.double_lorentz, np.linspace(30e3, 50e3, 100),
+     [38.1e3, 42.1e3, 1e3, 3e3, 2.0]),
+    (f.fabry_perot, np.linspace(5, 60, 120), [0.0, 2.0, 0.5, 1.2, 8.65]),
+]
+
+
+def _fabry_perot(x, x_0, c_1, c_2, alpha, wavelen):
+    return c_1 / (x - x_0) ** alpha \
+        * np.sqrt(1 + c_2 * np.cos(4 * np.pi * (x - x_0) / wavelen))
+
+
+def test_lorentz_matches_formula():
+    w = np.linspace(30e3, 50e3, 101)
+    w_0, gamma, A = 40e3, 2e3, 5e15
+
+    np.testing.assert_allclose(
+        f.lorentz.f(w, w_0, gamma, A),
+        A / ((w_0**2 - w**2)**2 + (gamma * w)**2),
+        rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize(
+    "func, x, params", BUILT_IN, ids=[c[0].name for c in BUILT_IN]
+)
+def test_built_in_jacobian_matches_differences(func, x, params):
+    # Without `jac`, `gof.jacobian()` uses central differences
+    numeric = gof.jacobian(f.Function(func.f, func.params), x, params)
+
+    assert func.eq is not None
+    np.testing.assert_allclose(
+        func.jac(x, *params),
+        numeric,
+        rtol=1e-5,
+        atol=1e-6 * np.abs(numeric).max()
+    )
+
+
+def test_constant_derivatives_are_broadcast():
+    model = expr.build("m * x + b", "x", ["m", "b"])
+
+    x = np.arange(5.0)
+
+    np.testing.assert_array_equal(
+        model.jac(x, 2.0, 1.0),
+        np.column_stack([x, np.ones_like(x)])
+    )
+
+
+def test_keyword_parameter_names():
+    params = ["x_0", "c_1", "c_2", "alpha", "lambda"]
+    p = [1.0, 2.0, 0.5, 1.2, 8.65]
+    x = np.linspace(5, 60, 50)
+
+    from_text = expr.build(FABRY_PEROT, "x", params)
+
+    x_s, x_0, c_1, c_2, alpha, lam = sp.symbols("x x_0 c_1 c_2 alpha lambda")
+    from_sympy = expr.build(
+        c_1 / (x_s - x_0)**alpha
+        * sp.sqrt(1 + c_2 * sp.cos(4 * sp.pi * (x_s - x_0) / lam)),
+        "x",
+        params
+    )
+
+    for model in (from_text, from_sympy, f.fabry_perot):
+        np.testing.assert_allclose(
+            model.f(x, *p),
+            _fabry_perot(x, *p),
+            rtol=1e-12
+        )
+
+        assert r"\lambda" in model.eq
+
+
+def test_build_passes_function_arguments():
+    model = expr.build("m * x + b", "x", ["m", "b"], bounds=([0, 0], [1, 1]))
+
+    assert model.bounds == ([0, 0], [1, 1])
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from common.fit import f, utils
+
+# Models with an in-place kernel, a range of x and parameters
+KERNELS = [
+    (f.lorentz, np.linspace(30e3, 50e3, 200), [40e3, 2e3, 5e15]),
+    (
+        f.double_lorentz,
+        np.linspace(30e3, 50e3, 200),
+        [39e3, 41e3, 1.5e3, 2.5e3, 3.0]
+    ),
+    (f.fabry_perot, np.linspace(5, 60, 200), [1.0, 2.0, 0.5, 1.2, 8.65]),
+]
+
+
+@pytest.mark.parametrize(
+    "func, x, params", KERNELS, ids=[k[0].name for k in KERNELS]
+)
+def test_inplace_matches_reference(func, x, params):
+    evaluate = func.buffered(x.shape)
+
+    np.testing.assert_allclose(
+        evaluate(x, *params),
+        func.f(x, *params),
+        rtol=1e-12
+    )
+
+
+def test_buffers_are_reused():
+    x = np.linspace(30e3, 50e3, 10)
+    evaluate = f.lorentz.buffered(x.shape)
+
+    first = evaluate(x, 40e3, 2e3, 1.0)
+    second = evaluate(x, 41e3, 2e3, 1.0)
+
+    assert first is second
+    np.testing.assert_allclose(second, f.lorentz.f(x, 41e3, 2e3, 1.0))
+
+
+def test_inplace_fit_matches_regular(monkeypatch):
+    rng = np.random.default_rng(0)
+
+    x = np.linspace(30e3, 50e3, 400)
+    y = f.lorentz.f(x, 40e3, 2e3, 5e15) \
+        * (1 + 0.01 * rng.standard_normal(x.size))
+    p0 = [39.5e3, 2.5e3, 4e15]
+
+    regular, _ = utils.find(f.lorentz, x, y, p0=p0)
+
+    monkeypatch.setattr(utils, "INPLACE_THRESHOLD", 0)
+    inplace, _ = utils.find(f.lorentz, x, y, p0=p0)
+
+    np.testing.assert_allclose(inplace, regular, rtol=1e-9)
+
+
+def test_double_lorentz_is_symmetric():
+    # Swapping the two oscillators gives the same response
+    w = np.linspace(30e3, 50e3, 50)
+
+    np.testing.assert_allclose(
+        f.double_lorentz.f(w, 38e3, 42e3, 1e3, 3e3, 2.0),
+        f.double_lorentz.f(w, 42e3, 38e3, 3e3, 1e3, 2.0),
+        rtol=1e-12
+    )
+
+
+def test_double_lorentz_is_coupled_oscillators():
+    # Amplitude of the receiver driven by the emitter: the product of both
+    # complex responses
+    w = np.linspace(30e3, 50e3, 50)
+    w_1, w_2, g_1, g_2, A = 38e3, 42e3, 1e3, 3e3, 2.0
+
+    response = A / ((w_1**2 - w**2 + 1j * g_1 * w)
+                    * (w_2**2 - w**2 + 1j * g_2 * w))
+
+    np.testing.assert_allclose(
+        f.double_lorentz.f(w, w_1, w_2, g_1, g_2, A),
+        np.abs(response),
+        rtol=1e-12
+    )
+
+
+def test_bounds_are_opt_in():
+    bounded = f.Function(
+        lambda x, m, b: m * x + b,
+        ["m", "b"],
+        bounds=([0, -np.inf], [1, np.inf])
+    )
+
+    x = np.linspace(0, 1, 10)
+    y = 3 * x + 1
+
+    free, _ = utils.find(bounded, x, y, p0=[0.5, 0])
+    clipped, _ = utils.find(bounded, x, y, p0=[0.5, 0], bounds=bounded.bounds)
+
+    np.testing.assert_allclose(free, [3, 1])
+    assert clipped[0] <= 1
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from scipy import stats
+from common.fit import f, gof
+
+
+def test_chi_sq_and_p_value():
+    residue = np.array([1.0, -2.0, 0.5, 1.5])
+    yerr = np.array([1.0, 2.0, 0.5, 0.5])
+
+    fit_gof = gof.evaluate(residue, yerr, n_params=1)
+
+    # Normalized residues 1, -1, 1, 3
+    np.testing.assert_allclose(fit_gof.normalized, [1, -1, 1, 3])
+    assert fit_gof.chi_sq == pytest.approx(12)
+    assert fit_gof.dof == 3
+    assert fit_gof.chi_sq_r == pytest.approx(4)
+    assert fit_gof.p_value == pytest.approx(stats.chi2.sf(12, 3))
+
+
+def test_without_errors_chi_sq_is_nan():
+    fit_gof = gof.evaluate(np.array([1.0, -1.0, 2.0]), n_params=1)
+
+    assert np.isnan(fit_gof.chi_sq) and np.isnan(fit_gof.p_value)
+
+    # Normalized by the RMS over the degrees of freedom
+    np.testing.assert_allclose(
+        fit_gof.normalized, np.array([1, -1, 2]) / np.sqrt(3)
+    )
+
+
+def test_durbin_watson_and_runs():
+    rng = np.random.default_rng(0)
+
+    white = gof.evaluate(rng.standard_normal(2000), 1.0)
+    assert white.durbin_watson == pytest.approx(2, abs=0.15)
+    assert white.runs_p > 0.01
+
+    # A slow wave: long runs and positively correlated neighbours
+    wave = gof.evaluate(np.sin(np.linspace(0, 4 * np.pi, 200)), 1.0)
+    assert wave.durbin_watson < 0.1
+    assert wave.runs == 4
+    assert wave.flags()["correlated"]
+
+
+def test_leverage_sums_to_parameters():
+    x = np.linspace(0, 1, 30)
+    jac = gof.jacobian(f.linear, x, [2.0, 1.0])
+
+    np.testing.assert_allclose(jac, np.column_stack([x, np.ones_like(x)]))
+
+    fit_gof = gof.evaluate(np.zeros(30), 0.1, n_params=2, jac=jac)
+    assert fit_gof.leverage.sum() == pytest.approx(2)
+    assert (fit_gof.leverage <= 1).all()
+
+
+def test_batch_matches_single_fits():
+    rng = np.random.default_rng(1)
+    residues = [rng.standard_normal(20), rng.standard_normal(15)]
+    yerrs = [np.full(20, 0.5), np.full(15, 2.0)]
+
+    batch = gof.evaluate(residues, yerrs, n_params=2)
+
+    for i, (residue, yerr) in enumerate(zip(residues, yerrs)):
+        single = gof.evaluate(residue, yerr, n_params=2)
+
+        assert batch.dof[i] == single.dof
+        assert batch.chi_sq[i] == pytest.approx(single.chi_sq)
+        assert batch.durbin_watson[i] == pytest.approx(single.durbin_watson)
+        assert batch.runs[i] == single.runs
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from common.fit import f, guess, utils
+
+# Model, x and true parameters; the fit from the guess must find them
+CASES = [
+    (f.linear, np.linspace(0, 10, 30), [2.0, -1.0]),
+    (f.lorentz, np.linspace(30e3, 50e3, 80), [40e3, 2e3, 5e15]),
+    (f.fabry_perot, np.linspace(5, 60, 120), [0.0, 2.0, 0.5, 1.2, 8.65]),
+    (f.cos_sq, np.linspace(0, 2 * np.pi, 60), [0.1, 2.0, 1.0, 0.4]),
+]
+
+
+@pytest.mark.parametrize(
+    "func, x, params", CASES, ids=[c[0].name for c in CASES]
+)
+def test_fit_from_guess_finds_parameters(func, x, params):
+    rng = np.random.default_rng(1)
+
+    y = func.f(x, *params)
+    y = y + 1e-3 * np.abs(y).max() * rng.standard_normal(x.size)
+
+    p0 = func.guess(x, y)
+    assert len(p0) == len(func.params)
+
+    p_opt, _ = utils.find(func, x, y)
+
+    np.testing.assert_allclose(p_opt, params, rtol=0.02, atol=1e-2)
+
+
+def test_lorentz_guess_is_near():
+    x = np.linspace(30e3, 50e3, 80)
+    w_0, gamma, A = guess.lorentz(x, f.lorentz.f(x, 40e3, 2e3, 5e15))
+
+    assert w_0 == pytest.approx(40e3, rel=0.01)
+    assert gamma == pytest.approx(2e3, rel=0.2)
+    assert A == pytest.approx(5e15, rel=0.2)
+
+
+def test_erf_guess():
+    from scipy.special import erf
+
+    x = np.linspace(0, 10, 50)
+    y = 3 * (1 - erf(np.sqrt(2) * (x - 4) / 1.5))
+
+    x_0, w = guess.erf(x, y)
+
+    assert x_0 == pytest.approx(4, rel=0.02)
+    assert w == pytest.approx(1.5, rel=0.05)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from common.fit import f, utils
+
+
+def test_reduce_fixed_and_tied():
+    free, expand = utils._reduce(
+        ["a", "b", "c", "d"],
+        fixed={"b": 5.0},
+        tied={"c": "a", "d": lambda p: 2 * p["a"]}
+    )
+
+    assert free == ["a"]
+    assert expand([3.0]) == [3.0, 5.0, 3.0, 6.0]
+
+
+def test_reduce_unknown_parameter():
+    with pytest.raises(ValueError):
+        utils._reduce(["a"], fixed={"z": 1.0}, tied=None)
+
+
+def test_fixed_parameter_keeps_its_value():
+    x = np.linspace(0, 10, 20)
+    y = 2 * x + 1
+
+    p_opt, p_err = utils.find(f.linear, x, y, fixed={"b": 0.5})
+
+    assert p_opt[1] == 0.5
+    assert p_err[1] == 0
+    assert p_opt[0] == pytest.approx(2.07, abs=0.01)
+
+
+def test_tied_parameters_share_value_and_error():
+    rng = np.random.default_rng(5)
+
+    w = np.linspace(30e3, 50e3, 200)
+    y = f.double_lorentz.f(w, 38e3, 42e3, 2e3, 2e3, 1.0)
+    y = y * (1 + 0.01 * rng.standard_normal(w.size))
+
+    p_opt, p_err = utils.find(
+        f.double_lorentz,
+        w,
+        y,
+        p0=[37.5e3, 42.5e3, 2.5e3, 2.5e3, 1.2],
+        yerr=0.01 * y,
+        tied={"g_2": "g_1"}
+    )
+
+    assert p_opt[2] == p_opt[3]
+    assert p_err[2] == pytest.approx(p_err[3])
+    np.testing.assert_allclose(p_opt, [38e3, 42e3, 2e3, 2e3, 1.0], rtol=0.02)
+
+
+@pytest.mark.parametrize("fixed, tied, n_free", [
+    (None, None, 5),
+    ({"A": 1.0}, None, 4),
+    (None, {"g_2": "g_1"}, 4),
+    ({"A": 1.0}, {"g_2": "g_1"}, 3),
+])
+def test_fixed_and_tied_reduce_degrees_of_freedom(
+    tmp_path, fixed, tied, n_free
+):
+    rng = np.random.default_rng(6)
+
+    w = np.linspace(30e3, 50e3, 100)
+    y = f.double_lorentz.f(w, 38e3, 42e3, 2e3, 2e3, 1.0)
+    yerr = 0.01 * np.abs(y)
+    y = y + yerr * rng.standard_normal(w.size)
+
+    fit_func = utils.fitnsave(
+        f.double_lorentz,
+        w,
+        y,
+        saveto=tmp_path / "fit.csv",
+        p0=[37.5e3, 42.5e3, 2.5e3, 2.5e3, 1.0],
+        yerr=yerr,
+        fixed=fixed,
+        tied=tied
+    )
+
+    assert fit_func.gof.dof == w.size - n_free
+
+    # The trace of the hat matrix is the number of fitted parameters
+    assert fit_func.gof.leverage.sum() == pytest.approx(n_free)
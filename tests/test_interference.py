@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from common.interference import (
+    Waves, complex_lstsq, fit_phasors, useg_to_rad
+)
+
+
+def test_useg_to_rad_one_period_is_two_pi():
+    freq = 40e3
+
+    # A period of 25 us at 40 kHz
+    np.testing.assert_allclose(useg_to_rad([0, 25, 50], freq),
+                               [0, 2 * np.pi, 4 * np.pi])
+
+
+def test_waves_unwraps_phases_of_every_emitter():
+    phase = np.linspace(0, 6 * np.pi, 40)
+    both = np.stack([phase, 2 * phase], axis=-1)
+
+    waves = Waves(np.ones(both.shape), np.angle(np.exp(1j * both)))
+
+    np.testing.assert_allclose(waves.phase, both, atol=1e-12)
+
+
+def test_waves_error_matches_elementwise_propagation():
+    rng = np.random.default_rng(0)
+    ampl = rng.uniform(1, 2, (20, 3))
+    phase = rng.uniform(-np.pi, np.pi, (20, 3))
+
+    waves = Waves(ampl, phase, 0.1, 0.05, unwrap=False)
+
+    np.testing.assert_allclose(waves.psi, ampl * np.cos(phase))
+    np.testing.assert_allclose(
+        waves.err_psi,
+        np.sqrt((0.1 * np.cos(phase)) ** 2
+                + (ampl * 0.05 * np.sin(phase)) ** 2)
+    )
+
+    psi, err_psi = waves.superpose()
+    np.testing.assert_allclose(psi, waves.psi.sum(axis=-1))
+    np.testing.assert_allclose(err_psi,
+                               np.sqrt((waves.err_psi ** 2).sum(axis=-1)))
+
+
+def test_waves_rejects_mismatched_shapes():
+    with pytest.raises(ValueError):
+        Waves(np.ones(3), np.ones(4))
+
+
+def test_from_delays_matches_phases():
+    time = np.array([0.0, 5.0, 10.0])
+
+    waves = Waves.from_delays(np.ones(3), time, 40e3, err_time=1.0)
+
+    np.testing.assert_allclose(waves.phase, useg_to_rad(time, 40e3))
+    np.testing.assert_allclose(waves.err_phase, useg_to_rad(1.0, 40e3))
+
+
+def test_complex_lstsq_recovers_gains():
+    rng = np.random.default_rng(1)
+    basis = rng.standard_normal((50, 2)) + 1j * rng.standard_normal((50, 2))
+    gains = np.array([0.5 - 0.2j, 1.5 + 1j])
+
+    g, cov, chi_sq = complex_lstsq(basis @ gains, basis, np.ones(50))
+
+    np.testing.assert_allclose(g, gains)
+    assert cov.shape == (2, 2)
+    assert chi_sq == pytest.approx(0, abs=1e-20)
+
+    # Leading dimensions are independent problems
+    z = np.stack([basis @ gains, basis @ (2 * gains)])
+    g, _, _ = complex_lstsq(z, np.stack([basis, basis]))
+    np.testing.assert_allclose(g, [gains, 2 * gains])
+
+
+def test_fit_phasors_recovers_gains_and_dof():
+    rng = np.random.default_rng(2)
+    m = 60
+
+    sources = Waves(rng.uniform(1, 2, (m, 2)),
+                    rng.uniform(-np.pi, np.pi, (m, 2)), 1e-3, 1e-3)
+    gains = np.array([0.8 * np.exp(0.3j), 1.2 * np.exp(-1j)])
+
+    z = sources.phasor @ gains
+    z = z + 1e-3 * (rng.standard_normal(m) + 1j * rng.standard_normal(m))
+    target = Waves(np.abs(z), np.angle(z), 1e-3, 1e-3, unwrap=False)
+
+    phasor_fit = fit_phasors(target, sources)
+
+    np.testing.assert_allclose(phasor_fit.gains, gains, atol=5e-3)
+    assert phasor_fit.dof == m - 2
+
+    predicted = phasor_fit.predict(sources)
+    np.testing.assert_allclose(predicted.phasor, sources.phasor @ gains,
+                               atol=1e-2)
+
+    result = phasor_fit.result()
+    np.testing.assert_allclose(result["Factor"], np.abs(gains), atol=5e-3)
+
+
+def test_fit_phasors_needs_more_positions_than_gains():
+    sources = Waves(np.ones((2, 2)), [[0, 1], [1, 0]], 0.1, 0.1)
+
+    with pytest.raises(ValueError):
+        fit_phasors(Waves(np.ones(2), np.zeros(2), 0.1, 0.1), sources)
@@ -0,0 +1,85 @@
+import threading
+import time
+from common import perf
+
+
+def test_stages_are_credited_to_the_current_analysis(monkeypatch):
+    monkeypatch.setattr(perf, "opt_profile", True)
+    monkeypatch.setattr(perf, "_stages", perf.defaultdict(
+        lambda: perf.defaultdict(lambda: [0, 0.0])
+    ))
+
+    with perf.analysis("first"):
+        with perf.stage("fit"):
+            pass
+
+    with perf.analysis("second"):
+        with perf.stage("fit"):
+            pass
+
+        with perf.stage("fit"):
+            pass
+
+    assert perf._stages["first"]["fit"][0] == 1
+    assert perf._stages["second"]["fit"][0] == 2
+    assert perf._analysis() == "?"
+
+
+def test_analyses_of_threads_are_independent():
+    seen = {}
+
+    def work(name):
+        with perf.analysis(name):
+            barrier.wait()
+            seen[name] = perf._analysis()
+
+    barrier = threading.Barrier(2)
+    threads = [threading.Thread(target=work, args=(n,)) for n in "ab"]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    assert seen == {"a": "a", "b": "b"}
+
+
+def test_shared_stage_in_threads(monkeypatch):
+    monkeypatch.setattr(perf, "opt_profile", True)
+    monkeypatch.setattr(perf, "_stages", perf.defaultdict(
+        lambda: perf.defaultdict(lambda: [0, 0.0])
+    ))
+
+    # One instance, as with a decorated function
+    fetch = perf.stage("sheet fetch")
+    a_in, b_in = threading.Event(), threading.Event()
+
+    # "a" leaves the stage while "b" is still inside
+    def a():
+        with perf.analysis("a"), fetch:
+            a_in.set()
+            b_in.wait()
+
+    def b():
+        a_in.wait()
+
+        with perf.analysis("b"), fetch:
+            b_in.set()
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=t) for t in (a, b)]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    (calls_a, time_a), (calls_b, time_b) = (
+        perf._stages[n]["sheet fetch"] for n in "ab"
+    )
+
+    assert calls_a == calls_b == 1
+    assert time_a < 0.1 <= time_b
+    assert perf._starts.get() == ()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from common import polar
+
+
+def test_deg_to_rad():
+    np.testing.assert_allclose(polar.deg_to_rad([0, 90, 180]),
+                               [0, np.pi / 2, np.pi])
+
+
+def test_bin_edges_cover_every_angle():
+    theta = np.array([0.0, 0.25, 1.0])
+
+    np.testing.assert_allclose(polar.bin_edges(theta, bins=4),
+                               [0, 0.25, 0.5, 0.75, 1])
+
+    edges = polar.bin_edges(theta, width=0.3)
+    assert edges[0] == 0 and edges[-1] >= 1
+    np.testing.assert_allclose(np.diff(edges), 0.3)
+
+    with pytest.raises(ValueError):
+        polar.bin_edges(theta)
+
+
+def test_bin_scan_matches_loop():
+    rng = np.random.default_rng(0)
+    theta = rng.uniform(0, np.pi, 200)
+    r = rng.uniform(1, 2, 200)
+    rerr = rng.uniform(0.1, 0.2, 200)
+    terr = rng.uniform(0.01, 0.02, 200)
+
+    theta_mean, r_mean, theta_err, r_err, counts = polar.bin_scan(
+        theta, r, rerr, terr, bins=8
+    )
+
+    edges = polar.bin_edges(theta, bins=8)
+    index = np.clip(np.digitize(theta, edges) - 1, 0, 7)
+
+    for i in range(8):
+        w = 1 / rerr[index == i] ** 2
+
+        assert counts[i] == w.size
+        assert theta_mean[i] == pytest.approx(
+            np.average(theta[index == i], weights=w))
+        assert r_mean[i] == pytest.approx(
+            np.average(r[index == i], weights=w))
+        assert r_err[i] == pytest.approx(1 / np.sqrt(w.sum()))
+        assert theta_err[i] == pytest.approx(
+            np.sqrt(np.sum((w * terr[index == i]) ** 2)) / w.sum())
+
+
+def test_bin_scan_without_errors():
+    theta = np.array([0.0, 0.1, 1.0, 1.1, 3.0])
+    r = np.array([1.0, 3.0, 2.0, 2.0, 5.0])
+
+    theta_mean, r_mean, theta_err, r_err, counts = polar.bin_scan(
+        theta, r, bins=3
+    )
+
+    # The middle bin is empty
+    np.testing.assert_array_equal(counts, [2, 2, 1])
+    np.testing.assert_allclose(r_mean, [2, 2, 5])
+    np.testing.assert_allclose(r_err, [1, 0, 0])
+    assert theta_err is None
+
+    # A scalar error of the angle shrinks like the error of a mean
+    _, _, theta_err, _, _ = polar.bin_scan(theta, r, terr=0.1, bins=3)
+    np.testing.assert_allclose(theta_err, 0.1 / np.sqrt(counts))
+
+
+def test_data_polar_bins_angle_errors():
+    import matplotlib
+    matplotlib.use("Agg")
+    from common import plot
+
+    theta = np.linspace(0, np.pi, 100)
+
+    fig, ax = plot.data_polar(theta, np.ones(100), 0.1, np.full(100, 0.01),
+                              bins=10)
+
+    # One errorbar per bin, not per point
+    assert ax.containers[0].lines[0].get_xdata().size == 10
+    plot.plt.close(fig)
@@ -0,0 +1,69 @@
+import numpy as np
+from common import polarization
+
+# y_0, A, w, theta_0, m, b
+TRUTH = [0.1, 2.0, 1.0, 0.3, 5.0, 0.2]
+
+
+def _run(rng, noise=1e-3):
+    y_0, A, w, theta_0, m, b = TRUTH
+
+    theta = np.linspace(0, 2 * np.pi, 50)
+    volt = y_0 + A * np.cos(w * (theta - theta_0)) ** 2
+    intensity = m * volt + b
+
+    return (
+        theta,
+        volt + noise * rng.standard_normal(theta.size),
+        intensity + noise * rng.standard_normal(theta.size),
+        noise,
+        noise,
+    )
+
+
+def test_fit_malus_recovers_parameters():
+    rng = np.random.default_rng(0)
+
+    result = polarization.fit_malus(*_run(rng))
+
+    np.testing.assert_allclose(result.p_opt, TRUTH, rtol=1e-2, atol=1e-2)
+    assert result.cov.shape == (6, 6)
+    assert list(result.values) == polarization.PARAMS
+
+
+def test_intensity_error_from_covariance():
+    rng = np.random.default_rng(1)
+
+    result = polarization.fit_malus(*_run(rng))
+
+    volt = np.array([0.5, 1.0])
+    intensity, err = result.intensity(volt)
+
+    m, b = result.p_opt[4:]
+    jac = np.stack([volt, np.ones_like(volt)], axis=-1)
+    cov = jac @ result.cov[4:, 4:] @ jac.T
+
+    np.testing.assert_allclose(intensity, m * volt + b)
+    np.testing.assert_allclose(err, np.sqrt(np.diag(cov)))
+
+
+def test_theta_error_increases_errors():
+    rng = np.random.default_rng(2)
+    run = _run(rng)
+
+    plain = polarization.fit_malus(*run)
+    with_theta = polarization.fit_malus(*run, theta_err=1e-2)
+
+    assert (with_theta.p_err >= plain.p_err).all()
+
+
+def test_fit_runs_matches_fit_malus():
+    rng = np.random.default_rng(3)
+    runs = [_run(rng) for _ in range(3)]
+
+    results = polarization.fit_runs(runs, jobs=1)
+
+    for run, result in zip(runs, results):
+        np.testing.assert_allclose(
+            result.p_opt, polarization.fit_malus(*run).p_opt
+        )
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from common import fit, resonance
+
+
+def test_analyze_finds_and_fits_every_peak():
+    x = np.linspace(30, 50, 200)
+    y = np.stack([
+        fit.f.lorentz.f(x, 40, 1, 1e6),
+        fit.f.lorentz.f(x, 35, 0.5, 1e6) + fit.f.lorentz.f(x, 45, 0.5, 2e6),
+    ])
+
+    result = resonance.analyze(x, y)
+
+    np.testing.assert_array_equal(result["Sweep"], [0, 1, 1])
+    np.testing.assert_allclose(result["w_0"], [40, 35, 45], rtol=1e-4)
+    np.testing.assert_allclose(result["Q"], [40, 70, 90], rtol=1e-2)
+    assert result["Converged"].all()
+
+
+def test_analyze_with_other_model_has_its_parameters():
+    x = np.linspace(30, 50, 200)
+    y = fit.f.double_lorentz.f(x, 39, 41, 1, 1, 10)
+
+    result = resonance.analyze(
+        x,
+        y,
+        level=0.0,
+        func=fit.f.double_lorentz,
+        bounds=fit.f.double_lorentz.bounds
+    )
+
+    for p in fit.f.double_lorentz.params:
+        assert p in result and f"Error {p}" in result
+
+    assert "Q" not in result
+
+    p_opt = [result[p][0] for p in fit.f.double_lorentz.params]
+    np.testing.assert_allclose(
+        fit.f.double_lorentz.f(x, *p_opt), y, rtol=1e-3, atol=1e-3
+    )
+
+
+def test_columns_adds_errors():
+    df = pd.DataFrame({
+        "Frecuencia [kHz]": [39.0, 40.0],
+        "Amplitud [mVpp]": [100.0, 200.0],
+        "Escala [mV]": [20.0, 50.0],
+        "Error [mV]": [1.0, 2.0],
+    })
+
+    freq, ampl, error = resonance.columns(df)
+
+    np.testing.assert_allclose(freq, [39, 40])
+    np.testing.assert_allclose(error, [3 + 1 + 1, 6 + 2.5 + 2])
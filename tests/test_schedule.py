@@ -0,0 +1,98 @@
+import pytest
+from common import perf, schedule
+
+
+def _node(name, inputs=(), outputs=()):
+    return schedule.Node(name, None, inputs, outputs)
+
+
+def _names(levels):
+    return [sorted(n.name for n in level) for level in levels]
+
+
+def test_levels_follow_dependencies():
+    nodes = [
+        _node(
+            "fit",
+            ["data/pol.csv", "results/cos2.csv"],
+            ["results/fit.csv"]
+        ),
+        _node("cos2", ["data/pol.csv"], ["results/cos2.csv"]),
+        _node("haz", ["data/haz.csv"], ["results/haz.csv"]),
+        _node("report", ["results/fit.csv", "results/haz.csv"]),
+    ]
+
+    assert _names(schedule.levels(nodes)) == [
+        ["cos2", "haz"],
+        ["fit"],
+        ["report"],
+    ]
+
+
+def test_own_outputs_are_not_dependencies():
+    nodes = [_node("a", ["results/a.csv"], ["results/a.csv"])]
+
+    assert _names(schedule.levels(nodes)) == [["a"]]
+
+
+def test_cycle():
+    nodes = [
+        _node("a", ["b.csv"], ["a.csv"]),
+        _node("b", ["a.csv"], ["b.csv"]),
+    ]
+
+    with pytest.raises(ValueError, match="cycle"):
+        schedule.levels(nodes)
+
+
+def test_output_with_two_producers():
+    nodes = [_node("a", outputs=["x.csv"]), _node("b", outputs=["x.csv"])]
+
+    with pytest.raises(ValueError):
+        schedule.levels(nodes)
+
+
+def test_downstream():
+    nodes = [
+        _node("a", outputs=["a.csv"]),
+        _node("b", ["a.csv"], ["b.csv"]),
+        _node("c", ["b.csv"]),
+        _node("d"),
+    ]
+
+    assert schedule.downstream(nodes, {"a"}) == {"a", "b", "c"}
+    assert schedule.downstream(nodes, {"d"}) == {"d"}
+
+
+def test_pending_reruns_changed_inputs(tmp_path):
+    (tmp_path / "data.csv").write_text("1\n")
+
+    def write():
+        (tmp_path / "out.csv").write_text("2\n")
+
+    nodes = [schedule.Node("a", write, ["data.csv"], ["out.csv"])]
+
+    assert schedule.pending(tmp_path, nodes, force=False) == {"a"}
+
+    schedule.run(tmp_path, nodes, force=False)
+    assert schedule.pending(tmp_path, nodes, force=False) == set()
+
+    (tmp_path / "data.csv").write_text("3\n")
+    assert schedule.pending(tmp_path, nodes, force=False) == {"a"}
+
+
+def test_profiling_runs_in_this_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(perf, "opt_profile", True)
+
+    ran = []
+
+    # Closures can't be sent to worker processes
+    nodes = [
+        schedule.Node(name, lambda name=name: ran.append(name), [], [])
+        for name in "ab"
+    ]
+
+    outcomes = schedule.run(tmp_path, nodes, force=True, jobs=2)
+
+    assert sorted(ran) == ["a", "b"]
+    assert all(o.error is None for o in outcomes)
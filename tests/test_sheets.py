@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from common import sheets
+
+
+@pytest.mark.parametrize("cellrange, rows, cols", [
+    ("A2:G21", slice(1, 21), slice(0, 7)),
+    ("b3:e49", slice(2, 49), slice(1, 5)),
+    ("A2:G", slice(1, None), slice(0, 7)),
+    ("B:D", slice(None, None), slice(1, 4)),
+    ("AA10", slice(9, 10), slice(26, 27)),
+])
+def test_parse_range(cellrange, rows, cols):
+    assert sheets._parse_range(cellrange) == (rows, cols)
+
+
+def test_parse_range_rejects_garbage():
+    with pytest.raises(ValueError):
+        sheets._parse_range("A1:B2:C3")
+
+
+def test_trim_drops_empty_cells_at_the_end():
+    cells = [["a", "b", ""], ["1", "", ""], ["", "", ""], []]
+
+    assert sheets._trim(cells) == [["a", "b"], ["1"]]
+
+
+def test_to_dataframe_numbers():
+    df = sheets._to_dataframe([
+        ["x [m]", "y [V]", "z"],
+        ["1", "1,5", "1.234,5"],
+        ["2", "2.5"],
+        ["3", "", "7"],
+    ])
+
+    assert list(df.columns) == ["x [m]", "y [V]", "z"]
+    np.testing.assert_allclose(df["x [m]"], [1, 2, 3])
+    np.testing.assert_allclose(df["y [V]"], [1.5, 2.5, np.nan])
+    np.testing.assert_allclose(df["z"], [1234.5, np.nan, 7])
+
+
+def test_to_dataframe_quotes_tabs_and_newlines():
+    df = sheets._to_dataframe([
+        ["a", "b"],
+        ['"1"', "2\n"],
+        [" 3\t", '"4,5"'],
+    ])
+
+    np.testing.assert_allclose(df["a"], [1, 3])
+    np.testing.assert_allclose(df["b"], [2, 4.5])
+
+    # A tab inside a cell doesn't shift the others
+    with pytest.raises(ValueError, match="'a'"):
+        sheets._to_dataframe([["a", "b"], ["1\t2", "3"]])
+
+
+def test_to_dataframe_empty():
+    assert sheets._to_dataframe([]).empty
+    assert sheets._to_dataframe([[]]).empty
+
+    df = sheets._to_dataframe([["a", "b"]])
+    assert list(df.columns) == ["a", "b"] and len(df) == 0
+
+
+def test_to_dataframe_rejects_text():
+    with pytest.raises(ValueError, match="'b'"):
+        sheets._to_dataframe([["a", "b"], ["1", "hola"]])
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_fetch_many_logs_every_document(monkeypatch, caplog, jobs):
+    def fetch(path, ranges):
+        if path == "bad":
+            raise sheets.SheetError("no sheet")
+
+        return [path] * len(ranges)
+
+    monkeypatch.setattr(sheets, "_fetch", fetch)
+
+    requests = {"a": [("ws", "A1:B2")], "bad": [("ws", "A1")]}
+
+    with caplog.at_level("INFO", logger=sheets.__name__):
+        results = sheets.fetch_many(requests, jobs=jobs)
+
+    assert results["a"] == ["a"]
+    assert isinstance(results["bad"], sheets.SheetError)
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("Fetched 'a'" in m for m in messages)
+    assert any("Failed to fetch 'bad'" in m for m in messages)
+    assert all(r.levelname == "INFO" for r in caplog.records
+               if "etch" in r.getMessage())
+
+
+def test_to_dataframe_extra_cells_and_numbers():
+    df = sheets._to_dataframe([["a", "b"], [1, 2.5, "ignored"], ["3", ""]])
+
+    np.testing.assert_allclose(df["a"], [1, 3])
+    np.testing.assert_allclose(df["b"], [2.5, np.nan])
+    assert list(df.columns) == ["a", "b"]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from common import spectral
+
+
+def test_dominant_uniform_grid():
+    x = np.linspace(0, 20, 400)
+
+    # Within a fraction of a bin, 2 pi / 20
+    assert spectral.dominant(x, np.cos(3 * x)) == pytest.approx(3, abs=0.1)
+
+
+def test_dominant_uneven_grid():
+    rng = np.random.default_rng(2)
+    x = np.sort(rng.uniform(0, 20, 300))
+
+    assert not spectral.is_uniform(x)
+    assert spectral.dominant(x, np.sin(2.5 * x)) == pytest.approx(
+        2.5, rel=0.01
+    )
+
+
+def test_lomb_scargle_evenly_spaced_frequencies_match_direct():
+    rng = np.random.default_rng(3)
+    x = np.sort(rng.uniform(0, 10, 50))
+    y = np.cos(1.7 * x)
+
+    k = np.linspace(0.5, 3, 26)
+
+    direct = np.concatenate([spectral.lomb_scargle(x, y, [ki]) for ki in k])
+
+    np.testing.assert_allclose(spectral.lomb_scargle(x, y, k), direct)
+
+
+def test_sinusoid():
+    rng = np.random.default_rng(4)
+    x = np.sort(rng.uniform(0, 15, 200))
+    y = 0.5 + 2 * np.cos(1.3 * x - 0.7)
+
+    k, a, R, phi = spectral.sinusoid(x, y)
+
+    # Best of the candidate frequencies
+    assert k == pytest.approx(1.3, rel=1e-2)
+    assert a == pytest.approx(0.5, abs=1e-2)
+    assert R == pytest.approx(2, rel=1e-2)
+    assert phi == pytest.approx(0.7, abs=0.05)